@@ -0,0 +1,87 @@
+import ast
+import logging
+
+logger = logging.getLogger(__name__)
+
+class AstRuleRegistry:
+    """
+    Python AST rules indexed by the node types they inspect
+
+    Each rule declares the node types it cares about when it is registered.
+    A single iterative traversal of the tree hands every node only to the
+    rules registered for its type, so adding rules never adds tree walks.
+    """
+
+    def __init__(self):
+        self.rules = []
+        self.dispatch = {}
+
+    def register(self, *node_types, bug_type, severity, description, recommendation):
+        """
+        Decorator registering a check function as a rule
+
+        The check is called with each node of the given types and yields
+        (line_number, fields) for every finding; fields are substituted into
+        the description and recommendation templates.
+
+        Args:
+            *node_types (type): AST node classes the rule inspects
+            bug_type (str): Type of the reported finding
+            severity (str): Severity of the reported finding
+            description (str): Description template
+            recommendation (str): Recommendation template
+
+        Returns:
+            callable: Decorator returning the check unchanged
+        """
+        def decorator(check):
+            rule = {
+                'check': check,
+                'bug_type': bug_type,
+                'severity': severity,
+                'description': description,
+                'recommendation': recommendation
+            }
+            self.rules.append(rule)
+            for node_type in node_types:
+                self.dispatch.setdefault(node_type, []).append(rule)
+            return check
+        return decorator
+
+    def run(self, tree, snippets):
+        """
+        Walk a tree once and collect the findings of every rule
+
+        Nodes are visited in the same pre-order as ast.NodeVisitor, with an
+        explicit stack instead of recursion.
+
+        Args:
+            tree (ast.AST): Parsed module
+            snippets (SnippetProvider): Snippet source of the parsed file
+
+        Returns:
+            list: Found bugs, in traversal order
+        """
+        bugs = []
+        dispatch = self.dispatch
+        stack = [tree]
+
+        while stack:
+            node = stack.pop()
+
+            for rule in dispatch.get(type(node), ()):
+                for line_number, fields in rule['check'](node):
+                    bugs.append({
+                        'line_number': line_number,
+                        'bug_type': rule['bug_type'],
+                        'severity': rule['severity'],
+                        'description': rule['description'].format(**fields),
+                        'code_snippet': snippets.get(line_number),
+                        'recommendation': rule['recommendation'].format(**fields)
+                    })
+
+            children = list(ast.iter_child_nodes(node))
+            children.reverse()
+            stack.extend(children)
+
+        return bugs
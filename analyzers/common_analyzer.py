@@ -1,6 +1,7 @@
 import os
-import re
 import logging
+from analyzers.file_context import FileContext, LargeFileContext, SnippetProvider
+from analyzers.rule_compiler import compile_rules
 
 logger = logging.getLogger(__name__)
 
@@ -36,10 +37,16 @@ COMMON_PATTERNS = [
     }
 ]
 
+# Compiled once at import time so each file is scanned in a single pass
+COMMON_RULES = compile_rules(COMMON_PATTERNS)
+
 def get_code_snippet(file_path, line_number, context=3):
     """
     Extract a code snippet from a file around a specific line
     
+    Prefer a SnippetProvider when the file's lines are already loaded; this
+    helper reads the whole file for a single snippet.
+    
     Args:
         file_path (str): Path to the file
         line_number (int): Line number to center snippet around
@@ -50,31 +57,22 @@ def get_code_snippet(file_path, line_number, context=3):
     """
     try:
         with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            lines = f.readlines()
-            
-        start = max(0, line_number - context - 1)
-        end = min(len(lines), line_number + context)
-        
-        snippet_lines = lines[start:end]
-        snippet = ''
-        
-        for i, line in enumerate(snippet_lines):
-            line_num = start + i + 1
-            prefix = f"{line_num}: " if line_num == line_number else f"{line_num}  "
-            snippet += prefix + line
-            
-        return snippet
+            lines = f.read().split('\n')
     except Exception as e:
         logger.error(f"Error extracting code snippet from {file_path}: {str(e)}")
         return "Unable to extract code snippet"
+    
+    return SnippetProvider(lines).get(line_number, context)
 
-def analyze_common_issues(full_path, relative_path):
+def analyze_common_issues(full_path, relative_path, file_context=None):
     """
     Analyze a file for common issues across all languages
     
     Args:
         full_path (str): Full path to the file
         relative_path (str): Path relative to repository root
+        file_context (FileContext): Already loaded file, read from full_path
+            when not supplied
         
     Returns:
         list: Found bugs
@@ -82,26 +80,28 @@ def analyze_common_issues(full_path, relative_path):
     bugs = []
     
     try:
-        with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-            lines = content.split('\n')
+        if file_context is None:
+            file_context = FileContext.load(full_path, relative_path)
+        
+        snippets = file_context.snippets
+        
+        # Large files are scanned from their raw buffer without decoding them
+        if isinstance(file_context, LargeFileContext):
+            hits = COMMON_RULES.scan_buffer(file_context.buffer, file_context.line_index)
+        else:
+            hits = COMMON_RULES.scan(file_context.lines, file_context.text)
         
         # Check each pattern
-        for pattern_info in COMMON_PATTERNS:
-            pattern = pattern_info['pattern']
-            for i, line in enumerate(lines):
-                match = re.search(pattern, line)
-                if match:
-                    line_number = i + 1
-                    bug = {
-                        'line_number': line_number,
-                        'bug_type': pattern_info['bug_type'],
-                        'severity': pattern_info['severity'],
-                        'description': pattern_info['description'],
-                        'code_snippet': get_code_snippet(full_path, line_number),
-                        'recommendation': pattern_info['recommendation']
-                    }
-                    bugs.append(bug)
+        for pattern_info, line_number in hits:
+            bug = {
+                'line_number': line_number,
+                'bug_type': pattern_info['bug_type'],
+                'severity': pattern_info['severity'],
+                'description': pattern_info['description'],
+                'code_snippet': snippets.get(line_number),
+                'recommendation': pattern_info['recommendation']
+            }
+            bugs.append(bug)
     
     except Exception as e:
         logger.error(f"Error analyzing common issues in {relative_path}: {str(e)}")
@@ -0,0 +1,297 @@
+import logging
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+logger = logging.getLogger(__name__)
+
+# Bytes per block of the large-file line index; only the newline count
+# before each block is stored
+LINE_INDEX_BLOCK_SIZE = 16384
+
+class SnippetProvider:
+    """
+    Serve code snippets for a single file from lines already held in memory,
+    so extracting a snippet for a finding never touches the filesystem
+    """
+
+    def __init__(self, lines):
+        """
+        Args:
+            lines (list): Lines of the file, without line terminators
+        """
+        self.lines = lines
+        # A trailing newline leaves an empty last element that is not a real line
+        self.line_count = len(lines) - 1 if lines and lines[-1] == '' else len(lines)
+
+    def get(self, line_number, context=3):
+        """
+        Extract a code snippet around a specific line
+
+        Args:
+            line_number (int): Line number to center snippet around
+            context (int): Number of lines to include before and after
+
+        Returns:
+            str: The code snippet
+        """
+        try:
+            start = max(0, line_number - context - 1)
+            end = min(self.line_count, line_number + context)
+            last_index = len(self.lines) - 1
+
+            snippet = ''
+            for i in range(start, end):
+                line_num = i + 1
+                prefix = f"{line_num}: " if line_num == line_number else f"{line_num}  "
+                snippet += prefix + self.lines[i] + ('\n' if i < last_index else '')
+
+            return snippet
+        except Exception as e:
+            logger.error(f"Error extracting code snippet at line {line_number}: {str(e)}")
+            return "Unable to extract code snippet"
+
+class FileContext:
+    """
+    Everything the scan needs to know about one file, loaded with a single read
+
+    The raw bytes are read and decoded once; the line list, line-start offsets
+    and snippet provider are derived from that one buffer and shared by the
+    line-count statistic and every analyzer that looks at the file.
+    """
+
+    def __init__(self, path, relative_path, raw, language=None):
+        """
+        Args:
+            path (str): Full path to the file
+            relative_path (str): Path relative to repository root
+            raw (bytes): Raw file contents
+            language (str): Detected language of the file
+        """
+        self.path = path
+        self.relative_path = relative_path
+        self.raw = raw
+        self.size = len(raw)
+        self.language = language
+
+        # Decode the same way the analyzers used to read files: UTF-8 with
+        # undecodable bytes dropped and universal newlines
+        text = raw.decode('utf-8', errors='ignore')
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        self.text = text
+        self.lines = text.split('\n')
+        self.snippets = SnippetProvider(self.lines)
+        self._line_starts = None
+
+    @classmethod
+    def load(cls, path, relative_path, language=None):
+        """
+        Read a file from disk into a FileContext
+
+        Args:
+            path (str): Full path to the file
+            relative_path (str): Path relative to repository root
+            language (str): Detected language of the file
+
+        Returns:
+            FileContext: The loaded file
+        """
+        with open(path, 'rb') as f:
+            raw = f.read()
+        return cls(path, relative_path, raw, language)
+
+    @property
+    def line_count(self):
+        """Number of lines, counted the same way as iterating over the open file"""
+        return self.snippets.line_count
+
+    @property
+    def line_starts(self):
+        """Offset into text at which each line starts"""
+        if self._line_starts is None:
+            self._line_starts = [0] + list(accumulate(len(line) + 1 for line in self.lines[:-1]))
+        return self._line_starts
+
+    def line_number_at(self, offset):
+        """
+        Get the line number containing an offset into text
+
+        Args:
+            offset (int): Offset into text
+
+        Returns:
+            int: 1-based line number
+        """
+        return bisect_right(self.line_starts, offset)
+
+class LineIndex:
+    """
+    Compact line-offset index over a bytes buffer or memory map
+
+    Instead of one entry per line, only the number of newlines before each
+    fixed-size block is stored; offsets are mapped to lines, and lines to
+    offsets, by counting newlines within a single block.
+    """
+
+    def __init__(self, buffer, block_size=LINE_INDEX_BLOCK_SIZE):
+        """
+        Args:
+            buffer (bytes or mmap.mmap): File contents
+            block_size (int): Bytes per index block
+        """
+        self.buffer = buffer
+        self.size = len(buffer)
+        self.block_size = block_size
+
+        block_newlines = array('Q')
+        newlines = 0
+        for start in range(0, self.size, block_size):
+            block_newlines.append(newlines)
+            newlines += buffer[start:start + block_size].count(b'\n')
+
+        self.block_newlines = block_newlines
+        self.newlines = newlines
+        self.ends_with_newline = self.size > 0 and buffer[self.size - 1:self.size] == b'\n'
+
+    @property
+    def line_count(self):
+        """Number of lines, a final line without newline included"""
+        if self.size and not self.ends_with_newline:
+            return self.newlines + 1
+        return self.newlines
+
+    def line_number_at(self, offset):
+        """
+        Get the line number containing an offset
+
+        Args:
+            offset (int): Offset into the buffer
+
+        Returns:
+            int: 1-based line number
+        """
+        block = offset // self.block_size
+        if block >= len(self.block_newlines):
+            return self.newlines + 1
+        block_start = block * self.block_size
+        return self.block_newlines[block] + self.buffer[block_start:offset].count(b'\n') + 1
+
+    def line_start(self, line_number):
+        """
+        Get the offset at which a line starts
+
+        Args:
+            line_number (int): 1-based line number
+
+        Returns:
+            int: Offset of the first byte of the line
+        """
+        target = line_number - 1
+        if target <= 0 or not self.block_newlines:
+            return 0
+
+        # Last block starting before the target-th newline
+        block = bisect_left(self.block_newlines, target) - 1
+        pos = block * self.block_size
+        for _ in range(target - self.block_newlines[block]):
+            pos = self.buffer.find(b'\n', pos) + 1
+        return pos
+
+    def line(self, line_number):
+        """
+        Decode a single line
+
+        Args:
+            line_number (int): 1-based line number
+
+        Returns:
+            str: The line, without its terminator
+        """
+        start = self.line_start(line_number)
+        end = self.buffer.find(b'\n', start)
+        if end < 0:
+            end = self.size
+        return self.buffer[start:end].decode('utf-8', errors='ignore').removesuffix('\r')
+
+class LazySnippetProvider:
+    """
+    Serve code snippets of a large file by decoding only the lines they show
+    """
+
+    def __init__(self, line_index):
+        """
+        Args:
+            line_index (LineIndex): Index of the file's buffer
+        """
+        self.line_index = line_index
+        self.line_count = line_index.line_count
+
+    def get(self, line_number, context=3):
+        """
+        Extract a code snippet around a specific line, formatted like
+        SnippetProvider.get
+
+        Args:
+            line_number (int): Line number to center snippet around
+            context (int): Number of lines to include before and after
+
+        Returns:
+            str: The code snippet
+        """
+        try:
+            first = max(1, line_number - context)
+            last = min(self.line_count, line_number + context)
+
+            snippet = ''
+            for line_num in range(first, last + 1):
+                prefix = f"{line_num}: " if line_num == line_number else f"{line_num}  "
+                is_last_line = line_num == self.line_count and not self.line_index.ends_with_newline
+                snippet += prefix + self.line_index.line(line_num) + ('' if is_last_line else '\n')
+
+            return snippet
+        except Exception as e:
+            logger.error(f"Error extracting code snippet at line {line_number}: {str(e)}")
+            return "Unable to extract code snippet"
+
+class LargeFileContext:
+    """
+    A file too large to hold as decoded text and a line list
+
+    The contents stay in a bytes buffer, typically a read-only memory map;
+    rules scan the buffer with bytes regexes, lines are located through a
+    compact LineIndex and snippets are decoded on demand.
+    """
+
+    def __init__(self, path, relative_path, buffer, language=None):
+        """
+        Args:
+            path (str): Full path to the file
+            relative_path (str): Path relative to repository root
+            buffer (bytes or mmap.mmap): File contents
+            language (str): Detected language of the file
+        """
+        self.path = path
+        self.relative_path = relative_path
+        self.buffer = buffer
+        self.size = len(buffer)
+        self.language = language
+        self.line_index = LineIndex(buffer)
+        self.snippets = LazySnippetProvider(self.line_index)
+
+    @property
+    def line_count(self):
+        """Number of lines in the file"""
+        return self.line_index.line_count
+
+    def line_number_at(self, offset):
+        """
+        Get the line number containing an offset into the buffer
+
+        Args:
+            offset (int): Offset into the buffer
+
+        Returns:
+            int: 1-based line number
+        """
+        return self.line_index.line_number_at(offset)
@@ -1,6 +1,7 @@
-import re
 import logging
-from analyzers.common_analyzer import get_code_snippet
+from analyzers.file_context import FileContext
+from analyzers.rule_compiler import compile_rules
+from analyzers.go_lexer import GoIndex
 
 logger = logging.getLogger(__name__)
 
@@ -50,13 +51,18 @@ GO_PATTERNS = [
     }
 ]
 
-def analyze_go_file(full_path, relative_path):
+# Compiled once at import time so each file is scanned in a single pass
+GO_RULES = compile_rules(GO_PATTERNS)
+
+def analyze_go_file(full_path, relative_path, file_context=None):
     """
     Analyze a Go file for bugs and issues
     
     Args:
         full_path (str): Full path to the file
         relative_path (str): Path relative to repository root
+        file_context (FileContext): Already loaded file, read from full_path
+            when not supplied
         
     Returns:
         list: Found bugs
@@ -64,51 +70,42 @@ def analyze_go_file(full_path, relative_path):
     bugs = []
     
     try:
-        with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-            lines = content.split('\n')
+        if file_context is None:
+            file_context = FileContext.load(full_path, relative_path)
         
-        # Pattern-based checks
-        for pattern_info in GO_PATTERNS:
-            pattern = pattern_info['pattern']
-            for i, line in enumerate(lines):
-                match = re.search(pattern, line)
-                if match:
-                    line_number = i + 1
-                    bug = {
-                        'line_number': line_number,
-                        'bug_type': pattern_info['bug_type'],
-                        'severity': pattern_info['severity'],
-                        'description': pattern_info['description'],
-                        'code_snippet': get_code_snippet(full_path, line_number),
-                        'recommendation': pattern_info['recommendation']
-                    }
-                    bugs.append(bug)
+        lines = file_context.lines
+        snippets = file_context.snippets
         
-        # Check for unused imports
-        import_lines = []
-        for i, line in enumerate(lines):
-            if re.match(r'\s*import\s+\(', line):
-                j = i + 1
-                while j < len(lines) and not re.match(r'\s*\)', lines[j]):
-                    import_line = lines[j].strip()
-                    if import_line and not import_line.startswith('//'):
-                        import_name = import_line.split('"')[1] if '"' in import_line else import_line
-                        import_lines.append((j + 1, import_name))
-                    j += 1
+        # Pattern-based checks
+        for pattern_info, line_number in GO_RULES.scan(lines, file_context.text):
+            bug = {
+                'line_number': line_number,
+                'bug_type': pattern_info['bug_type'],
+                'severity': pattern_info['severity'],
+                'description': pattern_info['description'],
+                'code_snippet': snippets.get(line_number),
+                'recommendation': pattern_info['recommendation']
+            }
+            bugs.append(bug)
         
-        # Check if imports are used
-        for line_number, import_name in import_lines:
-            package_name = import_name.split('/')[-1]
-            if package_name and not any(package_name in line for line in lines):
-                bugs.append({
-                    'line_number': line_number,
-                    'bug_type': 'Unused Import',
-                    'severity': 'low',
-                    'description': f'Import {import_name} appears to be unused.',
-                    'code_snippet': get_code_snippet(full_path, line_number),
-                    'recommendation': 'Remove unused imports.'
-                })
+        # Check for unused imports: a package is used when it qualifies a selector
+        index = GoIndex.from_source(file_context.text)
+        for go_import in index.imports:
+            # Blank imports run for side effects and dot imports have no qualifier
+            if go_import.alias in ('_', '.'):
+                continue
+            if any(index.uses_qualifier(name) for name in go_import.names):
+                continue
+
+            line_number = file_context.line_number_at(go_import.offset)
+            bugs.append({
+                'line_number': line_number,
+                'bug_type': 'Unused Import',
+                'severity': 'low',
+                'description': f'Import {go_import.path} appears to be unused.',
+                'code_snippet': snippets.get(line_number),
+                'recommendation': 'Remove unused imports.'
+            })
     
     except Exception as e:
         logger.error(f"Error analyzing Go file {relative_path}: {str(e)}")
@@ -0,0 +1,199 @@
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+# One alternation per token class; whitespace between tokens is skipped by
+# finditer. Unterminated comments and strings fall through to single
+# characters instead of swallowing the rest of the file.
+GO_TOKEN_PATTERN = re.compile(r'''
+    (?P<comment>//[^\n]*|/\*.*?\*/)
+  | (?P<string>"(?:[^"\\\n]|\\.)*"|`[^`]*`)
+  | (?P<rune>'(?:[^'\\\n]|\\.)*')
+  | (?P<ident>[^\W\d]\w*)
+  | (?P<number>\.?\d(?:[\w.]|[eEpP][+-])*)
+  | (?P<op>\S)
+''', re.S | re.X)
+
+# Kinds of tokens that carry no code
+SKIPPED_KINDS = ('comment',)
+
+# Major version suffixes, e.g. ".../v2" or "yaml.v3"
+VERSION_SUFFIX = re.compile(r'^v\d+$')
+
+def tokenize(text):
+    """
+    Split Go source into tokens, dropping comments and whitespace
+
+    Args:
+        text (str): Go source code
+
+    Returns:
+        list: (kind, value, offset) tuples, kind being one of 'string',
+        'rune', 'ident', 'number' or 'op'
+    """
+    return [
+        (match.lastgroup, match.group(), match.start())
+        for match in GO_TOKEN_PATTERN.finditer(text)
+        if match.lastgroup not in SKIPPED_KINDS
+    ]
+
+class GoImport:
+    """A single import spec of a Go file"""
+
+    __slots__ = ('path', 'alias', 'offset')
+
+    def __init__(self, path, alias, offset):
+        """
+        Args:
+            path (str): Imported package path
+            alias (str): Explicit package name, '_' or '.', None if absent
+            offset (int): Offset of the spec in the source text
+        """
+        self.path = path
+        self.alias = alias
+        self.offset = offset
+
+    @property
+    def names(self):
+        """
+        Names the package may be referred to by in the file
+
+        An explicit alias is the only name. Otherwise the package name is
+        usually the last path element, but may drop a major version
+        suffix or a "go-" prefix, so every plausible spelling is returned.
+
+        Returns:
+            set: Candidate package names
+        """
+        if self.alias:
+            return {self.alias}
+
+        elements = self.path.split('/')
+        name = elements[-1]
+        if VERSION_SUFFIX.match(name) and len(elements) > 1:
+            name = elements[-2]
+
+        names = {name}
+        if '.' in name:
+            names.add(name.split('.')[0])
+        for candidate in list(names):
+            if candidate.startswith('go-'):
+                names.add(candidate[3:])
+            if candidate.endswith('-go'):
+                names.add(candidate[:-3])
+            if '-' in candidate:
+                names.add(candidate.replace('-', '_'))
+                names.add(candidate.replace('-', ''))
+                names.add(candidate.rsplit('-', 1)[-1])
+        return names
+
+class GoIndex:
+    """
+    Identifier and selector index of a Go file, built from one tokenization
+
+    Identifier occurrences and `qualifier.Name` selector expressions are
+    counted outside of import declarations, so rules can ask whether a
+    package or symbol is used without rescanning the file.
+    """
+
+    def __init__(self, tokens):
+        """
+        Args:
+            tokens (list): Tokens returned by tokenize
+        """
+        self.imports = []
+        self.identifiers = {}
+        self.selectors = {}
+        self._build(tokens)
+
+    @classmethod
+    def from_source(cls, text):
+        """
+        Tokenize Go source and index it
+
+        Args:
+            text (str): Go source code
+
+        Returns:
+            GoIndex: The index
+        """
+        return cls(tokenize(text))
+
+    def _build(self, tokens):
+        identifiers = self.identifiers
+        selectors = self.selectors
+        count = len(tokens)
+        i = 0
+
+        while i < count:
+            kind, value, _ = tokens[i]
+
+            if kind == 'ident':
+                if value == 'import':
+                    i = self._parse_import(tokens, i + 1)
+                    continue
+
+                identifiers[value] = identifiers.get(value, 0) + 1
+                # Selector expression: qualifier '.' name
+                if i + 2 < count and tokens[i + 1][1] == '.' and tokens[i + 2][0] == 'ident':
+                    selectors.setdefault(value, set()).add(tokens[i + 2][1])
+
+            i += 1
+
+    def _parse_import(self, tokens, i):
+        """Record the specs of the import declaration starting at tokens[i]"""
+        count = len(tokens)
+        grouped = i < count and tokens[i][1] == '('
+        if grouped:
+            i += 1
+
+        while i < count:
+            kind, value, offset = tokens[i]
+            if grouped and value == ')':
+                return i + 1
+
+            alias = None
+            spec_offset = offset
+            if kind == 'ident' or value == '.':
+                alias = value
+                i += 1
+                if i >= count:
+                    break
+                kind, value, _ = tokens[i]
+
+            if kind == 'string':
+                self.imports.append(GoImport(value[1:-1], alias, spec_offset))
+            elif value != ';':
+                # Not an import spec; resume regular indexing here
+                return i
+            i += 1
+
+            if not grouped:
+                return i
+
+        return i
+
+    def uses_qualifier(self, name):
+        """
+        Check whether a name is used as the qualifier of a selector
+
+        Args:
+            name (str): Package or variable name
+
+        Returns:
+            bool: True if `name.Something` occurs in the file
+        """
+        return name in self.selectors
+
+    def uses_identifier(self, name):
+        """
+        Check whether an identifier occurs outside import declarations
+
+        Args:
+            name (str): Identifier
+
+        Returns:
+            bool: True if the identifier occurs
+        """
+        return name in self.identifiers
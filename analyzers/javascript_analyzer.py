@@ -1,107 +1,238 @@
 import re
 import logging
-from analyzers.common_analyzer import get_code_snippet
+from analyzers.file_context import FileContext
+from analyzers.js_lexer import tokenize
 
 logger = logging.getLogger(__name__)
 
-# Common JavaScript/TypeScript anti-patterns
-JS_PATTERNS = [
+def _value_at(tokens, index):
+    """Value of the token at index, None past either end of the stream"""
+    if 0 <= index < len(tokens):
+        return tokens[index][1]
+    return None
+
+def _kind_at(tokens, index):
+    """Kind of the token at index, None past either end of the stream"""
+    if 0 <= index < len(tokens):
+        return tokens[index][0]
+    return None
+
+def _is_call(tokens, i):
+    """Token i is called: `name(`"""
+    return _value_at(tokens, i + 1) == '('
+
+def _is_loose_null_check(tokens, i):
+    """Token i is == followed by null"""
+    return _value_at(tokens, i + 1) == 'null'
+
+def _is_document_write(tokens, i):
+    """`document.write(` or `document.writeln(`"""
+    return (_value_at(tokens, i + 1) == '.'
+            and _value_at(tokens, i + 2) in ('write', 'writeln')
+            and _value_at(tokens, i + 3) == '(')
+
+def _is_assigned(tokens, i):
+    """Token i is the target of `=` or `+=`"""
+    return _value_at(tokens, i + 1) in ('=', '+=')
+
+def _is_called_with_string(tokens, i):
+    """Token i is called with a string or template literal as first argument"""
+    return _value_at(tokens, i + 1) == '(' and _kind_at(tokens, i + 2) == 'string'
+
+def _is_function_constructor(tokens, i):
+    """`new Function(`"""
+    return _value_at(tokens, i - 1) == 'new' and _value_at(tokens, i + 1) == '('
+
+def _is_global_call(tokens, i):
+    """Token i is called as a global or through window, and not declared"""
+    if _value_at(tokens, i + 1) != '(':
+        return False
+    previous = _value_at(tokens, i - 1)
+    if previous in ('.', '?.'):
+        return _value_at(tokens, i - 2) == 'window'
+    return previous != 'function'
+
+def _is_member_access(tokens, i):
+    """Token i is followed by a member access"""
+    return _value_at(tokens, i + 1) in ('.', '?.', '[')
+
+def _is_console_log(tokens, i):
+    """`console.log(`"""
+    return (_value_at(tokens, i + 1) == '.'
+            and _value_at(tokens, i + 2) == 'log'
+            and _value_at(tokens, i + 3) == '(')
+
+def _always(tokens, i):
+    return True
+
+# Common JavaScript/TypeScript anti-patterns. Each rule is tried on the
+# tokens whose value is one of its triggers, with match(tokens, index)
+# deciding from the neighbouring tokens; strings, comments and regular
+# expression literals never trigger a rule.
+JS_RULES = [
     {
-        'pattern': r'eval\s*\(',
+        'triggers': ('eval',),
+        'match': _is_call,
         'bug_type': 'Use of eval()',
         'severity': 'critical',
         'description': 'Use of eval() function can lead to code injection vulnerabilities.',
         'recommendation': 'Avoid using eval() and find a safer alternative.'
     },
     {
-        'pattern': r'==\s*null',
+        'triggers': ('==',),
+        'match': _is_loose_null_check,
         'bug_type': 'Loose Null Check',
         'severity': 'low',
         'description': 'Using == with null will also match undefined.',
         'recommendation': 'Use === for strict equality checking.'
     },
     {
-        'pattern': r'document\.write\(',
+        'triggers': ('document',),
+        'match': _is_document_write,
         'bug_type': 'document.write()',
         'severity': 'medium',
         'description': 'document.write() can overwrite the entire document and is considered bad practice.',
         'recommendation': 'Use DOM manipulation methods instead, like appendChild().'
     },
     {
-        'pattern': r'innerHTML\s*=',
+        'triggers': ('innerHTML',),
+        'match': _is_assigned,
         'bug_type': 'innerHTML Assignment',
         'severity': 'high',
         'description': 'Direct assignment to innerHTML can lead to XSS vulnerabilities.',
         'recommendation': 'Use textContent for text or sanitize HTML input before using innerHTML.'
     },
     {
-        'pattern': r'setTimeout\(\s*["\'](.*?)["\']\s*\)',
+        'triggers': ('setTimeout',),
+        'match': _is_called_with_string,
         'bug_type': 'setTimeout with String',
         'severity': 'medium',
         'description': 'Using setTimeout with a string argument is similar to using eval().',
         'recommendation': 'Use a function reference instead of a string in setTimeout.'
     },
     {
-        'pattern': r'new\s+Function\(',
+        'triggers': ('Function',),
+        'match': _is_function_constructor,
         'bug_type': 'new Function()',
         'severity': 'high',
         'description': 'Creating functions from strings is similar to eval() and can lead to injection attacks.',
         'recommendation': 'Avoid creating functions from strings.'
     },
     {
-        'pattern': r'alert\(|confirm\(|prompt\(',
+        'triggers': ('alert', 'confirm', 'prompt'),
+        'match': _is_global_call,
         'bug_type': 'Browser Dialog',
         'severity': 'low',
         'description': 'Use of browser dialogs (alert, confirm, prompt) creates a poor user experience.',
         'recommendation': 'Use custom UI components instead of browser dialogs.'
     },
     {
-        'pattern': r'localStorage\.|sessionStorage\.',
+        'triggers': ('localStorage', 'sessionStorage'),
+        'match': _is_member_access,
         'bug_type': 'Web Storage API',
         'severity': 'info',
         'description': 'Use of Web Storage API (localStorage, sessionStorage) should be carefully reviewed.',
         'recommendation': 'Ensure sensitive data is not stored in Web Storage and consider encryption if needed.'
+    },
+    {
+        'triggers': ('==', '!='),
+        'match': _always,
+        'bug_type': 'Loose Equality',
+        'severity': 'low',
+        'description': 'Use of loose equality (== or !=) instead of strict equality (=== or !==).',
+        'recommendation': 'Use === and !== for strict type checking.'
+    },
+    {
+        'triggers': ('console',),
+        'match': _is_console_log,
+        'bug_type': 'Console Statement',
+        'severity': 'low',
+        'description': 'console.log() statements should be removed in production code.',
+        'recommendation': 'Remove console.log() statements or use a proper logging library.'
     }
 ]
 
-def check_for_strict_equality(content):
+def build_rule_dispatch(rules):
     """
-    Check for loose equality comparisons in JavaScript
-    
+    Index rules by trigger token value, so each token is only offered to the
+    rules that care about it
+
     Args:
-        content (str): File content
-        
+        rules (list): Rule table such as JS_RULES
+
     Returns:
-        list: Found bugs related to loose equality
+        dict: Trigger token value -> list of rule indices
     """
-    bugs = []
-    lines = content.split('\n')
-    
-    # Regular expression for loose equality (== or !=) but not strict equality (=== or !==)
-    pattern = r'[^=!]=[^=]|[^!]=[^=]'
-    
-    for i, line in enumerate(lines):
-        match = re.search(pattern, line)
-        if match and ' = ' not in line:  # Avoid matching simple assignments
-            line_number = i + 1
-            bugs.append({
-                'line_number': line_number,
-                'bug_type': 'Loose Equality',
-                'severity': 'low',
-                'description': 'Use of loose equality (== or !=) instead of strict equality (=== or !==).',
-                'code_snippet': line.strip(),
-                'recommendation': 'Use === and !== for strict type checking.'
-            })
-    
-    return bugs
+    dispatch = {}
+    for index, rule in enumerate(rules):
+        for trigger in rule['triggers']:
+            dispatch.setdefault(trigger, []).append(index)
+    return dispatch
+
+def build_trigger_pattern(triggers):
+    """
+    Build a regex finding the triggers as whole tokens in raw source text
+
+    Identifiers must not be part of a longer word, and == or != must not be
+    part of === or !==, which would otherwise match nearly every file.
+
+    Args:
+        triggers (iterable): Trigger token values
+
+    Returns:
+        re.Pattern: Pattern matching any of the triggers
+    """
+    alternatives = []
+    for trigger in sorted(triggers, key=len, reverse=True):
+        if trigger.isidentifier():
+            alternatives.append(rf'\b{re.escape(trigger)}\b')
+        else:
+            alternatives.append(rf'(?<![=!]){re.escape(trigger)}(?!=)')
+    return re.compile('|'.join(alternatives))
+
+JS_RULE_DISPATCH = build_rule_dispatch(JS_RULES)
 
-def analyze_javascript_file(full_path, relative_path):
+# Files containing none of the triggers as tokens are not tokenized at all
+JS_TRIGGER_PATTERN = build_trigger_pattern(JS_RULE_DISPATCH)
+
+def find_rule_hits(tokens, file_context):
+    """
+    Match every rule against a token stream in a single pass
+
+    Args:
+        tokens (list): Tokens returned by tokenize
+        file_context (FileContext): The tokenized file
+
+    Returns:
+        list: (rule, line_number) tuples, grouped by rule in table order and
+        by line number within a rule, at most one per rule and line
+    """
+    hits = [{} for _ in JS_RULES]
+    dispatch = JS_RULE_DISPATCH
+
+    for i, (kind, value, offset) in enumerate(tokens):
+        if kind not in ('ident', 'op'):
+            continue
+        indices = dispatch.get(value)
+        if not indices:
+            continue
+        for index in indices:
+            if JS_RULES[index]['match'](tokens, i):
+                hits[index][file_context.line_number_at(offset)] = True
+
+    return [(JS_RULES[index], line_number)
+            for index, lines in enumerate(hits)
+            for line_number in sorted(lines)]
+
+def analyze_javascript_file(full_path, relative_path, file_context=None):
     """
     Analyze a JavaScript/TypeScript file for bugs and issues
     
     Args:
         full_path (str): Full path to the file
         relative_path (str): Path relative to repository root
+        file_context (FileContext): Already loaded file, read from full_path
+            when not supplied
         
     Returns:
         list: Found bugs
@@ -109,43 +240,25 @@ def analyze_javascript_file(full_path, relative_path):
     bugs = []
     
     try:
-        with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-            lines = content.split('\n')
+        if file_context is None:
+            file_context = FileContext.load(full_path, relative_path)
         
-        # Pattern-based checks
-        for pattern_info in JS_PATTERNS:
-            pattern = pattern_info['pattern']
-            for i, line in enumerate(lines):
-                match = re.search(pattern, line)
-                if match:
-                    line_number = i + 1
-                    bug = {
-                        'line_number': line_number,
-                        'bug_type': pattern_info['bug_type'],
-                        'severity': pattern_info['severity'],
-                        'description': pattern_info['description'],
-                        'code_snippet': get_code_snippet(full_path, line_number),
-                        'recommendation': pattern_info['recommendation']
-                    }
-                    bugs.append(bug)
+        content = file_context.text
+        snippets = file_context.snippets
         
-        # Check for loose equality
-        equality_bugs = check_for_strict_equality(content)
-        bugs.extend(equality_bugs)
+        if not JS_TRIGGER_PATTERN.search(content):
+            return bugs
         
-        # Check for console.log statements
-        for i, line in enumerate(lines):
-            if 'console.log(' in line:
-                line_number = i + 1
-                bugs.append({
-                    'line_number': line_number,
-                    'bug_type': 'Console Statement',
-                    'severity': 'low',
-                    'description': 'console.log() statements should be removed in production code.',
-                    'code_snippet': get_code_snippet(full_path, line_number),
-                    'recommendation': 'Remove console.log() statements or use a proper logging library.'
-                })
+        # Token-based checks, all rules in a single pass over the token stream
+        for rule, line_number in find_rule_hits(tokenize(content), file_context):
+            bugs.append({
+                'line_number': line_number,
+                'bug_type': rule['bug_type'],
+                'severity': rule['severity'],
+                'description': rule['description'],
+                'code_snippet': snippets.get(line_number),
+                'recommendation': rule['recommendation']
+            })
     
     except Exception as e:
         logger.error(f"Error analyzing JavaScript file {relative_path}: {str(e)}")
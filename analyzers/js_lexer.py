@@ -0,0 +1,120 @@
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Token classes of JavaScript/TypeScript, each match consuming the whitespace
+# before the token; comments are matched so they can be skipped. Unterminated
+# comments and strings fall through to single characters, which keeps JSX
+# text and malformed files tokenizable.
+JS_TOKEN_PATTERN = re.compile(r'''
+  \s*(?:
+    (?P<comment>//[^\n]*|/\*.*?\*/)
+  | (?P<string>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+  | (?P<template>`)
+  | (?P<ident>(?:[^\W\d]|\$)[\w$]*)
+  | (?P<number>\d[\w.]*|\.\d\w*)
+  | (?P<op>===|!==|\.\.\.|\?\.|=>|==|!=|&&|\|\||\?\?|\+\+|--|[-+*/%&|^<>!=?]=|[^\s\w])
+  )
+''', re.S | re.X)
+
+# Body of a regular expression literal, starting at its opening slash
+JS_REGEX_PATTERN = re.compile(r'/(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[\w$]*')
+
+# Text of a template literal up to its end or the next substitution
+JS_TEMPLATE_CHUNK_PATTERN = re.compile(r'(?:[^`\\$]|\\.|\$(?!\{))*', re.S)
+
+# Keywords after which a slash starts a regular expression, not a division
+REGEX_PRECEDING_KEYWORDS = frozenset((
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+    'throw', 'case', 'do', 'else', 'yield', 'await'
+))
+
+# Tokens after which a slash is a division
+DIVISION_PRECEDING_OPS = frozenset((')', ']', '}'))
+
+SKIPPED_KINDS = ('comment',)
+
+def _regex_allowed(previous):
+    if previous is None:
+        return True
+    kind, value, _ = previous
+    if kind == 'ident':
+        return value in REGEX_PRECEDING_KEYWORDS
+    if kind == 'op':
+        return value not in DIVISION_PRECEDING_OPS
+    return False
+
+def tokenize(text):
+    """
+    Split JavaScript/TypeScript source into tokens in a single pass
+
+    Comments and whitespace are dropped. String, template and regular
+    expression literals become single tokens, so their contents never look
+    like code; the expressions inside template substitutions are tokenized
+    as code.
+
+    Args:
+        text (str): Source code
+
+    Returns:
+        list: (kind, value, offset) tuples, kind being one of 'string',
+        'regex', 'ident', 'number' or 'op'
+    """
+    tokens = []
+    match_token = JS_TOKEN_PATTERN.match
+    match_regex = JS_REGEX_PATTERN.match
+    match_chunk = JS_TEMPLATE_CHUNK_PATTERN.match
+    length = len(text)
+    previous = None
+    # Open brace count of each template substitution being tokenized
+    substitutions = []
+    pos = 0
+
+    while pos < length:
+        match = match_token(text, pos)
+        if match is None:
+            # Only whitespace is left
+            break
+        kind = match.lastgroup
+        value = match.group(kind)
+
+        if kind in SKIPPED_KINDS:
+            pos = match.end()
+            continue
+        pos = match.start(kind)
+
+        if kind == 'template' or (kind == 'op' and value == '}' and substitutions and substitutions[-1] == 0):
+            # Start of a template literal, or end of one of its substitutions
+            if kind == 'op':
+                substitutions.pop()
+            start = pos
+            chunk = match_chunk(text, pos + 1)
+            end = chunk.end()
+            if text.startswith('${', end):
+                substitutions.append(0)
+                pos = end + 2
+            else:
+                pos = min(end + 1, length)
+            previous = ('string', text[start:pos], start)
+            tokens.append(previous)
+            continue
+
+        if kind == 'op':
+            if value == '/' and _regex_allowed(previous):
+                regex = match_regex(text, pos)
+                if regex:
+                    previous = ('regex', regex.group(), pos)
+                    tokens.append(previous)
+                    pos = regex.end()
+                    continue
+            elif substitutions and value == '{':
+                substitutions[-1] += 1
+            elif substitutions and value == '}':
+                substitutions[-1] -= 1
+
+        previous = (kind, value, pos)
+        tokens.append(previous)
+        pos = match.end()
+
+    return tokens
@@ -1,7 +1,8 @@
-import re
 import ast
 import logging
-from analyzers.common_analyzer import get_code_snippet
+from analyzers.file_context import FileContext
+from analyzers.rule_compiler import compile_rules
+from analyzers.ast_rules import AstRuleRegistry
 
 logger = logging.getLogger(__name__)
 
@@ -44,76 +45,133 @@ PYTHON_PATTERNS = [
     }
 ]
 
-class PythonAstVisitor(ast.NodeVisitor):
-    def __init__(self, file_path):
-        self.bugs = []
-        self.file_path = file_path
-    
-    def visit_Compare(self, node):
-        """Check for identity comparisons with literals"""
-        for op in node.ops:
-            if isinstance(op, (ast.Is, ast.IsNot)):
-                for expr in [node.left] + node.comparators:
-                    if isinstance(expr, (ast.Constant, ast.Num, ast.Str, ast.NameConstant)):
-                        self.bugs.append({
-                            'line_number': node.lineno,
-                            'bug_type': 'Identity Comparison with Literal',
-                            'severity': 'medium',
-                            'description': 'Using "is" or "is not" with literals can lead to unexpected results. Use "==" or "!=" instead.',
-                            'code_snippet': get_code_snippet(self.file_path, node.lineno),
-                            'recommendation': 'Replace "is" with "==" or "is not" with "!=" when comparing with literals.'
-                        })
-        self.generic_visit(node)
-    
-    def visit_BinOp(self, node):
-        """Check for potential bugs in binary operations"""
-        if isinstance(node.op, ast.Div):
-            self.bugs.append({
-                'line_number': node.lineno,
-                'bug_type': 'Potential Division by Zero',
-                'severity': 'medium',
-                'description': 'Division operation that might cause a ZeroDivisionError.',
-                'code_snippet': get_code_snippet(self.file_path, node.lineno),
-                'recommendation': 'Add a check to ensure the denominator is not zero before division.'
-            })
-        self.generic_visit(node)
-    
-    def visit_Try(self, node):
-        """Check for potential issues in try-except blocks"""
-        for handler in node.handlers:
-            if handler.type is None:
-                self.bugs.append({
-                    'line_number': handler.lineno,
-                    'bug_type': 'Bare Except',
-                    'severity': 'high',
-                    'description': 'Using bare except clause will catch all exceptions, including KeyboardInterrupt and SystemExit.',
-                    'code_snippet': get_code_snippet(self.file_path, handler.lineno),
-                    'recommendation': 'Specify the exceptions you want to catch, e.g., except Exception:'
-                })
-        self.generic_visit(node)
-    
-    def visit_Import(self, node):
-        """Check for potentially dangerous imports"""
-        dangerous_imports = ['pickle', 'marshal', 'shelve']
-        for alias in node.names:
-            if alias.name in dangerous_imports:
-                self.bugs.append({
-                    'line_number': node.lineno,
-                    'bug_type': 'Dangerous Import',
-                    'severity': 'medium',
-                    'description': f'Importing {alias.name} can be insecure when used with untrusted data.',
-                    'code_snippet': get_code_snippet(self.file_path, node.lineno),
-                    'recommendation': f'Be careful when using {alias.name} with data from untrusted sources.'
-                })
-        self.generic_visit(node)
+# Applied line by line only to files that cannot be parsed; parsed files are
+# checked by the AST rules below, which skip comments and unrelated strings
+PYTHON_RULES = compile_rules(PYTHON_PATTERNS)
+
+PYTHON_AST_RULES = AstRuleRegistry()
+
+# Calls reported as command execution, as (module, function)
+COMMAND_EXECUTION_CALLS = {('os', 'system'), ('subprocess', 'call'), ('subprocess', 'Popen')}
+
+# Modules that are unsafe to use with untrusted data
+DANGEROUS_IMPORTS = ('pickle', 'marshal', 'shelve')
 
-def analyze_python_file(full_path, relative_path):
+@PYTHON_AST_RULES.register(
+    ast.Compare,
+    bug_type='Identity Comparison with Literal',
+    severity='medium',
+    description='Using "is" or "is not" with literals can lead to unexpected results. Use "==" or "!=" instead.',
+    recommendation='Replace "is" with "==" or "is not" with "!=" when comparing with literals.'
+)
+def check_identity_comparison(node):
+    """Check for identity comparisons with literals"""
+    for op in node.ops:
+        if isinstance(op, (ast.Is, ast.IsNot)):
+            for expr in [node.left] + node.comparators:
+                if isinstance(expr, ast.Constant):
+                    yield node.lineno, {}
+
+@PYTHON_AST_RULES.register(
+    ast.BinOp,
+    bug_type='Potential Division by Zero',
+    severity='medium',
+    description='Division operation that might cause a ZeroDivisionError.',
+    recommendation='Add a check to ensure the denominator is not zero before division.'
+)
+def check_division(node):
+    """Check for potential bugs in binary operations"""
+    if isinstance(node.op, ast.Div):
+        yield node.lineno, {}
+
+@PYTHON_AST_RULES.register(
+    ast.ExceptHandler,
+    bug_type='Bare Except',
+    severity='high',
+    description='Using bare except clause will catch all exceptions, including KeyboardInterrupt and SystemExit.',
+    recommendation='Specify the exceptions you want to catch, e.g., except Exception:'
+)
+def check_bare_except(node):
+    """Check for except clauses without an exception type"""
+    if node.type is None:
+        yield node.lineno, {}
+
+@PYTHON_AST_RULES.register(
+    ast.Call,
+    bug_type='Use of exec()',
+    severity='critical',
+    description='Use of exec() function can be dangerous and lead to code injection vulnerabilities.',
+    recommendation='Avoid using exec() and find a safer alternative.'
+)
+def check_exec(node):
+    """Check for calls to exec()"""
+    func = node.func
+    if (isinstance(func, ast.Name) and func.id == 'exec') or (isinstance(func, ast.Attribute) and func.attr == 'exec'):
+        yield node.lineno, {}
+
+@PYTHON_AST_RULES.register(
+    ast.ImportFrom,
+    bug_type='Wildcard Import',
+    severity='medium',
+    description='Wildcard imports make it unclear which names are present in the namespace.',
+    recommendation='Import only the specific names you need.'
+)
+def check_wildcard_import(node):
+    """Check for `from module import *`"""
+    if any(alias.name == '*' for alias in node.names):
+        yield node.lineno, {}
+
+@PYTHON_AST_RULES.register(
+    ast.Constant,
+    bug_type='Path Traversal',
+    severity='high',
+    description='Potential path traversal vulnerability.',
+    recommendation='Validate and sanitize file paths to prevent directory traversal attacks.'
+)
+def check_path_traversal(node):
+    """Check for string literals containing parent directory references"""
+    value = node.value
+    if isinstance(value, bytes):
+        value = value.decode('latin-1')
+    if isinstance(value, str) and ('../' in value or '..\\' in value):
+        yield node.lineno, {}
+
+@PYTHON_AST_RULES.register(
+    ast.Call,
+    bug_type='Command Execution',
+    severity='high',
+    description='Use of system commands may lead to command injection vulnerabilities.',
+    recommendation='Validate and sanitize user input before using it in commands.'
+)
+def check_command_execution(node):
+    """Check for calls running system commands"""
+    func = node.func
+    if isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name):
+        if (func.value.id, func.attr) in COMMAND_EXECUTION_CALLS:
+            yield node.lineno, {}
+
+@PYTHON_AST_RULES.register(
+    ast.Import,
+    bug_type='Dangerous Import',
+    severity='medium',
+    description='Importing {name} can be insecure when used with untrusted data.',
+    recommendation='Be careful when using {name} with data from untrusted sources.'
+)
+def check_dangerous_import(node):
+    """Check for potentially dangerous imports"""
+    for alias in node.names:
+        if alias.name in DANGEROUS_IMPORTS:
+            yield node.lineno, {'name': alias.name}
+
+def analyze_python_file(full_path, relative_path, file_context=None):
     """
     Analyze a Python file for bugs and issues
     
     Args:
         full_path (str): Full path to the file
         relative_path (str): Path relative to repository root
+        file_context (FileContext): Already loaded file, read from full_path
+            when not supplied
         
     Returns:
         list: Found bugs
@@ -121,33 +179,17 @@ def analyze_python_file(full_path, relative_path):
     bugs = []
     
     try:
-        with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-            lines = content.split('\n')
+        if file_context is None:
+            file_context = FileContext.load(full_path, relative_path)
         
-        # Pattern-based checks
-        for pattern_info in PYTHON_PATTERNS:
-            pattern = pattern_info['pattern']
-            for i, line in enumerate(lines):
-                match = re.search(pattern, line)
-                if match:
-                    line_number = i + 1
-                    bug = {
-                        'line_number': line_number,
-                        'bug_type': pattern_info['bug_type'],
-                        'severity': pattern_info['severity'],
-                        'description': pattern_info['description'],
-                        'code_snippet': get_code_snippet(full_path, line_number),
-                        'recommendation': pattern_info['recommendation']
-                    }
-                    bugs.append(bug)
+        content = file_context.text
+        lines = file_context.lines
+        snippets = file_context.snippets
         
-        # AST-based checks
+        # AST-based checks, all rules in a single traversal
         try:
             tree = ast.parse(content)
-            visitor = PythonAstVisitor(full_path)
-            visitor.visit(tree)
-            bugs.extend(visitor.bugs)
+            bugs.extend(PYTHON_AST_RULES.run(tree, snippets))
         except SyntaxError as e:
             logger.warning(f"Syntax error in {relative_path}: {str(e)}")
             bugs.append({
@@ -155,9 +197,20 @@ def analyze_python_file(full_path, relative_path):
                 'bug_type': 'Syntax Error',
                 'severity': 'high',
                 'description': f'Python syntax error: {str(e)}',
-                'code_snippet': get_code_snippet(full_path, getattr(e, 'lineno', 1)),
+                'code_snippet': snippets.get(getattr(e, 'lineno', 1)),
                 'recommendation': 'Fix the syntax error to ensure the code can be interpreted.'
             })
+
+            # Unparseable files still get the pattern-based checks
+            for pattern_info, line_number in PYTHON_RULES.scan(lines, file_context.text):
+                bugs.append({
+                    'line_number': line_number,
+                    'bug_type': pattern_info['bug_type'],
+                    'severity': pattern_info['severity'],
+                    'description': pattern_info['description'],
+                    'code_snippet': snippets.get(line_number),
+                    'recommendation': pattern_info['recommendation']
+                })
     
     except Exception as e:
         logger.error(f"Error analyzing Python file {relative_path}: {str(e)}")
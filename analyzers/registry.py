@@ -0,0 +1,161 @@
+import logging
+import importlib
+import threading
+from importlib.metadata import entry_points
+
+logger = logging.getLogger(__name__)
+
+# Entry point group third-party packages use to plug in analyzers; the entry
+# point name is the language and its value the analyzer function
+ENTRY_POINT_GROUP = 'codebughunter.analyzers'
+
+# Built-in language analyzers as "module:function", imported on first use
+BUILTIN_ANALYZERS = {
+    'Python': 'analyzers.python_analyzer:analyze_python_file',
+    'JavaScript': 'analyzers.javascript_analyzer:analyze_javascript_file',
+    'TypeScript': 'analyzers.javascript_analyzer:analyze_javascript_file',
+    'React': 'analyzers.javascript_analyzer:analyze_javascript_file',
+    'React TypeScript': 'analyzers.javascript_analyzer:analyze_javascript_file',
+    'Go': 'analyzers.go_analyzer:analyze_go_file'
+}
+
+class AnalyzerRegistry:
+    """
+    Mapping from language to analyzer, imported the first time it is needed
+
+    Analyzers are declared as "module:function" targets: the built-in table
+    plus any entry points in the codebughunter.analyzers group, which take
+    precedence for their language. Nothing is imported until a file of the
+    language is analyzed, so scans only load the analyzers they use.
+
+    An analyzer is called as analyzer(full_path, relative_path, file_context)
+    and returns a list of findings.
+    """
+
+    def __init__(self, targets=None, group=ENTRY_POINT_GROUP):
+        """
+        Args:
+            targets (dict): "module:function" keyed by language, defaults to
+                BUILTIN_ANALYZERS
+            group (str): Entry point group to discover plugins in, None to
+                disable discovery
+        """
+        self.builtin = dict(BUILTIN_ANALYZERS if targets is None else targets)
+        self.group = group
+        self.targets = None
+        self.loaded = {}
+        self.lock = threading.Lock()
+
+    def _discover(self):
+        if self.targets is not None:
+            return self.targets
+
+        targets = {language: (target, None) for language, target in self.builtin.items()}
+        if self.group:
+            for entry_point in entry_points(group=self.group):
+                dist = getattr(entry_point, 'dist', None)
+                version = f"{dist.name} {dist.version}" if dist else None
+                targets[entry_point.name] = (entry_point, version)
+                logger.info(f"Registered {entry_point.name} analyzer from entry point {entry_point.value}")
+
+        self.targets = targets
+        return targets
+
+    def get(self, language):
+        """
+        Get the analyzer of a language, importing it on first use
+
+        Args:
+            language (str): Detected language of a file
+
+        Returns:
+            callable or None: The analyzer, None if the language has none or
+            it failed to load
+        """
+        try:
+            return self.loaded[language]
+        except KeyError:
+            pass
+
+        with self.lock:
+            if language in self.loaded:
+                return self.loaded[language]
+
+            entry = self._discover().get(language)
+            analyzer = None
+            if entry is not None:
+                target, _ = entry
+                try:
+                    analyzer = load_target(target)
+                except Exception as e:
+                    logger.error(f"Unable to load the {language} analyzer: {str(e)}")
+
+            self.loaded[language] = analyzer
+            return analyzer
+
+    def preload(self, languages):
+        """
+        Import the analyzers of the given languages up front
+
+        Args:
+            languages (iterable): Languages present in a scan
+        """
+        for language in languages:
+            self.get(language)
+
+    def describe(self):
+        """
+        Describe the registered analyzers without importing them
+
+        Returns:
+            list: Sorted "language=target" strings, with the distribution
+            version of plugin analyzers
+        """
+        described = []
+        for language, (target, version) in self._discover().items():
+            value = target if isinstance(target, str) else target.value
+            described.append(f"{language}={value}" + (f" ({version})" if version else ''))
+        return sorted(described)
+
+def load_target(target):
+    """
+    Import the analyzer an entry point or "module:function" target refers to
+
+    Args:
+        target (EntryPoint or str): Analyzer declaration
+
+    Returns:
+        callable: The analyzer
+    """
+    if not isinstance(target, str):
+        return target.load()
+
+    module_name, _, attribute = target.partition(':')
+    obj = importlib.import_module(module_name)
+    for name in attribute.split('.'):
+        obj = getattr(obj, name)
+    return obj
+
+ANALYZERS = AnalyzerRegistry()
+
+def get_analyzer(language):
+    """
+    Get the analyzer of a language from the default registry
+
+    Args:
+        language (str): Detected language of a file
+
+    Returns:
+        callable or None: The analyzer, None if the language has none
+    """
+    return ANALYZERS.get(language)
+
+def preload_analyzers(languages):
+    """
+    Import the analyzers of the languages present in a scan; used as the
+    initializer of analysis worker processes
+
+    Args:
+        languages (iterable): Languages present in the scan
+    """
+    ANALYZERS.preload(languages)
@@ -0,0 +1,332 @@
+import re
+import logging
+
+# Required literals are read from the regex parser, a private API of the re module; without
+# it, rules run without the literal prefilter and are matched with plain re
+try:
+    from re import _parser as sre_parse, _constants as sre_constants
+except ImportError:
+    sre_parse = sre_constants = None
+
+logger = logging.getLogger(__name__)
+
+# Shorter required literals occur almost everywhere and would not filter anything
+MIN_LITERAL_LENGTH = 2
+
+# Combined matchers kept per distinct set of active rules
+MAX_SUBSET_MATCHERS = 256
+
+REPEAT_OPCODES = tuple(
+    getattr(sre_constants, name) for name in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT')
+    if hasattr(sre_constants, name)
+) if sre_constants else ()
+
+class CompiledRuleSet:
+    """
+    Precompiled single-pass matcher for a table of pattern rules
+
+    Every rule pattern is folded into one alternation with a named group per
+    rule, so each line is searched once no matter how many rules exist. A line
+    accepted by the combined matcher is then checked against the individual
+    rules, because an alternation only reports one rule per position and
+    rules may overlap on the same line.
+
+    Each rule also carries the literals any of its matches must contain,
+    declared under 'literals' or extracted from the pattern. A substring
+    search of the whole file text per literal, done in C, finds which of
+    them occur; rules whose literals are all absent are skipped, and files
+    without any literal are not scanned line by line at all.
+    """
+
+    def __init__(self, patterns):
+        self.rules = list(patterns)
+        self.compiled = [re.compile(rule['pattern']) for rule in self.rules]
+        self.literals = [get_required_literals(rule) for rule in self.rules]
+        self.combined = self._compile_combined(range(len(self.rules)))
+        self.subset_matchers = {}
+        self._compile_prefilter()
+        self.buffer_finders = None
+
+    def _compile_combined(self, indices):
+        """
+        Build the combined named-group alternation for a set of rules
+
+        Args:
+            indices (iterable): Indices of the rules to combine
+
+        Returns:
+            re.Pattern or None: Combined matcher, or None if the rules cannot
+            be merged (e.g. they use numbered backreferences)
+        """
+        alternatives = [f"(?P<rule_{i}>{self.rules[i]['pattern']})" for i in indices]
+        if not alternatives:
+            return None
+
+        try:
+            return re.compile('|'.join(alternatives))
+        except re.error as e:
+            logger.warning(f"Unable to combine rule patterns, falling back to per-rule matching: {str(e)}")
+            return None
+
+    def _compile_prefilter(self):
+        """Build the literal -> rules index used by the prefilter"""
+        # Rules without literals can match anything and are always active
+        self.unfiltered = tuple(i for i, literals in enumerate(self.literals) if literals is None)
+        self.literal_rules = {}
+        for index, literals in enumerate(self.literals):
+            for literal in literals or ():
+                self.literal_rules.setdefault(literal, set()).add(index)
+
+    def active_rules(self, text):
+        """
+        Find the rules that can possibly match somewhere in a text
+
+        Args:
+            text (str): Full text of the file
+
+        Returns:
+            tuple: Indices of the rules to run, in table order
+        """
+        if not self.literal_rules:
+            return self.unfiltered
+
+        # One substring search per literal beats a regex alternation of all
+        # literals; literals whose rules are already active are not searched
+        active = set(self.unfiltered)
+        for literal, indices in self.literal_rules.items():
+            if not indices <= active and literal in text:
+                active |= indices
+
+        return tuple(sorted(active))
+
+    def _matcher_for(self, active):
+        """
+        Get the combined matcher of a subset of rules, compiled once per subset
+
+        Args:
+            active (tuple): Indices of the active rules
+
+        Returns:
+            re.Pattern or None: Combined matcher of the active rules
+        """
+        if len(active) == len(self.rules):
+            return self.combined
+
+        try:
+            return self.subset_matchers[active]
+        except KeyError:
+            matcher = self._compile_combined(active)
+            if len(self.subset_matchers) < MAX_SUBSET_MATCHERS:
+                self.subset_matchers[active] = matcher
+            return matcher
+
+    def scan(self, lines, text=None):
+        """
+        Scan lines once and collect the hits of every rule
+
+        Args:
+            lines (list): Lines of the file, without line terminators
+            text (str): The lines joined with newlines, if already available
+
+        Returns:
+            list: (rule, line_number) tuples, grouped by rule in table order
+            and by line number within a rule
+        """
+        if not self.rules:
+            return []
+
+        if text is None:
+            text = '\n'.join(lines)
+        active = self.active_rules(text)
+        if not active:
+            return []
+
+        hits = {index: [] for index in active}
+        combined = self._matcher_for(active)
+        compiled = [(index, self.compiled[index]) for index in active]
+
+        for i, line in enumerate(lines):
+            if combined is not None:
+                match = combined.search(line)
+                if not match:
+                    continue
+                name = match.lastgroup or ''
+                first = int(name[len('rule_'):]) if name.startswith('rule_') else -1
+            else:
+                first = -1
+
+            line_number = i + 1
+            for index, pattern in compiled:
+                if index == first or pattern.search(line):
+                    hits[index].append(line_number)
+
+        return [(self.rules[index], line_number)
+                for index in active
+                for line_number in hits[index]]
+
+    def _compile_buffer_finders(self):
+        """
+        Build the bytes patterns locating candidate lines in a raw buffer
+
+        Returns:
+            list: Encoded literals and compiled bytes patterns; a line can
+            only match a rule if one of them occurs within it
+        """
+        finders = [literal.encode('utf-8') for literal in self.literal_rules]
+
+        for index in self.unfiltered:
+            try:
+                finders.append(re.compile(self.rules[index]['pattern'].encode('utf-8')))
+            except re.error as e:
+                logger.warning(f"Rule {self.rules[index]['bug_type']} cannot scan raw buffers: {str(e)}")
+
+        return finders
+
+    def scan_buffer(self, buffer, line_index):
+        """
+        Scan a raw buffer without decoding it or splitting it into lines
+
+        Literal searches and bytes patterns locate the candidate lines over
+        the whole buffer; only those lines are decoded and matched like in
+        scan, so the hits are the same as scanning the decoded lines.
+
+        Args:
+            buffer (bytes or mmap.mmap): File contents
+            line_index (LineIndex): Line index of the buffer
+
+        Returns:
+            list: (rule, line_number) tuples, grouped by rule in table order
+            and by line number within a rule
+        """
+        if not self.rules:
+            return []
+        if self.buffer_finders is None:
+            self.buffer_finders = self._compile_buffer_finders()
+
+        # Start offsets of every line holding a literal or an unfiltered match
+        line_starts = set()
+        size = len(buffer)
+        for finder in self.buffer_finders:
+            pos = 0
+            while pos <= size:
+                if isinstance(finder, bytes):
+                    found = buffer.find(finder, pos)
+                else:
+                    match = finder.search(buffer, pos)
+                    found = match.start() if match else -1
+                if found < 0:
+                    break
+                line_starts.add(buffer.rfind(b'\n', 0, found) + 1)
+                end = buffer.find(b'\n', found)
+                if end < 0:
+                    break
+                pos = end + 1
+
+        hits = [[] for _ in self.rules]
+        for start in sorted(line_starts):
+            end = buffer.find(b'\n', start)
+            if end < 0:
+                end = size
+            line = buffer[start:end].decode('utf-8', errors='ignore').removesuffix('\r')
+            line_number = line_index.line_number_at(start)
+
+            for index in self.active_rules(line):
+                if self.compiled[index].search(line):
+                    hits[index].append(line_number)
+
+        return [(self.rules[index], line_number)
+                for index, line_numbers in enumerate(hits)
+                for line_number in line_numbers]
+
+def get_required_literals(rule):
+    """
+    Get the literals at least one of which every match of a rule contains
+
+    Args:
+        rule (dict): Rule with a 'pattern' and optionally explicit 'literals'
+
+    Returns:
+        frozenset or None: Required literals, None if the rule must always run
+    """
+    if rule.get('literals'):
+        return frozenset(rule['literals'])
+    if sre_parse is None:
+        return None
+
+    try:
+        parsed = sre_parse.parse(rule['pattern'])
+        # Case-insensitive patterns are not prefiltered
+        if parsed.state.flags & re.IGNORECASE:
+            return None
+        literals = _extract_literals(parsed)
+    except re.error:
+        return None
+    except (AttributeError, TypeError, ValueError) as e:
+        # The private parser API changed shape; match this rule without the prefilter
+        logger.warning(f"Unable to extract literals from pattern {rule['pattern']!r}: {str(e)}")
+        return None
+
+    if not literals or min(len(literal) for literal in literals) < MIN_LITERAL_LENGTH:
+        return None
+    return frozenset(literals)
+
+def _extract_literals(items):
+    """
+    Extract the most selective required literal set from a parsed pattern
+
+    Every literal run and every mandatory group or alternation of the
+    sequence yields a candidate set; the one whose shortest literal is the
+    longest is chosen.
+
+    Args:
+        items (iterable): Parsed (opcode, argument) items of a sequence
+
+    Returns:
+        set or None: Literals any match contains one of, None if there are none
+    """
+    candidates = []
+    run = []
+
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            run.append(chr(av))
+            continue
+
+        if run:
+            candidates.append({''.join(run)})
+            run = []
+
+        if op is sre_constants.SUBPATTERN:
+            _, add_flags, _, sub = av
+            if not add_flags & re.IGNORECASE:
+                candidates.append(_extract_literals(sub))
+        elif op is sre_constants.ATOMIC_GROUP:
+            candidates.append(_extract_literals(av))
+        elif op is sre_constants.BRANCH:
+            branches = [_extract_literals(branch) for branch in av[1]]
+            if all(branches):
+                candidates.append(set().union(*branches))
+        elif op in REPEAT_OPCODES:
+            minimum, _, sub = av
+            if minimum >= 1:
+                candidates.append(_extract_literals(sub))
+
+    if run:
+        candidates.append({''.join(run)})
+
+    candidates = [candidate for candidate in candidates if candidate]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda candidate: min(len(literal) for literal in candidate))
+
+def compile_rules(patterns):
+    """
+    Compile a pattern table into a single-pass rule set
+
+    Args:
+        patterns (list): Rule dictionaries with at least a 'pattern' key
+
+    Returns:
+        CompiledRuleSet: The compiled rule set
+    """
+    return CompiledRuleSet(patterns)
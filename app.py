@@ -1,5 +1,6 @@
 import os
 import logging
+import multiprocessing
 
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
@@ -30,6 +31,58 @@ app.config["REPO_TEMP_DIR"] = os.path.join(os.path.dirname(os.path.abspath(__fil
 if not os.path.exists(app.config["REPO_TEMP_DIR"]):
     os.makedirs(app.config["REPO_TEMP_DIR"])
 
+# Number of worker processes each scan analyzes files with (1 runs analysis in-process); every
+# running scan starts its own pool, so up to SCAN_WORKERS x ANALYSIS_WORKERS processes per web process
+app.config["ANALYSIS_WORKERS"] = int(os.environ.get("ANALYSIS_WORKERS", 1))
+
+# Files above LARGE_FILE_THRESHOLD are memory-mapped and scanned by pattern rules only;
+# files above MAX_FILE_SIZE are recorded as skipped instead of analyzed
+app.config["LARGE_FILE_THRESHOLD"] = int(os.environ.get("LARGE_FILE_THRESHOLD", 8 * 1024 * 1024))  # 0 to disable
+app.config["MAX_FILE_SIZE"] = int(os.environ.get("MAX_FILE_SIZE", 100 * 1024 * 1024))  # 0 for no limit
+
+# Files ignored by the repository's .gitignore files are not scanned; SCAN_PATHSPECS is a
+# comma-separated list of globs restricting the scan, "!" or ":!" prefixed ones excluding paths
+app.config["SCAN_USE_GITIGNORE"] = os.environ.get("SCAN_USE_GITIGNORE", "true").lower() in ("1", "true", "yes")
+app.config["SCAN_PATHSPECS"] = [spec.strip() for spec in os.environ.get("SCAN_PATHSPECS", "").split(",") if spec.strip()]
+
+# Number of findings written per batched INSERT during a scan, and how long they may wait for one
+app.config["FINDINGS_BATCH_SIZE"] = int(os.environ.get("FINDINGS_BATCH_SIZE", 1000))
+app.config["FINDINGS_FLUSH_INTERVAL"] = float(os.environ.get("FINDINGS_FLUSH_INTERVAL", 2.0))  # seconds a finding may stay buffered
+
+# Rows fetched from the database per round trip when streaming exports of scans and findings,
+# and when generating individual bug reports
+app.config["EXPORT_CHUNK_SIZE"] = int(os.environ.get("EXPORT_CHUNK_SIZE", 1000))
+
+# Individual bug report generations that may run at once in background workers, and the
+# threads each one writes report files with
+app.config["REPORT_WORKERS"] = int(os.environ.get("REPORT_WORKERS", 1))
+app.config["REPORT_WRITER_THREADS"] = int(os.environ.get("REPORT_WRITER_THREADS", 4))
+
+# Content-addressed store of individual bug report artifacts and their gzip variants, served
+# with strong ETags and cached as immutable for REPORT_ARTIFACT_MAX_AGE seconds
+app.config["REPORT_ARTIFACT_DIR"] = os.environ.get(
+    "REPORT_ARTIFACT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "objects")
+)
+app.config["REPORT_ARTIFACT_MAX_AGE"] = int(os.environ.get("REPORT_ARTIFACT_MAX_AGE", 365 * 24 * 3600))
+
+# Number of scans that may run at once in background workers
+app.config["SCAN_WORKERS"] = int(os.environ.get("SCAN_WORKERS", 2))
+
+# Queued or running scans no process has refreshed for STALE_SCAN_AGE seconds belong to a process
+# that went away and are marked failed, at startup and by the heartbeat of running scan queues
+app.config["STALE_SCAN_AGE"] = int(os.environ.get("STALE_SCAN_AGE", 300))  # 0 to never fail them
+
+# Reuse findings of unchanged files (same git blob and analyzer version) across scans
+app.config["FINDINGS_CACHE_ENABLED"] = os.environ.get("FINDINGS_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+app.config["FINDINGS_CACHE_MAX_BYTES"] = int(os.environ.get("FINDINGS_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Bare mirrors of scanned repositories under REPO_TEMP_DIR/mirrors, refreshed with a fetch on each scan
+app.config["MIRROR_CACHE_ENABLED"] = os.environ.get("MIRROR_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+app.config["MIRROR_CACHE_MAX_BYTES"] = int(os.environ.get("MIRROR_CACHE_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+app.config["MIRROR_CLONE_FILTER"] = os.environ.get("MIRROR_CLONE_FILTER", "blob:none")  # empty for full clones
+app.config["MIRROR_CLONE_DEPTH"] = int(os.environ.get("MIRROR_CLONE_DEPTH", 0))  # 0 for full history
+app.config["NO_CHECKOUT_SCANS"] = os.environ.get("NO_CHECKOUT_SCANS", "false").lower() in ("1", "true", "yes")
+
 # initialize the app with the extension
 db.init_app(app)
 
@@ -39,9 +92,17 @@ with app.app_context():
     
     # Create all tables
     db.create_all()
+    models.upgrade_schema()
     
     # Import and register routes
     from routes import register_routes
     register_routes(app)
+    
+    # Record a state on scans stored before scans had one, and fail those a process left unfinished;
+    # analysis worker processes started from this one skip it
+    from services.scan_jobs import backfill_scan_states, fail_interrupted_scans
+    backfill_scan_states()
+    if app.config["STALE_SCAN_AGE"] and multiprocessing.parent_process() is None:
+        fail_interrupted_scans(app.config["STALE_SCAN_AGE"])
 
 logger.info("Application initialized successfully")
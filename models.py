@@ -19,13 +19,25 @@ class Scan(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     repository_id = db.Column(db.Integer, db.ForeignKey('repository.id'), nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    status = db.Column(db.String(20), default='queued')  # queued, running, completed, failed; NULL for scans recorded before it
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # last change to the row, for conditional GETs
     total_files = db.Column(db.Integer, default=0)
     analyzed_files = db.Column(db.Integer, default=0)
     total_bugs = db.Column(db.Integer, default=0)
+    commit_sha = db.Column(db.String(40))  # HEAD commit, recorded once the scan completes
+    ruleset_version = db.Column(db.String(64))  # analyzer rule set that produced the findings
+    options_fingerprint = db.Column(db.String(64))  # file listing options and size limits of the scan
+    scan_mode = db.Column(db.String(20), default='full')  # full, incremental
+    base_scan_id = db.Column(db.Integer, db.ForeignKey('scan.id'))  # scan an incremental scan builds on
     
     # Relationship with bugs
     bugs = db.relationship('Bug', backref='scan', lazy=True, cascade="all, delete-orphan")
     
+    # Keyset pagination of the scans listing, per repository
+    __table_args__ = (
+        db.Index('ix_scan_repository_id_id', 'repository_id', 'id'),
+    )
+    
     def __repr__(self):
         return f'<Scan {self.id} for Repository {self.repository_id}>'
 
@@ -41,6 +53,13 @@ class Bug(db.Model):
     recommendation = db.Column(db.Text)
     language = db.Column(db.String(30))
     
+    # Keyset pagination of a scan's findings: in id order, by severity, and by file path
+    __table_args__ = (
+        db.Index('ix_bug_scan_id_id', 'scan_id', 'id'),
+        db.Index('ix_bug_scan_id_severity_id', 'scan_id', 'severity', 'id'),
+        db.Index('ix_bug_scan_id_file_path', 'scan_id', 'file_path'),
+    )
+    
     def __repr__(self):
         return f'<Bug {self.id} in {self.file_path}>'
 
@@ -54,3 +73,63 @@ class LanguageStats(db.Model):
     
     def __repr__(self):
         return f'<LanguageStats {self.language} for Scan {self.scan_id}>'
+
+class ScanSummary(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    scan_id = db.Column(db.Integer, db.ForeignKey('scan.id'), nullable=False, unique=True)
+    severity_breakdown = db.Column(db.Text, nullable=False)  # JSON object: severity -> bug count
+    bug_types = db.Column(db.Text, nullable=False)  # JSON object: bug type -> bug count
+    most_affected_files = db.Column(db.Text, nullable=False)  # JSON object: file path -> bug count, top files only
+    critical_bugs = db.Column(db.Text, nullable=False)  # JSON list of the first critical findings
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # One summary per scan, removed with it
+    scan = db.relationship('Scan', backref=db.backref('summary', uselist=False, cascade="all, delete-orphan"))
+
+    def __repr__(self):
+        return f'<ScanSummary for Scan {self.scan_id}>'
+
+class FindingsCacheEntry(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    blob_sha = db.Column(db.String(40), nullable=False)
+    language = db.Column(db.String(30), nullable=False)
+    ruleset_version = db.Column(db.String(64), nullable=False)
+    line_count = db.Column(db.Integer, default=0)
+    findings = db.Column(db.Text, nullable=False)  # JSON list of analyzer findings
+    size = db.Column(db.Integer, default=0)  # bytes of findings JSON, used for eviction
+    last_used = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    __table_args__ = (
+        db.UniqueConstraint('blob_sha', 'language', 'ruleset_version'),
+    )
+    
+    def __repr__(self):
+        return f'<FindingsCacheEntry {self.blob_sha} ({self.language})>'
+
+def upgrade_schema():
+    """
+    Bring existing tables up to date with the models
+    
+    db.create_all() only creates missing tables, so columns and indexes added
+    to a model after its table was created are added here.
+    """
+    engine = db.engine
+    inspector = db.inspect(engine)
+    preparer = engine.dialect.identifier_preparer
+    
+    with engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.exec_driver_sql(
+                    f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} {column_type}"
+                )
+            
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
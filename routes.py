@@ -1,21 +1,33 @@
 import os
 import logging
-from flask import render_template, request, redirect, url_for, flash, jsonify, session, send_from_directory
+from flask import render_template, request, redirect, url_for, flash, jsonify, session, send_from_directory, send_file, abort, Response
+from werkzeug.http import is_resource_modified
+from sqlalchemy.orm import joinedload
 from app import db, app
 from models import Repository, Scan, Bug, LanguageStats
-from services.repository import clone_repository, get_repository_name, cleanup_repository
-from services.analyzer import analyze_repository
+from services.repository import get_repository_name
+from services.scan_jobs import enqueue_scan, get_scan_status
 from services.report_generator import generate_report
-from services.individual_report_generator import generate_individual_bug_reports
+from services.scan_summary import get_scan_summary
+from services.findings_query import FindingsFilter, parse_fields, parse_limit, decode_cursor, query_findings_page, findings_statement
+from services.findings_export import EXPORT_FORMATS, export_response
+from services.scan_query import ScansFilter, decode_scans_cursor, scans_statement, query_scans_page, scans_validators
+from services.individual_report_generator import REPORT_FORMATS
+from services.report_manifest import bundle_filename, manifest_filename, load_report_manifest
+from services.report_artifacts import ReportArtifactStore, DIGEST_PATTERN
+from services.report_jobs import enqueue_report_generation, get_report_status
 from urllib.parse import urlparse
 
 logger = logging.getLogger(__name__)
 
+# Individual bug reports listed per page
+REPORTS_PER_PAGE = 50
+
 def register_routes(app):
     @app.route('/')
     def index():
         # Get recent scans
-        recent_scans = Scan.query.order_by(Scan.timestamp.desc()).limit(5).all()
+        recent_scans = Scan.query.options(joinedload(Scan.repository)).order_by(Scan.id.desc()).limit(5).all()
         return render_template('index.html', recent_scans=recent_scans)
     
     @app.route('/analyze', methods=['POST'])
@@ -40,48 +52,30 @@ def register_routes(app):
                 repo_name = get_repository_name(repo_url)
                 repo = Repository(url=repo_url, name=repo_name, status='pending')
                 db.session.add(repo)
-                db.session.commit()
+            else:
+                repo.status = 'pending'
             
-            # Create a new scan
-            scan = Scan(repository_id=repo.id)
+            # Create a new scan; incremental scans only analyze files changed since the last scan
+            scan_mode = 'incremental' if request.form.get('scan_mode') == 'incremental' else 'full'
+            scan = Scan(repository=repo, scan_mode=scan_mode)
             db.session.add(scan)
             db.session.commit()
             
-            # Clone repository
-            repo.status = 'analyzing'
-            db.session.commit()
-            
-            repo_path = clone_repository(repo_url, os.path.join(app.config["REPO_TEMP_DIR"], str(repo.id)))
-            
-            # Analyze repository
-            result = analyze_repository(repo_path, scan.id)
-            
-            # Update scan with results
-            scan.total_files = result['total_files']
-            scan.analyzed_files = result['analyzed_files']
-            scan.total_bugs = result['total_bugs']
-            
-            # Update repository status
-            repo.status = 'completed'
-            repo.last_analyzed = scan.timestamp
-            db.session.commit()
-            
-            # Clean up repository
-            cleanup_repository(repo_path)
-            
-            # Redirect to results page
-            return redirect(url_for('results', scan_id=scan.id))
-            
+            # Clone and analysis run in a background worker
+            enqueue_scan(scan.id)
         except Exception as e:
-            logger.error(f"Error analyzing repository: {str(e)}")
-            flash(f'Error analyzing repository: {str(e)}', 'danger')
-            
-            # Update repository status to failed
-            if repo:
-                repo.status = 'failed'
-                db.session.commit()
-                
+            logger.error(f"Error queueing repository analysis: {str(e)}")
+            db.session.rollback()
+            flash(f'Error queueing analysis: {str(e)}', 'danger')
             return redirect(url_for('index'))
+        
+        flash(f'Analysis of {repo.name} has been queued', 'info')
+        return redirect(url_for('results', scan_id=scan.id))
+    
+    @app.route('/api/scan/<int:scan_id>/status')
+    def api_scan_status(scan_id):
+        scan = Scan.query.get_or_404(scan_id)
+        return jsonify(get_scan_status(scan))
     
     @app.route('/results/<int:scan_id>')
     def results(scan_id):
@@ -96,74 +90,162 @@ def register_routes(app):
         # Get language statistics
         language_stats = LanguageStats.query.filter_by(scan_id=scan_id).all()
         
-        # Generate summary report
-        report = generate_report(scan, bugs.items, language_stats)
+        # Generate summary report from the aggregates of the whole scan
+        scan_status = get_scan_status(scan)
+        summary = get_scan_summary(scan, completed=scan_status['state'] == 'completed')
+        report = generate_report(scan, language_stats, summary)
         
         return render_template('results.html', 
                               scan=scan, 
                               repo=repo, 
                               bugs=bugs, 
                               language_stats=language_stats,
-                              report=report)
+                              report=report,
+                              scan_status=scan_status)
+    
+    def export_format_and_compression():
+        """Export format from the format parameter, and whether the client accepts gzip"""
+        export_format = request.args.get('format', 'json')
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown format: {export_format}")
+        return export_format, request.accept_encodings['gzip'] > 0
     
     @app.route('/api/scans')
     def api_scans():
-        scans = Scan.query.order_by(Scan.timestamp.desc()).all()
-        result = []
-        for scan in scans:
-            repo = Repository.query.get(scan.repository_id)
-            result.append({
-                'id': scan.id,
-                'repository': repo.name,
-                'url': repo.url,
-                'timestamp': scan.timestamp.isoformat(),
-                'total_bugs': scan.total_bugs,
-                'total_files': scan.total_files
-            })
-        return jsonify(result)
+        """
+        List scans, newest first, a page at a time
+        
+        Query parameters: repository (repository IDs) and status (repeated
+        or comma-separated), since and until (ISO 8601 bounds of the scan
+        start time), limit and cursor. format=ndjson streams every matching
+        scan instead of a page.
+        
+        The body is a JSON array of scans, as before pagination. The cursor of
+        the next page is sent out of band, in the X-Next-Cursor header and as
+        a Link header with rel="next".
+        
+        Responses carry an ETag and Last-Modified; conditional requests are
+        answered with 304 Not Modified while no matching scan has changed.
+        """
+        try:
+            export_format, compress = export_format_and_compression()
+            filters = ScansFilter.from_args(request.args)
+            limit = parse_limit(request.args.get('limit'))
+            cursor = decode_scans_cursor(request.args.get('cursor'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        etag, last_modified = scans_validators(filters)
+        if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+            response = Response(status=304)
+        elif export_format == 'ndjson':
+            response = export_response(scans_statement(filters), export_format, compress)
+        else:
+            scans, next_cursor = query_scans_page(filters, cursor, limit)
+            response = jsonify(scans)
+            if next_cursor:
+                args = request.args.copy()
+                args['cursor'] = next_cursor
+                response.headers['X-Next-Cursor'] = next_cursor
+                response.headers['Link'] = f'<{url_for("api_scans", **args.to_dict(flat=False))}>; rel="next"'
+        
+        # Caches may keep the listing but must revalidate it on every use
+        response.set_etag(etag, weak=True)
+        response.last_modified = last_modified
+        response.cache_control.no_cache = True
+        return response
     
     @app.route('/api/scan/<int:scan_id>/bugs')
     def api_scan_bugs(scan_id):
-        bugs = Bug.query.filter_by(scan_id=scan_id).all()
-        result = []
-        for bug in bugs:
-            result.append({
-                'id': bug.id,
-                'file_path': bug.file_path,
-                'line_number': bug.line_number,
-                'bug_type': bug.bug_type,
-                'severity': bug.severity,
-                'description': bug.description,
-                'language': bug.language
-            })
-        return jsonify(result)
+        """
+        Stream all findings of a scan as a JSON array or NDJSON (format=ndjson)
+        
+        Accepts the severity, language, bug_type, path and fields parameters
+        of the findings API. The body is gzipped when the client accepts it.
+        """
+        try:
+            export_format, compress = export_format_and_compression()
+            filters = FindingsFilter.from_args(request.args)
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        statement = findings_statement(scan_id, filters, fields)
+        return export_response(statement, export_format, compress)
+        
+    @app.route('/api/scan/<int:scan_id>/findings')
+    def api_scan_findings(scan_id):
+        """
+        Page through the findings of a scan
+        
+        Query parameters: severity, language and bug_type (repeated or
+        comma-separated), path (file path prefix), fields (comma-separated
+        columns), limit and cursor (the next_cursor of the previous page).
+        """
+        scan = Scan.query.get_or_404(scan_id)
+        
+        try:
+            filters = FindingsFilter.from_args(request.args)
+            fields = parse_fields(request.args.get('fields'))
+            limit = parse_limit(request.args.get('limit'))
+            cursor = decode_cursor(request.args.get('cursor'), filters)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        findings, next_cursor = query_findings_page(scan.id, filters, fields, cursor, limit)
+        return jsonify({
+            'scan_id': scan.id,
+            'findings': findings,
+            'next_cursor': next_cursor
+        })
         
     @app.route('/scan/<int:scan_id>/generate-reports')
     def generate_reports(scan_id):
+        """
+        Queue the generation of the individual bug reports of a scan
+        
+        The format parameter selects one JSON file per bug (files, the
+        default) or a single ndjson or zip bundle for the scan.
+        """
         scan = Scan.query.get_or_404(scan_id)
         repo = Repository.query.get(scan.repository_id)
         
-        try:
-            # Generate individual bug reports
-            reports_count = generate_individual_bug_reports(scan_id, repo)
-            
-            flash(f'Successfully generated {reports_count} individual bug reports for {repo.name}', 'success')
-            
-            # Redirect to the individual reports page
-            return redirect(url_for('view_reports', scan_id=scan_id))
-        except Exception as e:
-            logger.error(f"Error generating individual reports: {str(e)}")
-            flash(f'Error generating reports: {str(e)}', 'danger')
-            
-            # Redirect back to results if there was an error
+        report_format = request.args.get('format', 'files')
+        if report_format not in REPORT_FORMATS:
+            flash(f'Unknown report format: {report_format}', 'danger')
             return redirect(url_for('results', scan_id=scan_id))
+        
+        if enqueue_report_generation(scan_id, report_format):
+            flash(f'Generating individual bug reports for {repo.name} in the background', 'info')
+        else:
+            flash(f'Individual bug reports for {repo.name} are already being generated', 'warning')
+        
+        # Redirect to the individual reports page, which follows the progress
+        return redirect(url_for('view_reports', scan_id=scan_id))
+    
+    @app.route('/api/scan/<int:scan_id>/reports/status')
+    def api_report_status(scan_id):
+        """Return the state of the individual bug report generation of a scan"""
+        scan = Scan.query.get_or_404(scan_id)
+        job = get_report_status(scan.id)
+        return jsonify({
+            'scan_id': scan.id,
+            'state': job['state'] if job else None,
+            'error': job['error'] if job else None,
+            'format': job['format'] if job else None,
+            'reports_written': job['reports_written'] if job else 0,
+            'total_bugs': scan.total_bugs
+        })
     
     @app.route('/scan/<int:scan_id>/reports')
     def view_reports(scan_id):
-        from datetime import datetime
-        import json
-        import os
+        """
+        List the individual bug reports of a scan, a page at a time
         
+        The listing is read from the report manifest written with the
+        reports; report bodies are fetched on demand. Query parameters:
+        severity and page.
+        """
         scan = Scan.query.get_or_404(scan_id)
         repo = Repository.query.get(scan.repository_id)
         
@@ -171,43 +253,87 @@ def register_routes(app):
         safe_repo_name = repo.name.replace('/', '_').replace('\\', '_')
         repo_dir = os.path.join('results', safe_repo_name)
         
-        reports = []
-        
-        # Check if directory exists
-        if os.path.exists(repo_dir):
-            # List JSON files in the directory
-            for filename in os.listdir(repo_dir):
-                if filename.endswith('.json'):
-                    file_path = os.path.join(repo_dir, filename)
-                    
-                    try:
-                        # Read report content
-                        with open(file_path, 'r') as f:
-                            content = json.load(f)
-                            
-                        # Extract information from the report
-                        bug_type = content.get('general_info', {}).get('vulnerability_category', 'Unknown')
-                        severity = content.get('severity', {}).get('level', 'Unknown')
-                        
-                        reports.append({
-                            'filename': filename,
-                            'path': os.path.join(safe_repo_name, filename),
-                            'bug_type': bug_type,
-                            'severity': severity,
-                            'content': json.dumps(content, indent=2)
-                        })
-                    except Exception as e:
-                        logger.error(f"Error reading report file {file_path}: {str(e)}")
-        
-        # Sort reports by severity (critical first)
-        severity_order = {'critical': 0, 'high': 1, 'medium': 2, 'low': 3, 'info': 4, 'Unknown': 5}
-        reports.sort(key=lambda x: severity_order.get(x['severity'], 999))
+        manifest = load_report_manifest(os.path.join(repo_dir, manifest_filename(scan.id)))
+        severity = request.args.get('severity') or None
+        page = max(request.args.get('page', 1, type=int), 1)
+        reports = manifest.page(severity, page, REPORTS_PER_PAGE) if manifest else None
+        
+        # Single-file bundles of all reports of this scan
+        bundles = []
+        for report_format in REPORT_FORMATS:
+            if report_format == 'files':
+                continue
+            filename = bundle_filename(scan.id, report_format)
+            if os.path.exists(os.path.join(repo_dir, filename)):
+                bundles.append({
+                    'format': report_format,
+                    'filename': filename,
+                    'path': os.path.join(safe_repo_name, filename)
+                })
         
         return render_template('individual_reports.html', 
                               scan=scan, 
                               repo=repo, 
+                              manifest=manifest,
                               reports=reports, 
-                              timestamp=datetime.utcnow())
+                              severity=severity,
+                              bundles=bundles,
+                              report_status=get_report_status(scan.id))
+    
+    @app.route('/api/scan/<int:scan_id>/reports/<filename>')
+    def api_report(scan_id, filename):
+        """
+        Return the body of one individual bug report, located with the manifest
+        
+        With download=1 the report is sent as an attachment.
+        """
+        scan = Scan.query.get_or_404(scan_id)
+        repo = Repository.query.get(scan.repository_id)
+        
+        safe_repo_name = repo.name.replace('/', '_').replace('\\', '_')
+        manifest = load_report_manifest(os.path.join('results', safe_repo_name, manifest_filename(scan.id)))
+        entry = manifest.find(filename) if manifest else None
+        if entry is None:
+            return jsonify({'error': 'Report not found'}), 404
+        
+        response = jsonify(manifest.read_report(entry, ReportArtifactStore(app.config['REPORT_ARTIFACT_DIR'])))
+        if request.args.get('download'):
+            response.headers['Content-Disposition'] = f'attachment; filename="{entry["filename"]}"'
+        return response
+    
+    @app.route('/reports/objects/<digest>.json')
+    def report_artifact(digest):
+        """
+        Serve an individual bug report artifact by content digest
+        
+        Artifacts never change, so they carry a strong ETag and are cached as
+        immutable. The gzip variant is sent to clients that accept it, and
+        byte ranges of either are served. The name parameter sets the file
+        name of the download.
+        """
+        if not DIGEST_PATTERN.match(digest):
+            abort(404)
+        
+        artifacts = ReportArtifactStore(app.config['REPORT_ARTIFACT_DIR'])
+        if not artifacts.exists(digest):
+            abort(404)
+        
+        compressed = request.accept_encodings['gzip'] > 0
+        name = request.args.get('name')
+        response = send_file(
+            artifacts.path(digest, compressed=compressed),
+            mimetype='application/json',
+            as_attachment=bool(name),
+            download_name=name or f"{digest}.json",
+            etag=f"{digest}-gzip" if compressed else digest,
+            max_age=app.config['REPORT_ARTIFACT_MAX_AGE'],
+            conditional=True
+        )
+        if compressed:
+            response.headers['Content-Encoding'] = 'gzip'
+        response.vary.add('Accept-Encoding')
+        response.cache_control.immutable = True
+        return response
     
     @app.route('/results/<path:path>')
     def download_report(path):
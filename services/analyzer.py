@@ -1,109 +1,461 @@
-import os
+import json
+import hashlib
 import logging
-from app import db
-from models import Bug, LanguageStats
-from services.repository import list_files
-from services.language_detector import detect_language, analyze_language_stats
-from analyzers.python_analyzer import analyze_python_file
-from analyzers.javascript_analyzer import analyze_javascript_file
-from analyzers.go_analyzer import analyze_go_file
-from analyzers.common_analyzer import analyze_common_issues
+import multiprocessing
+import git
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+from app import app
+from services.repository import (
+    iter_files, get_blob_shas, get_head_commit, get_changed_files, read_blobs
+)
+from services.git_objects import list_tree
+from services.path_filter import DEFAULT_EXCLUDE_PATTERNS, GITIGNORE_NAME, filter_paths
+from services.language_detector import detect_language
+from services.findings_cache import FindingsCache, RULESET_VERSION
+from services.file_analyzer import (
+    analyze_file, analyze_source, analyze_chunk, skipped_file_result, get_line_count, LARGE_FILE_THRESHOLD, MAX_FILE_SIZE
+)
+from services.persistence import ScanResultWriter
+from analyzers.registry import preload_analyzers
 
 logger = logging.getLogger(__name__)
 
-def analyze_repository(repo_path, scan_id):
+# Upper bound on files handed to a worker at once; small files finish quickly,
+# so batching them keeps inter-process overhead low without starving workers
+MAX_CHUNK_SIZE = 64
+
+# Upper bound on the file contents gathered into one chunk; with the in-flight
+# window it bounds the blobs held in memory when files are read from the git
+# object database
+MAX_CHUNK_BYTES = 8 * 1024 * 1024
+
+# Chunks submitted per worker ahead of the results being consumed. The window
+# is the bounded queue between the stages: discovery and reading stop when it
+# is full, so memory stays flat however many files the repository holds
+IN_FLIGHT_CHUNKS_PER_WORKER = 4
+
+# Start method of the analysis worker processes. Scans run on threads of the
+# web process, and forking a multi-threaded process can deadlock on locks
+# held by other threads, so workers start from a fresh interpreter
+WORKER_START_METHOD = 'spawn'
+
+# Files pulled from discovery at once, whose cached findings are fetched with
+# one lookup before the cache misses among them are dispatched for analysis
+CACHE_LOOKUP_BATCH_SIZE = 1000
+
+def get_worker_count(workers=None):
+    """
+    Resolve the number of analysis worker processes to use
+
+    Args:
+        workers (int): Explicit worker count, or None to use ANALYSIS_WORKERS
+
+    Returns:
+        int: Worker count, at least 1
+    """
+    if workers is None:
+        workers = app.config.get('ANALYSIS_WORKERS') or 1
+    return max(1, int(workers))
+
+def get_file_size_limits():
+    """
+    Resolve the file size limits of the analysis from the app settings
+
+    Returns:
+        dict: large_file_threshold and max_file_size keyword arguments for
+        analyze_file and analyze_source
+    """
+    return {
+        'large_file_threshold': app.config.get('LARGE_FILE_THRESHOLD', LARGE_FILE_THRESHOLD),
+        'max_file_size': app.config.get('MAX_FILE_SIZE', MAX_FILE_SIZE)
+    }
+
+def get_listing_options():
+    """
+    Resolve which repository files a scan includes from the app settings
+
+    Returns:
+        dict: use_gitignore and pathspecs keyword arguments for iter_files,
+        GitTreeSource.list_files and filter_paths
+    """
+    return {
+        'use_gitignore': app.config.get('SCAN_USE_GITIGNORE', True),
+        'pathspecs': app.config.get('SCAN_PATHSPECS') or None
+    }
+
+def get_options_fingerprint(listing, limits):
+    """
+    Fingerprint the options deciding which files a scan includes and how
+    much of each is analyzed
+
+    An incremental scan only reuses the results of a scan with the same
+    fingerprint: otherwise unchanged files may enter or leave the listing,
+    or findings recorded for skipped or partially analyzed files would be
+    carried forward past a raised size limit.
+
+    Args:
+        listing (dict): File listing options, see get_listing_options
+        limits (dict): File size limits, see get_file_size_limits
+
+    Returns:
+        str: Hex SHA-256 digest of the options
+    """
+    options = {
+        'exclude_patterns': DEFAULT_EXCLUDE_PATTERNS,
+        'use_gitignore': bool(listing['use_gitignore']),
+        'pathspecs': list(listing['pathspecs'] or ()),
+        'large_file_threshold': limits['large_file_threshold'],
+        'max_file_size': limits['max_file_size']
+    }
+    return hashlib.sha256(json.dumps(options, sort_keys=True).encode('utf-8')).hexdigest()
+
+class FileStream:
+    """Files of a scan, counted as they flow through the pipeline"""
+
+    def __init__(self, files):
+        """
+        Args:
+            files (iterable): (path, size) tuples
+        """
+        self.files = files
+        self.count = 0
+
+    def __iter__(self):
+        for item in self.files:
+            self.count += 1
+            yield item
+
+def discover_files(repo_path, source=None, listing=None):
+    """
+    Enumerate the files a scan includes, lazily when walking a working tree
+
+    Args:
+        repo_path (str): Path to the cloned repository
+        source (GitTreeSource): Tree to list instead of the files under repo_path
+        listing (dict): File listing options, defaults to get_listing_options()
+
+    Yields:
+        tuple: (path, size) of each file, paths '/' separated
+    """
+    if listing is None:
+        listing = get_listing_options()
+
+    if source is not None:
+        for file_path in source.list_files(**listing):
+            yield file_path, source.size(file_path)
+    else:
+        for entry in iter_files(repo_path, **listing):
+            yield entry.path, entry.size
+
+def iter_batches(iterable, size):
+    """
+    Split an iterable into lists of up to size items, consuming it lazily
+
+    Args:
+        iterable (iterable): Items to split
+        size (int): Maximum items per list
+
+    Yields:
+        list: The next items
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def iter_work_units(files, workers, cache=None, source=None, max_file_size=0):
+    """
+    Turn a stream of files into ready results and chunks to analyze
+
+    Files found in the findings cache or above the size limit become ready
+    results; the others are grouped into chunks of consecutive files. With a
+    source, file contents are read as each chunk is formed.
+
+    Args:
+        files (iterable): (path, size) tuples, size being None if unknown
+        workers (int): Number of worker processes, used to size chunks
+        cache (FindingsCache): Findings cache to consult, if any
+        source (GitTreeSource): Tree to read files from
+        max_file_size (int): Size above which files are skipped, 0 for no limit
+
+    Yields:
+        tuple: ('result', result) or ('chunk', list of analyze arguments), in
+        file order
+    """
+    for batch in iter_batches(files, CACHE_LOOKUP_BATCH_SIZE):
+        cached = cache.lookup([file_path for file_path, _ in batch]) if cache else {}
+        misses = len(batch) - len(cached)
+        chunk_size = max(1, min(MAX_CHUNK_SIZE, misses // (workers * IN_FLIGHT_CHUNKS_PER_WORKER)))
+        chunk = []
+        chunk_bytes = 0
+
+        for file_path, size in batch:
+            result = cached.get(file_path)
+            if result is None and max_file_size and size is not None and size > max_file_size:
+                result = skipped_file_result(file_path, size, max_file_size)
+
+            if result is not None:
+                if chunk:
+                    yield 'chunk', chunk
+                    chunk = []
+                    chunk_bytes = 0
+                yield 'result', result
+                continue
+
+            chunk.append((file_path, source.read(file_path)) if source is not None else (file_path, size))
+            chunk_bytes += size or 0
+            if len(chunk) >= chunk_size or chunk_bytes >= MAX_CHUNK_BYTES:
+                yield 'chunk', chunk
+                chunk = []
+                chunk_bytes = 0
+
+        if chunk:
+            yield 'chunk', chunk
+
+def iter_file_results(repo_path, files, workers=1, cache=None, source=None, limits=None):
+    """
+    Analyze a stream of files, fanning them out to a process pool when workers > 1
+
+    Files are pulled from the stream only while fewer than
+    IN_FLIGHT_CHUNKS_PER_WORKER chunks per worker are pending, so discovery,
+    reading, analysis and the consumer run as a pipeline with bounded memory.
+    Results are yielded as they become available but always in stream
+    order, so the output is deterministic regardless of worker count. Files
+    found in the findings cache are served from it without being read.
+    With a source, file contents are read from it in this process and sent
+    to the workers, so nothing needs to exist on disk; blobs above the size
+    limit are never read.
+
+    Args:
+        repo_path (str): Path to the cloned repository
+        files (iterable): (path, size) tuples, paths relative to repo_path and
+            size None if unknown; a known size spares the workers a stat call
+        workers (int): Number of worker processes
+        cache (FindingsCache): Findings cache to consult and fill, if any
+        source (GitTreeSource): Tree to read files from instead of repo_path
+        limits (dict): File size limits, defaults to get_file_size_limits()
+
+    Yields:
+        dict or None: Result of analyze_file for each file of the stream
+    """
+    if limits is None:
+        limits = get_file_size_limits()
+    if source is not None:
+        analyze = partial(analyze_source, **limits)
+    else:
+        analyze = partial(analyze_file, repo_path, **limits)
+
+    units = iter_work_units(files, workers, cache, source, limits['max_file_size'])
+    max_in_flight = workers * IN_FLIGHT_CHUNKS_PER_WORKER
+    # Ready results and pending chunks, in file order
+    window = deque()
+    in_flight = 0
+    exhausted = False
+    executor = None
+
+    try:
+        while True:
+            while not exhausted and in_flight < max_in_flight and len(window) < CACHE_LOOKUP_BATCH_SIZE:
+                unit = next(units, None)
+                if unit is None:
+                    exhausted = True
+                    break
+                kind, value = unit
+                if kind == 'chunk':
+                    if workers > 1:
+                        if executor is None:
+                            # Workers preload the analyzers of the first files; others load on first use
+                            languages = sorted({detect_language(args[0]) for args in value})
+                            executor = ProcessPoolExecutor(
+                                max_workers=workers,
+                                mp_context=multiprocessing.get_context(WORKER_START_METHOD),
+                                initializer=preload_analyzers,
+                                initargs=(languages,)
+                            )
+                        value = executor.submit(analyze_chunk, analyze, value)
+                    in_flight += 1
+                window.append((kind, value))
+
+            if not window:
+                break
+
+            kind, value = window.popleft()
+            if kind == 'result':
+                yield value
+                continue
+
+            in_flight -= 1
+            results = value.result() if executor else analyze_chunk(analyze, value)
+            for result in results:
+                # Skipped and partially analyzed files are analyzed again, in
+                # full once the size limits allow it
+                if cache and result is not None and not (result.get('skipped') or result.get('partial')):
+                    cache.store(result)
+                yield result
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+        if cache:
+            cache.flush()
+
+def get_stale_files(repo_path, base_commit, paths, limits=None, listing=None):
+    """
+    Describe the previously scanned version of changed or deleted files
+
+    The files the previous scan included are found by listing the tree of
+    base_commit with the same exclude patterns, .gitignore files and
+    pathspecs as a scan of that commit.
+
+    Args:
+        repo_path (str): Path to the cloned repository
+        base_commit (str): SHA of the previously scanned commit
+        paths (set): Paths changed or deleted since base_commit
+        limits (dict): File size limits, defaults to get_file_size_limits()
+        listing (dict): File listing options, defaults to get_listing_options()
+
+    Returns:
+        dict: (language, line_count) keyed by path, for files the previous
+        scan included
+    """
+    if limits is None:
+        limits = get_file_size_limits()
+    if listing is None:
+        listing = get_listing_options()
+    if not paths:
+        return {}
+
+    repo = git.Repo(repo_path)
+    try:
+        entries = list_tree(repo, base_commit)
+
+        def read_text(path):
+            _, _, _, data = repo.git.get_object_data(entries[path][0])
+            return data.decode('utf-8', errors='ignore')
+
+        scanned = set(filter_paths(entries, read_text, **listing))
+    finally:
+        repo.close()
+    candidates = [path for path in paths if path in scanned]
+    stale_files = {}
+    for path, raw in read_blobs(repo_path, base_commit, candidates):
+        stale_files[path] = (detect_language(path), get_line_count(raw, **limits))
+    return stale_files
+
+def analyze_repository(repo_path, scan_id, workers=None, progress=None, use_cache=None, base_scan=None, source=None):
     """
     Analyze a repository for bugs and issues
-    
+
+    With base_scan, only files added or modified since the commit of that
+    scan are analyzed; findings and statistics of unchanged files are carried
+    forward from it. The scan falls back to a full analysis when the commits
+    cannot be compared, or the analyzers, file listing options or file size
+    limits changed since base_scan.
+
+    With source, the files of a commit are read straight from the git object
+    database and repo_path is the (bare) repository holding it; no working
+    tree is needed.
+
     Args:
         repo_path (str): Path to the cloned repository
         scan_id (int): ID of the scan in the database
-        
+        workers (int): Number of analysis processes, defaults to the
+            ANALYSIS_WORKERS setting
+        progress (callable): Called with (analyzed_files, total_files) after
+            each file
+        use_cache (bool): Reuse cached findings for unchanged git blobs,
+            defaults to the FINDINGS_CACHE_ENABLED setting
+        base_scan (Scan): Completed scan to build an incremental scan on
+        source (GitTreeSource): Tree to analyze instead of the files under repo_path
+
     Returns:
         dict: Analysis results with statistics
     """
-    logger.info(f"Starting analysis of repository at {repo_path}")
-    
+    workers = get_worker_count(workers)
+    logger.info(f"Starting analysis of repository at {repo_path} with {workers} worker(s)")
+
     # List all files in the repository
-    file_list = list_files(repo_path)
-    
-    # Language statistics
-    language_stats = analyze_language_stats(repo_path, file_list)
-    
-    # Store language statistics
-    for language, stats in language_stats.items():
-        lang_stat = LanguageStats(
-            scan_id=scan_id,
-            language=language,
-            file_count=stats['file_count'],
-            line_count=stats['line_count'],
-            bug_count=0  # Will be updated later
-        )
-        db.session.add(lang_stat)
-    
-    db.session.commit()
-    
-    # Initialize counters
-    total_files = len(file_list)
+    listing = get_listing_options()
+    limits = get_file_size_limits()
+    options_fingerprint = get_options_fingerprint(listing, limits)
+    head_commit = source.commit if source is not None else get_head_commit(repo_path)
+    discovered = FileStream(discover_files(repo_path, source, listing))
+
+    # Findings are written in batches; language counters are kept in memory
+    writer = ScanResultWriter(scan_id)
+
+    # Restrict analysis to files changed since the base scan
+    changes = None
+    if base_scan is not None:
+        if base_scan.ruleset_version != RULESET_VERSION:
+            logger.info(f"Analyzers changed since scan {base_scan.id}, running a full scan")
+        elif base_scan.options_fingerprint != options_fingerprint:
+            logger.info(f"File listing options or size limits changed since scan {base_scan.id}, running a full scan")
+        elif head_commit:
+            changes = get_changed_files(repo_path, base_scan.commit_sha, head_commit)
+            # Unchanged files may enter or leave the listing when ignore rules change
+            if changes is not None and listing['use_gitignore'] and any(
+                path.rpartition('/')[2] == GITIGNORE_NAME for path in changes[0] | changes[1]
+            ):
+                logger.info(f"Ignore rules changed since scan {base_scan.id}, running a full scan")
+                changes = None
+
+    if changes is not None:
+        added_or_modified, deleted_or_modified = changes
+        stale_files = get_stale_files(repo_path, base_scan.commit_sha, deleted_or_modified, limits, listing)
+        writer.carry_forward(base_scan.id, stale_files)
+        files_to_analyze = FileStream(item for item in discovered if item[0] in added_or_modified)
+        scan_mode = 'incremental'
+        logger.info(f"Incremental scan from {base_scan.commit_sha[:12]}: {len(added_or_modified)} changed paths")
+    else:
+        files_to_analyze = discovered
+        scan_mode = 'full'
+
+    # Findings of files whose git blob was analyzed before are reused
+    if use_cache is None:
+        use_cache = app.config.get('FINDINGS_CACHE_ENABLED', True)
+    if use_cache:
+        cache = FindingsCache(source.blob_shas if source is not None else get_blob_shas(repo_path))
+    else:
+        cache = None
+
+    # Files stream from discovery through analysis to the writer; the total
+    # grows while files are still being discovered
     analyzed_files = 0
-    total_bugs = 0
-    
-    # Analyze each file
-    for file_path in file_list:
+
+    # Analysis runs in worker processes; only this process touches the database
+    for result in iter_file_results(repo_path, files_to_analyze, workers, cache, source, limits):
         analyzed_files += 1
-        full_path = os.path.join(repo_path, file_path)
-        
-        if not os.path.isfile(full_path):
-            continue
-            
-        language = detect_language(file_path)
-        
-        # Analyze file based on language
-        bugs = []
-        
-        # Common analysis for all file types
-        common_bugs = analyze_common_issues(full_path, file_path)
-        bugs.extend(common_bugs)
-        
-        # Language-specific analysis
-        if language == 'Python':
-            python_bugs = analyze_python_file(full_path, file_path)
-            bugs.extend(python_bugs)
-        elif language in ['JavaScript', 'TypeScript', 'React', 'React TypeScript']:
-            js_bugs = analyze_javascript_file(full_path, file_path)
-            bugs.extend(js_bugs)
-        elif language == 'Go':
-            go_bugs = analyze_go_file(full_path, file_path)
-            bugs.extend(go_bugs)
-        
-        # Save bugs to database
-        for bug_info in bugs:
-            bug = Bug(
-                scan_id=scan_id,
-                file_path=file_path,
-                line_number=bug_info.get('line_number'),
-                bug_type=bug_info.get('bug_type'),
-                severity=bug_info.get('severity'),
-                description=bug_info.get('description'),
-                code_snippet=bug_info.get('code_snippet'),
-                recommendation=bug_info.get('recommendation'),
-                language=language
-            )
-            db.session.add(bug)
-            total_bugs += 1
-            
-            # Update language statistics bug count
-            lang_stat = LanguageStats.query.filter_by(scan_id=scan_id, language=language).first()
-            if lang_stat:
-                lang_stat.bug_count += 1
-        
-        # Commit bugs for this file
-        db.session.commit()
-    
+
+        if result is not None:
+            writer.add_file(result['file_path'], result['language'], result['line_count'], result['bugs'])
+
+        if progress:
+            progress(analyzed_files, files_to_analyze.count)
+
+    writer.finish()
+    total_files = files_to_analyze.count
+    total_bugs = writer.total_bugs
+
+    if cache:
+        logger.info(f"Findings cache: {cache.hits} hits, {cache.misses} misses")
+        cache.evict()
+
     logger.info(f"Analysis completed: {analyzed_files}/{total_files} files analyzed, {total_bugs} bugs found")
-    
+
+    # An incremental scan covers the whole repository, not only the files it re-analyzed
     return {
-        'total_files': total_files,
-        'analyzed_files': analyzed_files,
-        'total_bugs': total_bugs
+        'total_files': discovered.count,
+        'analyzed_files': discovered.count if scan_mode == 'incremental' else analyzed_files,
+        'reanalyzed_files': analyzed_files,
+        'total_bugs': total_bugs,
+        'commit_sha': head_commit,
+        'ruleset_version': RULESET_VERSION,
+        'options_fingerprint': options_fingerprint,
+        'scan_mode': scan_mode,
+        'base_scan_id': base_scan.id if scan_mode == 'incremental' else None
     }
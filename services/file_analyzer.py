@@ -0,0 +1,189 @@
+import os
+import mmap
+import logging
+from services.language_detector import detect_language
+from analyzers.common_analyzer import analyze_common_issues
+from analyzers.registry import get_analyzer
+from analyzers.file_context import FileContext, LargeFileContext, LineIndex
+
+logger = logging.getLogger(__name__)
+
+# This module must stay free of Flask and database imports: analyze_file runs
+# inside process pool workers and only returns plain data to the parent.
+
+# Files above this size are memory-mapped and scanned without decoding them
+LARGE_FILE_THRESHOLD = 8 * 1024 * 1024
+
+# Files above this size are not analyzed at all
+MAX_FILE_SIZE = 100 * 1024 * 1024
+
+def analyze_file(repo_path, file_path, size=None, large_file_threshold=LARGE_FILE_THRESHOLD, max_file_size=MAX_FILE_SIZE):
+    """
+    Analyze a single repository file
+
+    Args:
+        repo_path (str): Path to the cloned repository
+        file_path (str): Path of the file relative to repo_path
+        size (int): Size of the file when the caller already knows it is a
+            regular file, e.g. from listing its directory; saves the stat calls
+        large_file_threshold (int): Size above which the file is memory-mapped
+            and only scanned by the pattern rules, 0 to disable
+        max_file_size (int): Size above which the file is skipped, 0 for no limit
+
+    Returns:
+        dict or None: File path, language, line count and found bugs, or None
+        if the path is not a readable file
+    """
+    full_path = os.path.join(repo_path, file_path)
+
+    if size is None and not os.path.isfile(full_path):
+        return None
+
+    try:
+        if size is None:
+            size = os.path.getsize(full_path)
+        if max_file_size and size > max_file_size:
+            return skipped_file_result(file_path, size, max_file_size)
+
+        # Large files stay on disk; the memory map is paged in as it is scanned
+        if large_file_threshold and size > large_file_threshold:
+            with open(full_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                return analyze_large_source(file_path, buffer, full_path)
+
+        # Read the file once; statistics and every analyzer share this context
+        with open(full_path, 'rb') as f:
+            raw = f.read()
+    except (OSError, ValueError) as e:
+        logger.error(f"Error reading {file_path}: {str(e)}")
+        return None
+
+    return analyze_source(file_path, raw, full_path, large_file_threshold, max_file_size)
+
+def analyze_chunk(analyze, arguments):
+    """
+    Analyze a chunk of files in one worker call
+
+    Args:
+        analyze (callable): analyze_file or analyze_source with its fixed
+            arguments bound
+        arguments (list): Remaining positional arguments, one tuple per file
+
+    Returns:
+        list: Results in the order of arguments
+    """
+    return [analyze(*args) for args in arguments]
+
+def analyze_source(file_path, raw, full_path=None, large_file_threshold=LARGE_FILE_THRESHOLD, max_file_size=MAX_FILE_SIZE):
+    """
+    Analyze the contents of a repository file already held in memory
+
+    Args:
+        file_path (str): Path of the file relative to the repository root
+        raw (bytes): Contents of the file
+        full_path (str): Location of the file on disk, if it has one
+        large_file_threshold (int): Size above which only the pattern rules
+            scan the raw contents, 0 to disable
+        max_file_size (int): Size above which the file is skipped, 0 for no limit
+
+    Returns:
+        dict: File path, language, line count and found bugs
+    """
+    full_path = full_path or file_path
+
+    if max_file_size and len(raw) > max_file_size:
+        return skipped_file_result(file_path, len(raw), max_file_size)
+    if large_file_threshold and len(raw) > large_file_threshold:
+        return analyze_large_source(file_path, raw, full_path)
+
+    language = detect_language(file_path)
+    file_context = FileContext(full_path, file_path, raw, language)
+
+    # Common analysis for all file types
+    bugs = analyze_common_issues(full_path, file_path, file_context)
+
+    # Language-specific analysis; the analyzer is imported on first use
+    analyzer = get_analyzer(language)
+    if analyzer is not None:
+        bugs.extend(analyzer(full_path, file_path, file_context))
+
+    return {
+        'file_path': file_path,
+        'language': language,
+        'line_count': file_context.line_count,
+        'bugs': bugs
+    }
+
+def analyze_large_source(file_path, buffer, full_path=None):
+    """
+    Analyze a large file straight from its raw bytes with bounded memory
+
+    Only the pattern rules common to all languages run: the language
+    analyzers need the decoded text, token stream or syntax tree of the
+    whole file. The result is marked partial, as the same file below the
+    threshold gets more findings.
+
+    Args:
+        file_path (str): Path of the file relative to the repository root
+        buffer (bytes or mmap.mmap): Contents of the file
+        full_path (str): Location of the file on disk, if it has one
+
+    Returns:
+        dict: File path, language, line count and found bugs, with partial set
+    """
+    full_path = full_path or file_path
+    language = detect_language(file_path)
+    file_context = LargeFileContext(full_path, file_path, buffer, language)
+    logger.info(f"Scanning large file {file_path} ({file_context.size} bytes) with pattern rules only")
+
+    return {
+        'file_path': file_path,
+        'language': language,
+        'line_count': file_context.line_count,
+        'partial': True,
+        'bugs': analyze_common_issues(full_path, file_path, file_context)
+    }
+
+def skipped_file_result(file_path, size, max_file_size):
+    """
+    Build the result recorded for a file too large to analyze
+
+    Args:
+        file_path (str): Path of the file relative to the repository root
+        size (int): Size of the file in bytes
+        max_file_size (int): Size limit the file exceeds
+
+    Returns:
+        dict: Analysis result holding a single informational finding
+    """
+    return {
+        'file_path': file_path,
+        'language': detect_language(file_path),
+        'line_count': 0,
+        'skipped': True,
+        'bugs': [{
+            'line_number': 1,
+            'bug_type': 'Skipped: File Too Large',
+            'severity': 'info',
+            'description': f'File is {size} bytes, above the {max_file_size} byte analysis limit, and was not analyzed.',
+            'code_snippet': None,
+            'recommendation': 'Exclude generated files and data dumps from the repository, or raise MAX_FILE_SIZE.'
+        }]
+    }
+
+def get_line_count(raw, large_file_threshold=LARGE_FILE_THRESHOLD, max_file_size=MAX_FILE_SIZE):
+    """
+    Count the lines of file contents the same way a scan records them
+
+    Args:
+        raw (bytes): Contents of the file
+        large_file_threshold (int): Size above which the large-file path is used
+        max_file_size (int): Size above which files are skipped
+
+    Returns:
+        int: Line count recorded for the file
+    """
+    if max_file_size and len(raw) > max_file_size:
+        return 0
+    if large_file_threshold and len(raw) > large_file_threshold:
+        return LineIndex(raw).line_count
+    return FileContext(None, None, raw).line_count
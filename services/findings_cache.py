@@ -0,0 +1,239 @@
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime
+from sqlalchemy import select, update, delete
+from app import db, app
+from models import FindingsCacheEntry
+from services.language_detector import detect_language
+from analyzers.registry import ANALYZERS
+
+logger = logging.getLogger(__name__)
+
+# Sources whose behavior determines the findings reported for a file
+RULESET_SOURCES = [
+    'analyzers',
+    os.path.join('services', 'file_analyzer.py')
+]
+
+# Files looked up in the cache with a single query
+LOOKUP_BATCH_SIZE = 500
+
+def compute_ruleset_version():
+    """
+    Fingerprint the analyzers and their rule tables
+
+    Any change to an analyzer module, including its pattern tables, or to
+    the set of registered plugin analyzers and their versions produces a new
+    version, so cached findings are never served for outdated rules.
+
+    Returns:
+        str: Hex digest identifying the current rule set
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    digest = hashlib.sha256()
+
+    for source in RULESET_SOURCES:
+        path = os.path.join(root, source)
+        if os.path.isdir(path):
+            files = sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith('.py'))
+        else:
+            files = [path]
+
+        for file_path in files:
+            digest.update(os.path.relpath(file_path, root).encode('utf-8'))
+            with open(file_path, 'rb') as f:
+                digest.update(f.read())
+
+    for analyzer in ANALYZERS.describe():
+        digest.update(analyzer.encode('utf-8'))
+
+    return digest.hexdigest()
+
+RULESET_VERSION = compute_ruleset_version()
+
+class FindingsCache:
+    """
+    Persistent cache of analyzer findings keyed by git blob SHA
+
+    Entries are keyed on (blob SHA, language, rule-set version): identical
+    file contents analyzed by the same rules always produce the same
+    findings, so unchanged files are served without reading or analyzing
+    them. Least recently used entries are evicted once the cache grows past
+    its size limit.
+    """
+
+    def __init__(self, blob_shas, ruleset_version=RULESET_VERSION, max_bytes=None):
+        """
+        Args:
+            blob_shas (dict): Blob SHA keyed by file path relative to the repository
+            ruleset_version (str): Version of the analyzers producing the findings
+            max_bytes (int): Size limit of the cache, defaults to FINDINGS_CACHE_MAX_BYTES
+        """
+        self.blob_shas = blob_shas
+        self.ruleset_version = ruleset_version
+        self.max_bytes = max_bytes or app.config.get('FINDINGS_CACHE_MAX_BYTES') or 256 * 1024 * 1024
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, file_path):
+        blob_sha = self.blob_shas.get(file_path.replace(os.sep, '/'))
+        if blob_sha is None:
+            return None
+        return blob_sha, detect_language(file_path)
+
+    def lookup(self, file_paths):
+        """
+        Fetch cached results for a batch of files
+
+        Args:
+            file_paths (list): Paths relative to the repository root
+
+        Returns:
+            dict: Analysis results, in the shape returned by analyze_file,
+            keyed by file path for every file found in the cache
+        """
+        keys = {}
+        for file_path in file_paths:
+            key = self._key(file_path)
+            if key is not None:
+                keys.setdefault(key, []).append(file_path)
+
+        results = {}
+        hit_ids = []
+        key_list = list(keys)
+
+        for start in range(0, len(key_list), LOOKUP_BATCH_SIZE):
+            batch = key_list[start:start + LOOKUP_BATCH_SIZE]
+            rows = db.session.execute(
+                select(
+                    FindingsCacheEntry.id,
+                    FindingsCacheEntry.blob_sha,
+                    FindingsCacheEntry.language,
+                    FindingsCacheEntry.line_count,
+                    FindingsCacheEntry.findings
+                ).where(
+                    FindingsCacheEntry.ruleset_version == self.ruleset_version,
+                    FindingsCacheEntry.blob_sha.in_({blob_sha for blob_sha, _ in batch})
+                )
+            )
+
+            for row in rows:
+                file_paths_for_key = keys.get((row.blob_sha, row.language))
+                if not file_paths_for_key:
+                    continue
+
+                hit_ids.append(row.id)
+                bugs = json.loads(row.findings)
+                for file_path in file_paths_for_key:
+                    results[file_path] = {
+                        'file_path': file_path,
+                        'language': row.language,
+                        'line_count': row.line_count,
+                        'bugs': [dict(bug) for bug in bugs]
+                    }
+
+        if hit_ids:
+            db.session.execute(
+                update(FindingsCacheEntry)
+                .where(FindingsCacheEntry.id.in_(hit_ids))
+                .values(last_used=datetime.utcnow())
+            )
+            db.session.commit()
+
+        self.hits += len(results)
+        self.misses += len(file_paths) - len(results)
+        return results
+
+    def store(self, result):
+        """
+        Queue the analysis result of a file for insertion into the cache
+
+        Args:
+            result (dict): Result returned by analyze_file
+        """
+        key = self._key(result['file_path'])
+        if key is None:
+            return
+
+        self.pending[key] = (result['line_count'], json.dumps(result['bugs']))
+
+        if len(self.pending) >= LOOKUP_BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        """Insert queued entries, skipping any that another scan cached meanwhile"""
+        if not self.pending:
+            return
+
+        now = datetime.utcnow()
+        rows = [
+            {
+                'blob_sha': blob_sha,
+                'language': language,
+                'ruleset_version': self.ruleset_version,
+                'line_count': line_count,
+                'findings': findings,
+                'size': len(findings),
+                'last_used': now
+            }
+            for (blob_sha, language), (line_count, findings) in self.pending.items()
+        ]
+        self.pending = {}
+
+        db.session.execute(_insert_ignoring_duplicates(), rows)
+        db.session.commit()
+
+    def evict(self):
+        """
+        Remove least recently used entries until the cache fits its size limit
+
+        Returns:
+            int: Number of entries removed
+        """
+        total = db.session.execute(select(db.func.coalesce(db.func.sum(FindingsCacheEntry.size), 0))).scalar()
+        excess = total - self.max_bytes
+        if excess <= 0:
+            return 0
+
+        stale_ids = []
+        rows = db.session.execute(
+            select(FindingsCacheEntry.id, FindingsCacheEntry.size)
+            .order_by(FindingsCacheEntry.last_used)
+            .execution_options(yield_per=LOOKUP_BATCH_SIZE)
+        )
+        for row in rows:
+            if excess <= 0:
+                break
+            stale_ids.append(row.id)
+            excess -= row.size or 0
+        rows.close()
+
+        for start in range(0, len(stale_ids), LOOKUP_BATCH_SIZE):
+            db.session.execute(
+                delete(FindingsCacheEntry)
+                .where(FindingsCacheEntry.id.in_(stale_ids[start:start + LOOKUP_BATCH_SIZE]))
+            )
+        db.session.commit()
+
+        logger.info(f"Evicted {len(stale_ids)} findings cache entries")
+        return len(stale_ids)
+
+def _insert_ignoring_duplicates():
+    """
+    Build an INSERT that skips rows already present in the findings cache
+
+    Returns:
+        Insert: Dialect-specific insert statement
+    """
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return FindingsCacheEntry.__table__.insert()
+
+    return insert(FindingsCacheEntry).on_conflict_do_nothing()
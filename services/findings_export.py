@@ -0,0 +1,143 @@
+import json
+import zlib
+import logging
+from datetime import date, datetime
+from flask import Response, stream_with_context
+from app import db, app
+
+logger = logging.getLogger(__name__)
+
+# zlib level of on-the-fly gzip compression; speed matters more than ratio here
+GZIP_LEVEL = 1
+
+# Media type of each export format
+EXPORT_FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson'
+}
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+# One shared encoder; json.dumps with options builds a new one per call
+_encoder = json.JSONEncoder(separators=(',', ':'), default=_default)
+
+def get_export_chunk_size(chunk_size=None):
+    """
+    Resolve the number of rows fetched per round trip and encoded per chunk
+
+    Args:
+        chunk_size (int): Explicit chunk size, or None to use EXPORT_CHUNK_SIZE
+
+    Returns:
+        int: Chunk size, at least 1
+    """
+    if chunk_size is None:
+        chunk_size = app.config['EXPORT_CHUNK_SIZE']
+    return max(1, int(chunk_size))
+
+def iter_row_chunks(statement, chunk_size=None):
+    """
+    Run a query and fetch its rows chunk by chunk
+
+    The rows are read from a server-side cursor where the database supports
+    it, so only one chunk is held in memory at a time.
+
+    Args:
+        statement (Select): Query to run
+        chunk_size (int): Rows fetched per round trip, defaults to EXPORT_CHUNK_SIZE
+
+    Yields:
+        list: Dicts of the next rows, keyed by column name
+    """
+    result = db.session.execute(statement.execution_options(yield_per=get_export_chunk_size(chunk_size)))
+    keys = list(result.keys())
+    for partition in result.partitions():
+        yield [dict(zip(keys, row)) for row in partition]
+
+def encode_json_array(chunks):
+    """
+    Encode chunks of items as one JSON array, piece by piece
+
+    Args:
+        chunks (iterable): Lists of items
+
+    Yields:
+        bytes: The array, one piece per chunk
+    """
+    yield b'['
+    separator = ''
+    for chunk in chunks:
+        if not chunk:
+            continue
+        # Encode the chunk as an array in one call and drop its brackets
+        yield (separator + _encoder.encode(chunk)[1:-1]).encode('utf-8')
+        separator = ','
+    yield b']'
+
+def encode_ndjson(chunks):
+    """
+    Encode chunks of items as newline-delimited JSON
+
+    Args:
+        chunks (iterable): Lists of items
+
+    Yields:
+        bytes: One line per item, one piece per chunk
+    """
+    for chunk in chunks:
+        if chunk:
+            yield ''.join(_encoder.encode(item) + '\n' for item in chunk).encode('utf-8')
+
+def gzip_stream(pieces, level=GZIP_LEVEL):
+    """
+    Compress a byte stream into a gzip stream as it is produced
+
+    Args:
+        pieces (iterable): Bytes to compress
+        level (int): zlib compression level
+
+    Yields:
+        bytes: Compressed data
+    """
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for piece in pieces:
+        data = compressor.compress(piece)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def export_response(statement, export_format='json', compress=False, chunk_size=None):
+    """
+    Stream the rows of a query as a JSON array or NDJSON
+
+    The response body is produced while rows are read, so memory does not
+    grow with the number of rows.
+
+    Args:
+        statement (Select): Query whose rows are exported, one object per row
+        export_format (str): 'json' or 'ndjson'
+        compress (bool): Gzip the body on the fly
+        chunk_size (int): Rows fetched and encoded at a time, defaults to EXPORT_CHUNK_SIZE
+
+    Returns:
+        Response: Streaming response
+
+    Raises:
+        ValueError: If export_format is unknown
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown format: {export_format}")
+
+    encode = encode_ndjson if export_format == 'ndjson' else encode_json_array
+    body = encode(iter_row_chunks(statement, chunk_size))
+    headers = {'Vary': 'Accept-Encoding'}
+    if compress:
+        body = gzip_stream(body)
+        headers['Content-Encoding'] = 'gzip'
+
+    # The database session must outlive the view while the body streams
+    return Response(stream_with_context(body), mimetype=EXPORT_FORMATS[export_format], headers=headers)
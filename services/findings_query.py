@@ -0,0 +1,301 @@
+import json
+import heapq
+import base64
+import logging
+from itertools import islice
+from sqlalchemy import select, tuple_
+from app import db
+from models import Bug
+
+logger = logging.getLogger(__name__)
+
+# Bug columns a client may select
+FINDING_FIELDS = (
+    'id',
+    'file_path',
+    'line_number',
+    'bug_type',
+    'severity',
+    'description',
+    'code_snippet',
+    'recommendation',
+    'language'
+)
+
+# Columns returned when no fields are requested; snippets and recommendations are large
+DEFAULT_FINDING_FIELDS = ('id', 'file_path', 'line_number', 'bug_type', 'severity', 'description', 'language')
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Collation comparing strings by code point, per database dialect; others compare bytes by default
+BINARY_COLLATIONS = {
+    'postgresql': 'C'
+}
+
+def get_list_arg(args, name):
+    """
+    Read a multi-valued query parameter, given repeated or comma-separated
+
+    Args:
+        args (MultiDict): Request arguments
+        name (str): Parameter name
+
+    Returns:
+        list: Non-empty values, in request order
+    """
+    values = []
+    for value in args.getlist(name):
+        values.extend(item.strip() for item in value.split(',') if item.strip())
+    return values
+
+class FindingsFilter:
+    """Conditions selecting findings of a scan"""
+
+    def __init__(self, severities=None, languages=None, bug_types=None, path_prefix=None):
+        """
+        Args:
+            severities (list): Severities to keep, all if empty
+            languages (list): Languages to keep, all if empty
+            bug_types (list): Bug types to keep, all if empty
+            path_prefix (str): Keep files whose path starts with this prefix
+        """
+        self.severities = sorted(set(severities or ()))
+        self.languages = sorted(set(languages or ()))
+        self.bug_types = sorted(set(bug_types or ()))
+        self.path_prefix = path_prefix or None
+
+    @classmethod
+    def from_args(cls, args):
+        """
+        Build a filter from the query parameters severity, language,
+        bug_type and path
+
+        Args:
+            args (MultiDict): Request arguments
+
+        Returns:
+            FindingsFilter: The filter
+        """
+        return cls(
+            severities=get_list_arg(args, 'severity'),
+            languages=get_list_arg(args, 'language'),
+            bug_types=get_list_arg(args, 'bug_type'),
+            path_prefix=args.get('path')
+        )
+
+    def conditions(self, scan_id, include_severity=True):
+        """
+        Build the WHERE conditions of the filter
+
+        Args:
+            scan_id (int): ID of the scan
+            include_severity (bool): Include the severity condition
+
+        Returns:
+            list: SQLAlchemy conditions
+        """
+        conditions = [Bug.scan_id == scan_id]
+        if include_severity and self.severities:
+            conditions.append(Bug.severity.in_(self.severities))
+        if self.languages:
+            conditions.append(Bug.language.in_(self.languages))
+        if self.bug_types:
+            conditions.append(Bug.bug_type.in_(self.bug_types))
+        if self.path_prefix:
+            conditions.append(Bug.file_path.startswith(self.path_prefix, autoescape=True))
+            conditions.extend(prefix_range(Bug.file_path, self.path_prefix))
+        return conditions
+
+    @property
+    def ordered_by_path(self):
+        """Whether pages follow (file_path, id) order instead of id order"""
+        return self.path_prefix is not None
+
+def prefix_range(column, prefix):
+    """
+    Build range conditions holding for every value starting with a prefix
+
+    They let the database narrow a prefix match with an index range scan.
+    Ranges only match prefixes in code point order, so the comparison uses
+    the dialect's binary collation; under a locale collation the range
+    would drop values that start with the prefix.
+
+    Args:
+        column (Column): String column
+        prefix (str): Non-empty prefix
+
+    Returns:
+        list: SQLAlchemy conditions, empty if there is no upper bound
+    """
+    last = ord(prefix[-1])
+    if last >= 0x10FFFF:
+        return []
+    collation = BINARY_COLLATIONS.get(db.engine.dialect.name)
+    if collation:
+        column = column.collate(collation)
+    return [column >= prefix, column < prefix[:-1] + chr(last + 1)]
+
+def parse_fields(value):
+    """
+    Parse the fields query parameter
+
+    Args:
+        value (str): Comma-separated field names, or None for the defaults
+
+    Returns:
+        tuple: Selected field names
+
+    Raises:
+        ValueError: If a field is unknown
+    """
+    if not value:
+        return DEFAULT_FINDING_FIELDS
+
+    fields = tuple(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in FINDING_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields or DEFAULT_FINDING_FIELDS
+
+def parse_limit(value):
+    """
+    Parse the limit query parameter
+
+    Args:
+        value (str): Requested page size, or None for the default
+
+    Returns:
+        int: Page size between 1 and MAX_PAGE_SIZE
+
+    Raises:
+        ValueError: If the value is not a positive integer
+    """
+    if value is None or value == '':
+        return DEFAULT_PAGE_SIZE
+    limit = int(value)
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, MAX_PAGE_SIZE)
+
+def encode_cursor(values):
+    """
+    Encode the sort key of the last finding of a page as an opaque cursor
+
+    Args:
+        values (list): Sort key values
+
+    Returns:
+        str: URL-safe cursor
+    """
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii').rstrip('=')
+
+def load_cursor(cursor):
+    """
+    Decode the sort key values of a cursor, without checking their shape
+
+    Args:
+        cursor (str): Cursor, or None for the first page
+
+    Returns:
+        object: Decoded values, or None without a cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if not cursor:
+        return None
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+def decode_cursor(cursor, filters):
+    """
+    Decode a cursor returned with a previous page
+
+    Args:
+        cursor (str): Cursor, or None for the first page
+        filters (FindingsFilter): Filter of the query the cursor belongs to
+
+    Returns:
+        list or None: Sort key values
+
+    Raises:
+        ValueError: If the cursor is malformed or belongs to another ordering
+    """
+    values = load_cursor(cursor)
+    if values is None:
+        return None
+
+    if filters.ordered_by_path:
+        valid = isinstance(values, list) and len(values) == 2 and isinstance(values[0], str) and isinstance(values[1], int)
+    else:
+        valid = isinstance(values, list) and len(values) == 1 and isinstance(values[0], int)
+    if not valid:
+        raise ValueError("Invalid cursor")
+    return values
+
+def findings_statement(scan_id, filters, fields=DEFAULT_FINDING_FIELDS):
+    """
+    Build the query selecting all findings of a scan in id order
+
+    Args:
+        scan_id (int): ID of the scan
+        filters (FindingsFilter): Conditions on the findings
+        fields (tuple): Columns to select
+
+    Returns:
+        Select: The query
+    """
+    columns = [getattr(Bug, field) for field in fields]
+    return select(*columns).where(*filters.conditions(scan_id)).order_by(Bug.id)
+
+def query_findings_page(scan_id, filters, fields=DEFAULT_FINDING_FIELDS, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Fetch one page of the findings of a scan with keyset pagination
+
+    Pages follow id order, or (file_path, id) order when filtering by path
+    prefix, so each page is a range scan of one of the Bug indexes wherever
+    it starts. Several severities are read with one range scan each and
+    merged.
+
+    Args:
+        scan_id (int): ID of the scan
+        filters (FindingsFilter): Conditions on the findings
+        fields (tuple): Columns to return
+        cursor (list): Sort key of the last finding of the previous page
+        limit (int): Maximum findings on the page
+
+    Returns:
+        tuple: (list of finding dicts, cursor of the next page or None)
+    """
+    keys = (Bug.file_path, Bug.id) if filters.ordered_by_path else (Bug.id,)
+    key_names = [key.key for key in keys]
+    columns = [*keys, *(getattr(Bug, field) for field in fields if field not in key_names)]
+
+    def build(conditions):
+        statement = select(*columns).where(*conditions)
+        if cursor is not None:
+            statement = statement.where(tuple_(*keys) > tuple_(*cursor) if len(keys) > 1 else keys[0] > cursor[0])
+        return statement.order_by(*keys).limit(limit + 1)
+
+    if len(filters.severities) > 1 and not filters.ordered_by_path:
+        # One (scan_id, severity, id) range per severity instead of a sort
+        base_conditions = filters.conditions(scan_id, include_severity=False)
+        pages = [
+            db.session.execute(build(base_conditions + [Bug.severity == severity])).all()
+            for severity in filters.severities
+        ]
+        rows = list(islice(heapq.merge(*pages, key=lambda row: row.id), limit + 1))
+    else:
+        rows = db.session.execute(build(filters.conditions(scan_id))).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, name) for name in key_names])
+
+    findings = [{field: row._mapping[field] for field in fields} for row in rows]
+    return findings, next_cursor
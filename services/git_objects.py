@@ -0,0 +1,124 @@
+import os
+import logging
+import git
+from services.path_filter import filter_paths
+
+logger = logging.getLogger(__name__)
+
+# Tree entry modes of regular files; symlinks (120000) and submodules (160000) are skipped
+FILE_MODES = ('100644', '100755')
+
+class GitTreeSource:
+    """
+    Files of one commit, read straight from the git object database
+
+    The tree is enumerated once with `git ls-tree -r` and blob contents are
+    streamed through a single long-lived `git cat-file --batch` process, so a
+    scan never needs a working tree on disk.
+    """
+
+    def __init__(self, git_dir, commit='HEAD'):
+        """
+        Args:
+            git_dir (str): Path to a (bare) git repository
+            commit (str): Commit whose tree is scanned
+        """
+        self.git_dir = git_dir
+        self.repo = git.Repo(git_dir)
+        self.commit = self.repo.commit(commit).hexsha
+        self.entries = list_tree(self.repo, self.commit)
+
+    def list_files(self, exclude_patterns=None, use_gitignore=True, pathspecs=None):
+        """
+        List the files of the tree, skipping the paths a directory walk would skip
+
+        Args:
+            exclude_patterns (list): List of regex patterns to exclude
+            use_gitignore (bool): Skip files ignored by the tree's .gitignore files
+            pathspecs (list): Include and exclude pathspecs, see PathFilter
+
+        Returns:
+            list: File paths relative to the repository root
+        """
+        return filter_paths(self.entries, self.read_text, exclude_patterns, use_gitignore, pathspecs)
+
+    @property
+    def blob_shas(self):
+        """Blob SHA keyed by file path"""
+        return {path: blob_sha for path, (blob_sha, _) in self.entries.items()}
+
+    def size(self, file_path):
+        """
+        Get the size of a file of the tree without reading it
+
+        Args:
+            file_path (str): Path relative to the repository root
+
+        Returns:
+            int: Size in bytes
+        """
+        _, size = self.entries[file_path.replace(os.sep, '/')]
+        return size
+
+    def read(self, file_path):
+        """
+        Read the contents of a file of the tree
+
+        Args:
+            file_path (str): Path relative to the repository root
+
+        Returns:
+            bytes: File contents
+        """
+        blob_sha, _ = self.entries[file_path.replace(os.sep, '/')]
+        # GitPython keeps one `git cat-file --batch` process per Repo and reuses it
+        _, _, _, data = self.repo.git.get_object_data(blob_sha)
+        return data
+
+    def read_text(self, file_path):
+        """
+        Read a file of the tree as text, e.g. a .gitignore file
+
+        Args:
+            file_path (str): Path relative to the repository root
+
+        Returns:
+            str: Decoded file contents
+        """
+        return self.read(file_path).decode('utf-8', errors='ignore')
+
+    def close(self):
+        """Stop the git processes serving this tree"""
+        self.repo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def list_tree(repo, commit):
+    """
+    List the regular files of a commit with their blob SHA and size
+
+    Args:
+        repo (git.Repo): The repository
+        commit (str): SHA of the commit
+
+    Returns:
+        dict: (blob_sha, size) keyed by file path
+    """
+    output = repo.git.ls_tree('-r', '-z', '--long', '--full-tree', commit)
+
+    entries = {}
+    for entry in output.split('\0'):
+        if not entry:
+            continue
+        # Format: "<mode> <type> <sha> <size>\t<path>"
+        info, path = entry.split('\t', 1)
+        mode, object_type, blob_sha, size = info.split()
+        if object_type != 'blob' or mode not in FILE_MODES:
+            continue
+        entries[path] = (blob_sha, int(size))
+
+    return entries
@@ -1,11 +1,29 @@
 import os
 import json
 import logging
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from models import Bug, Repository
+from sqlalchemy import select
+from app import db, app
+from models import Bug, Scan
+from services.findings_export import get_export_chunk_size
+from services.scan_summary import SEVERITY_ORDER
+from services.report_manifest import ReportManifestWriter, bundle_filename, manifest_filename
+from services.report_artifacts import ReportArtifactStore, temporary_path
 
 logger = logging.getLogger(__name__)
 
+# Ways of writing the reports of a scan: one JSON artifact per bug, or a single bundle
+REPORT_FORMATS = ('files', 'ndjson', 'zip')
+
+# Threads writing report files
+REPORT_WRITER_THREADS = 4
+
+# Chunks of reports waiting for each writer thread before reading more bugs
+CHUNKS_IN_FLIGHT_PER_WRITER = 2
+
 def ensure_repo_directory(repo_name):
     """
     Ensure the directory structure for a repository exists
@@ -28,55 +46,232 @@ def ensure_repo_directory(repo_name):
         
     return repo_dir
 
-def generate_individual_bug_reports(scan_id, repository):
+def report_filename(bug):
+    """
+    Name of the report file of a bug
+
+    Args:
+        bug (Bug): Bug object or row with id and bug_type
+
+    Returns:
+        str: File name
+    """
+    return f"bug_{bug.id}_{bug.bug_type.replace(' ', '_').lower()}.json"
+
+def iter_bug_chunks(scan_id, chunk_size=None):
+    """
+    Read the bugs of a scan chunk by chunk, by severity then id
+
+    Each known severity is read with its own range scan of the
+    (scan_id, severity, id) index; other severities follow.
+
+    Args:
+        scan_id (int): ID of the scan
+        chunk_size (int): Bugs fetched per round trip, defaults to EXPORT_CHUNK_SIZE
+
+    Yields:
+        list: Rows of the next bugs, with the Bug column attributes
+    """
+    chunk_size = get_export_chunk_size(chunk_size)
+    columns = Bug.__table__.columns
+    statements = [
+        select(*columns).where(Bug.scan_id == scan_id, Bug.severity == severity).order_by(Bug.id)
+        for severity in SEVERITY_ORDER
+    ]
+    statements.append(
+        select(*columns)
+        .where(Bug.scan_id == scan_id, Bug.severity.notin_(SEVERITY_ORDER))
+        .order_by(Bug.severity, Bug.id)
+    )
+    for statement in statements:
+        yield from db.session.execute(statement.execution_options(yield_per=chunk_size)).partitions()
+
+def iter_report_chunks(scan_id, repository, chunk_size=None, timestamp=None):
+    """
+    Build the reports of the bugs of a scan, chunk by chunk
+
+    Args:
+        scan_id (int): ID of the scan
+        repository (Repository): Repository object
+        chunk_size (int): Bugs per chunk, defaults to EXPORT_CHUNK_SIZE
+        timestamp (str): Timestamp recorded in the reports
+
+    Yields:
+        list: (file name, report dict) pairs
+    """
+    for bugs in iter_bug_chunks(scan_id, chunk_size):
+        reports = []
+        for bug in bugs:
+            try:
+                reports.append((report_filename(bug), generate_bug_report(bug, repository, timestamp)))
+            except Exception as e:
+                logger.error(f"Error generating individual report for bug {bug.id}: {str(e)}")
+        yield reports
+
+def _store_report_artifacts(artifacts, files):
+    stored = []
+    for filename, data in files:
+        try:
+            stored.append((filename, artifacts.put(data)))
+        except Exception as e:
+            logger.error(f"Error writing individual report {filename}: {str(e)}")
+    return stored
+
+def write_report_files(artifacts, chunks, manifest, writer_threads=REPORT_WRITER_THREADS, progress=None):
+    """
+    Store one content-addressed artifact per report with a pool of writer threads
+
+    Reports are encoded as they are built and handed to the writers chunk by
+    chunk, with a bounded number waiting, so the reports of a scan are never
+    all held in memory. The writers hash, compress and write the artifacts;
+    reports already stored are not written again.
+
+    Args:
+        artifacts (ReportArtifactStore): Store of the report artifacts
+        chunks (iterable): Lists of (file name, report dict) pairs
+        manifest (ReportManifestWriter): Manifest recording the written reports
+        writer_threads (int): Number of writer threads
+        progress (callable): Called with the number of reports written so far
+
+    Returns:
+        int: Number of reports written
+    """
+    written = 0
+    pending = deque()
+
+    def collect():
+        nonlocal written
+        entries, future = pending.popleft()
+        for filename, digest in future.result():
+            manifest.add(*entries[filename], digest=digest)
+            written += 1
+        if progress:
+            progress(written)
+
+    with ThreadPoolExecutor(max_workers=writer_threads, thread_name_prefix='report-writer') as executor:
+        for reports in chunks:
+            files = [(filename, json.dumps(report).encode('utf-8')) for filename, report in reports]
+            entries = {
+                filename: (filename, report, 0, len(data))
+                for (filename, report), (_, data) in zip(reports, files)
+            }
+            pending.append((entries, executor.submit(_store_report_artifacts, artifacts, files)))
+            while len(pending) > writer_threads * CHUNKS_IN_FLIGHT_PER_WRITER:
+                collect()
+        while pending:
+            collect()
+    return written
+
+def write_report_bundle(bundle_path, chunks, report_format, manifest, progress=None):
+    """
+    Write all reports into a single NDJSON or zip file
+
+    The bundle is written under a temporary name unique to this writer and
+    moved into place once complete, so a partial bundle is never served,
+    even while another process generates the same bundle.
+
+    Args:
+        bundle_path (str): Path of the bundle
+        chunks (iterable): Lists of (file name, report dict) pairs
+        report_format (str): 'ndjson' (one {"filename", "report"} object per
+            line) or 'zip' (the report files, compressed)
+        manifest (ReportManifestWriter): Manifest recording the written reports
+        progress (callable): Called with the number of reports written so far
+
+    Returns:
+        int: Number of reports written
+    """
+    written = 0
+    temp_path = temporary_path(bundle_path)
+    try:
+        if report_format == 'zip':
+            with zipfile.ZipFile(temp_path, 'w', compression=zipfile.ZIP_DEFLATED) as bundle:
+                for reports in chunks:
+                    for filename, report in reports:
+                        data = json.dumps(report).encode('utf-8')
+                        bundle.writestr(filename, data)
+                        manifest.add(filename, report, 0, len(data))
+                    written += len(reports)
+                    if progress:
+                        progress(written)
+        else:
+            position = 0
+            with open(temp_path, 'wb') as bundle:
+                for reports in chunks:
+                    lines = []
+                    for filename, report in reports:
+                        line = json.dumps({'filename': filename, 'report': report}, separators=(',', ':')).encode('utf-8') + b'\n'
+                        manifest.add(filename, report, position, len(line) - 1)
+                        position += len(line)
+                        lines.append(line)
+                    bundle.write(b''.join(lines))
+                    written += len(reports)
+                    if progress:
+                        progress(written)
+        os.replace(temp_path, bundle_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return written
+
+def generate_individual_bug_reports(scan_id, repository, report_format='files', chunk_size=None,
+                                    writer_threads=REPORT_WRITER_THREADS, progress=None, artifact_dir=None):
     """
     Generate individual reports for each bug in a scan
     
+    Bugs are read and turned into reports chunk by chunk, most severe first.
+    The reports are stored as one content-addressed artifact per bug, or
+    written as a single bundle per scan, and listed in the scan's report
+    manifest. Reports carry the scan's timestamp, so regenerating them
+    yields the same artifacts.
+    
     Args:
         scan_id (int): ID of the scan
         repository (Repository): Repository object
+        report_format (str): 'files', 'ndjson' or 'zip'
+        chunk_size (int): Bugs read and handed to a writer at a time, defaults to EXPORT_CHUNK_SIZE
+        writer_threads (int): Number of threads writing report files
+        progress (callable): Called with the number of reports written so far
+        artifact_dir (str): Directory of the report artifact store, REPORT_ARTIFACT_DIR by default
         
     Returns:
         int: Number of reports generated
     """
-    logger.info(f"Generating individual bug reports for scan {scan_id}")
+    if report_format not in REPORT_FORMATS:
+        raise ValueError(f"Unknown report format: {report_format}")
+
+    logger.info(f"Generating individual bug reports for scan {scan_id} as {report_format}")
     
     # Create directory for repository
     repo_dir = ensure_repo_directory(repository.name)
+    scan = db.session.get(Scan, scan_id)
+    timestamp = scan.timestamp.isoformat() if scan.timestamp else None
+    chunks = iter_report_chunks(scan_id, repository, chunk_size, timestamp)
+    manifest = ReportManifestWriter(os.path.join(repo_dir, manifest_filename(scan_id)), scan_id, report_format)
     
-    # Query bugs for this scan
-    bugs = Bug.query.filter_by(scan_id=scan_id).all()
-    
-    # Generate report for each bug
-    reports_generated = 0
-    for bug in bugs:
-        try:
-            # Generate report
-            report = generate_bug_report(bug, repository)
-            
-            # Create unique filename
-            filename = f"bug_{bug.id}_{bug.bug_type.replace(' ', '_').lower()}.json"
-            file_path = os.path.join(repo_dir, filename)
-            
-            # Write report to file
-            with open(file_path, 'w') as f:
-                json.dump(report, f, indent=2)
-                
-            reports_generated += 1
-            
-        except Exception as e:
-            logger.error(f"Error generating individual report for bug {bug.id}: {str(e)}")
+    try:
+        if report_format == 'files':
+            artifacts = ReportArtifactStore(artifact_dir or app.config['REPORT_ARTIFACT_DIR'])
+            reports_generated = write_report_files(artifacts, chunks, manifest, writer_threads, progress)
+        else:
+            bundle_path = os.path.join(repo_dir, bundle_filename(scan_id, report_format))
+            reports_generated = write_report_bundle(bundle_path, chunks, report_format, manifest, progress)
+        manifest.commit()
+    except Exception:
+        manifest.discard()
+        raise
     
     logger.info(f"Generated {reports_generated} individual bug reports for scan {scan_id}")
     return reports_generated
 
-def generate_bug_report(bug, repository):
+def generate_bug_report(bug, repository, timestamp=None):
     """
     Generate a detailed report for a single bug
     
     Args:
         bug (Bug): Bug object
         repository (Repository): Repository object
+        timestamp (str): ISO timestamp recorded in the report, the current time by default
         
     Returns:
         dict: Report data
@@ -106,7 +301,7 @@ def generate_bug_report(bug, repository):
                 "language": bug.language
             },
             "vulnerability_category": bug.bug_type,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": timestamp or datetime.utcnow().isoformat()
         },
         "severity": {
             "level": bug.severity,
@@ -0,0 +1,327 @@
+import os
+import fcntl
+import shutil
+import hashlib
+import logging
+import threading
+import subprocess
+from contextlib import contextmanager
+import git
+from app import app
+
+logger = logging.getLogger(__name__)
+
+class MirrorCache:
+    """
+    Persistent cache of bare mirror clones, one per repository URL
+
+    The first scan of a repository creates a bare mirror (optionally
+    blobless or shallow); later scans only fetch new objects into it. Each
+    scan gets its own worktree checked out from the mirror. Least recently
+    used mirrors are evicted once the cache grows past its size limit.
+    No-checkout scans read a mirror directly instead of through a worktree.
+
+    Several processes may share the cache directory, so mirrors are guarded
+    by file locks next to them rather than in-process locks: an update lock
+    serializes fetches and worktree changes, and readers hold a shared use
+    lock that keeps the mirror from being evicted.
+    """
+
+    def __init__(self, root, max_bytes, clone_filter=None, depth=None):
+        """
+        Args:
+            root (str): Directory holding the mirrors
+            max_bytes (int): Size limit of the cache
+            clone_filter (str): Partial clone filter, e.g. 'blob:none'
+            depth (int): History depth of shallow mirrors, None for full history
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.clone_filter = clone_filter or None
+        self.depth = depth or None
+        os.makedirs(root, exist_ok=True)
+
+    def mirror_path(self, repo_url):
+        """
+        Get the location of the mirror for a repository URL
+
+        Args:
+            repo_url (str): The URL of the repository
+
+        Returns:
+            str: Path of the bare mirror
+        """
+        key = hashlib.sha1(repo_url.encode('utf-8')).hexdigest()
+        return os.path.join(self.root, f"{key}.git")
+
+    def _update(self, repo_url, mirror_path):
+        options = {}
+        if self.clone_filter:
+            options['filter'] = self.clone_filter
+        if self.depth:
+            options['depth'] = self.depth
+
+        if os.path.isdir(mirror_path):
+            logger.info(f"Fetching {repo_url} into mirror {mirror_path}")
+            try:
+                git.Repo(mirror_path).git.fetch('origin', prune=True, **options)
+                os.utime(mirror_path)
+                return
+            except (git.InvalidGitRepositoryError, git.GitCommandError) as e:
+                logger.warning(f"Mirror {mirror_path} could not be updated, recreating it: {str(e)}")
+                shutil.rmtree(mirror_path, ignore_errors=True)
+
+        logger.info(f"Creating mirror of {repo_url} at {mirror_path}")
+        git.Repo.clone_from(repo_url, mirror_path, mirror=True, **options)
+
+    def checkout(self, repo_url, target_dir):
+        """
+        Check out the default branch of a repository from its mirror
+
+        Args:
+            repo_url (str): The URL of the repository
+            target_dir (str): Directory to create the worktree in
+
+        Returns:
+            str: The path to the checked-out worktree
+        """
+        mirror_path = self.mirror_path(repo_url)
+
+        with mirror_lock(mirror_path, 'update'):
+            self._update(repo_url, mirror_path)
+
+            if os.path.exists(target_dir):
+                logger.info(f"Cleaning up existing directory: {target_dir}")
+                shutil.rmtree(target_dir)
+
+            mirror = git.Repo(mirror_path)
+            mirror.git.worktree('prune')
+            mirror.git.worktree('add', '--detach', '--force', target_dir, 'HEAD')
+
+        self.evict(keep=mirror_path)
+        return target_dir
+
+    @contextmanager
+    def open(self, repo_url):
+        """
+        Update the mirror of a repository and keep it from being evicted while in use
+
+        The blobs of the default branch missing from a partial mirror are
+        fetched up front, so they can be read without a checkout.
+
+        Args:
+            repo_url (str): The URL of the repository
+
+        Yields:
+            str: Path of the bare mirror
+        """
+        mirror_path = self.mirror_path(repo_url)
+
+        with mirror_lock(mirror_path, 'use', exclusive=False):
+            with mirror_lock(mirror_path, 'update'):
+                self._update(repo_url, mirror_path)
+                if self.clone_filter:
+                    prefetch_missing_blobs(mirror_path, 'HEAD', self.clone_filter)
+
+            self.evict(keep=mirror_path)
+            yield mirror_path
+
+    def remove_worktree(self, worktree_path):
+        """
+        Delete a worktree and its registration in the mirror
+
+        Args:
+            worktree_path (str): The path to a worktree created by checkout
+        """
+        mirror_path = get_worktree_mirror(worktree_path)
+        shutil.rmtree(worktree_path, ignore_errors=True)
+
+        if mirror_path and os.path.isdir(mirror_path):
+            with mirror_lock(mirror_path, 'update'):
+                git.Repo(mirror_path).git.worktree('prune')
+
+    def evict(self, keep=None):
+        """
+        Remove least recently used mirrors until the cache fits its size limit
+
+        Mirrors with a checked-out worktree, an update in progress or an
+        open reader, in any process, are kept.
+
+        Args:
+            keep (str): Path of a mirror that must not be evicted
+
+        Returns:
+            int: Number of mirrors removed
+        """
+        mirrors = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if os.path.isdir(path) and name.endswith('.git'):
+                mirrors.append((os.path.getmtime(path), path, get_directory_size(path)))
+
+        excess = sum(size for _, _, size in mirrors) - self.max_bytes
+        removed = 0
+
+        for _, path, size in sorted(mirrors):
+            if excess <= 0:
+                break
+            if path == keep:
+                continue
+
+            with mirror_lock(path, 'update', blocking=False) as updating, \
+                    mirror_lock(path, 'use', blocking=False) as using:
+                # Worktrees are checked under the update lock, which guards adding them
+                if not (updating and using) or has_worktrees(path):
+                    continue
+                logger.info(f"Evicting repository mirror {path}")
+                shutil.rmtree(path, ignore_errors=True)
+
+            excess -= size
+            removed += 1
+
+        return removed
+
+@contextmanager
+def mirror_lock(mirror_path, kind, exclusive=True, blocking=True):
+    """
+    Hold a lock on a mirror, shared by the threads and processes using the cache
+
+    The lock is an flock on a file next to the mirror. Lock files are left
+    in place, as removing one could let two holders lock different files.
+
+    Args:
+        mirror_path (str): Path of the bare mirror
+        kind (str): 'update' for fetches and worktree changes, 'use' for readers
+        exclusive (bool): Take the lock exclusively rather than shared
+        blocking (bool): Wait for the lock rather than give up at once
+
+    Yields:
+        bool: Whether the lock is held; always True when blocking
+    """
+    operation = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+    if not blocking:
+        operation |= fcntl.LOCK_NB
+
+    # Each call opens its own file, so threads of one process exclude each other too
+    with open(f"{mirror_path}.{kind}.lock", 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, operation)
+        except BlockingIOError:
+            yield False
+            return
+        # Closing the file releases the lock
+        yield True
+
+def has_worktrees(mirror_path):
+    """
+    Check whether a mirror has worktrees registered
+
+    Args:
+        mirror_path (str): Path of the bare mirror
+
+    Returns:
+        bool: True if at least one worktree is registered
+    """
+    worktrees_dir = os.path.join(mirror_path, 'worktrees')
+    return os.path.isdir(worktrees_dir) and bool(os.listdir(worktrees_dir))
+
+def prefetch_missing_blobs(git_dir, commit, clone_filter):
+    """
+    Fetch the blobs of a commit's tree missing from a partial clone in one go
+
+    Without this, `git cat-file` would lazily fetch missing blobs one request
+    at a time. Failures are logged and left to that lazy fallback.
+
+    Args:
+        git_dir (str): Path to a (bare) partial clone
+        commit (str): Commit whose blobs are needed
+        clone_filter (str): Filter the clone was made with
+    """
+    try:
+        output = git.Repo(git_dir).git.rev_list(
+            '--objects', '--missing=print', '--no-object-names', f'{commit}^{{tree}}'
+        )
+        missing = [line[1:] for line in output.splitlines() if line.startswith('?')]
+        if not missing:
+            return
+
+        logger.info(f"Prefetching {len(missing)} missing blobs into {git_dir}")
+        subprocess.run(
+            [
+                'git', '--git-dir', git_dir, '-c', 'fetch.negotiationAlgorithm=noop',
+                'fetch', 'origin', '--no-tags', '--no-write-fetch-head', '--recurse-submodules=no',
+                f'--filter={clone_filter}', '--stdin'
+            ],
+            input='\n'.join(missing) + '\n',
+            capture_output=True,
+            text=True,
+            check=True
+        )
+    except (git.GitCommandError, subprocess.CalledProcessError, OSError) as e:
+        logger.warning(f"Unable to prefetch blobs into {git_dir}: {str(e)}")
+
+def get_worktree_mirror(worktree_path):
+    """
+    Find the mirror a worktree was checked out from
+
+    Args:
+        worktree_path (str): The path to a worktree
+
+    Returns:
+        str or None: Path of the mirror, None if worktree_path is not a worktree
+    """
+    dot_git = os.path.join(worktree_path, '.git')
+    if not os.path.isfile(dot_git):
+        return None
+
+    with open(dot_git, 'r') as f:
+        content = f.read().strip()
+
+    # Format: "gitdir: <mirror>/worktrees/<name>"
+    if not content.startswith('gitdir:'):
+        return None
+    worktree_git_dir = content[len('gitdir:'):].strip()
+    return os.path.dirname(os.path.dirname(worktree_git_dir))
+
+def get_directory_size(path):
+    """
+    Compute the total size of the files under a directory
+
+    Args:
+        path (str): Directory to measure
+
+    Returns:
+        int: Size in bytes
+    """
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+_mirror_cache = None
+_mirror_cache_lock = threading.Lock()
+
+def get_mirror_cache():
+    """
+    Get the process-wide mirror cache configured from the app settings
+
+    Returns:
+        MirrorCache or None: The mirror cache, None if it is disabled
+    """
+    global _mirror_cache
+    if not app.config.get('MIRROR_CACHE_ENABLED', True):
+        return None
+
+    with _mirror_cache_lock:
+        if _mirror_cache is None:
+            _mirror_cache = MirrorCache(
+                root=os.path.join(app.config["REPO_TEMP_DIR"], 'mirrors'),
+                max_bytes=app.config.get('MIRROR_CACHE_MAX_BYTES') or 2 * 1024 * 1024 * 1024,
+                clone_filter=app.config.get('MIRROR_CLONE_FILTER'),
+                depth=app.config.get('MIRROR_CLONE_DEPTH')
+            )
+        return _mirror_cache
@@ -0,0 +1,338 @@
+import re
+import logging
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Paths skipped when listing repository files
+DEFAULT_EXCLUDE_PATTERNS = [
+    r'\.git/',
+    r'(^|/)\.git$',  # worktrees have a .git file instead of a directory
+    r'node_modules/',
+    r'__pycache__/',
+    r'\.venv/',
+    r'\.env/',
+    r'\.DS_Store',
+    r'\.idea/',
+    r'\.vscode/',
+    r'\.png$',
+    r'\.jpg$',
+    r'\.jpeg$',
+    r'\.gif$',
+    r'\.svg$',
+    r'\.pdf$',
+    r'\.zip$',
+    r'\.tar$',
+    r'\.gz$'
+]
+
+GITIGNORE_NAME = '.gitignore'
+
+@lru_cache(maxsize=32)
+def compile_exclude_matcher(patterns):
+    """
+    Fold exclude patterns into a single compiled matcher
+
+    Args:
+        patterns (tuple): Regex patterns searched in paths relative to the
+            repository root; directories are tested with a trailing slash
+
+    Returns:
+        re.Pattern or None: Combined matcher, None if there are no patterns
+    """
+    if not patterns:
+        return None
+    return re.compile('|'.join(f'(?:{pattern})' for pattern in patterns))
+
+def translate_glob(pattern):
+    """
+    Translate a gitignore-style glob into a regex matching whole paths
+
+    Args:
+        pattern (str): Glob using '*', '?', '[...]' and '**'
+
+    Returns:
+        str: Regex source
+    """
+    out = []
+    i = 0
+    n = len(pattern)
+
+    while i < n:
+        c = pattern[i]
+
+        if pattern.startswith('**', i) and (i == 0 or pattern[i - 1] == '/') and (i + 2 == n or pattern[i + 2] == '/'):
+            if i + 2 == n:
+                # Trailing "/**": everything inside
+                out.append('.*')
+                i += 2
+            else:
+                # Leading or inner "**/": zero or more directories
+                out.append('(?:.*/)?')
+                i += 3
+            continue
+
+        if c == '*':
+            out.append('[^/]*')
+            while i + 1 < n and pattern[i + 1] == '*':
+                i += 1
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            start = i + 1
+            if start < n and pattern[start] in '!^':
+                start += 1
+            if start < n and pattern[start] == ']':
+                start += 1
+            end = pattern.find(']', start)
+            if end < 0:
+                out.append(re.escape(c))
+            else:
+                chars = pattern[i + 1:end]
+                if chars[0] in '!^':
+                    chars = '^' + chars[1:]
+                out.append('[' + chars.replace('\\', '\\\\') + ']')
+                i = end
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+
+    return ''.join(out)
+
+def parse_ignore_pattern(line):
+    """
+    Parse one line of a .gitignore file
+
+    Args:
+        line (str): The line, without terminator
+
+    Returns:
+        tuple or None: (regex source, negated, directory only), None for
+        blank lines and comments
+    """
+    if line.startswith('#'):
+        return None
+
+    # Trailing spaces are ignored unless escaped
+    stripped = line.rstrip(' ')
+    if stripped.endswith('\\') and len(stripped) < len(line):
+        stripped += ' '
+    line = stripped.rstrip('\r')
+    if not line:
+        return None
+
+    negated = line.startswith('!')
+    if negated:
+        line = line[1:]
+    elif line.startswith('\\'):
+        line = line[1:]
+
+    directory_only = line.endswith('/')
+    line = line.rstrip('/')
+    if not line:
+        return None
+
+    # A slash anywhere but at the end anchors the pattern to its .gitignore
+    anchored = '/' in line
+    regex = translate_glob(line.lstrip('/'))
+    if not anchored:
+        regex = '(?:.*/)?' + regex
+    return regex, negated, directory_only
+
+class IgnoreRules:
+    """
+    The rules of one .gitignore file, compiled into two matchers
+
+    Later rules take precedence, so the rules are folded into a single
+    alternation in reverse order: the first alternative matching a whole
+    path is the deciding rule.
+    """
+
+    def __init__(self, lines):
+        """
+        Args:
+            lines (iterable): Lines of the .gitignore file
+        """
+        rules = [rule for rule in map(parse_ignore_pattern, lines) if rule is not None]
+        self.rule_count = len(rules)
+        self.directory_matcher = self._compile(rules)
+        self.file_matcher = self._compile([rule for rule in rules if not rule[2]])
+
+    @staticmethod
+    def _compile(rules):
+        alternatives = [
+            f"(?P<{'n' if negated else 'i'}{index}>{regex})"
+            for index, (regex, negated, _) in reversed(list(enumerate(rules)))
+        ]
+        if not alternatives:
+            return None
+        try:
+            return re.compile('|'.join(alternatives))
+        except re.error as e:
+            logger.warning(f"Ignoring unparseable .gitignore rules: {str(e)}")
+            return None
+
+    def match(self, relative_path, is_dir):
+        """
+        Decide whether a path is ignored by these rules
+
+        Args:
+            relative_path (str): Path relative to the .gitignore's directory
+            is_dir (bool): Whether the path is a directory
+
+        Returns:
+            bool or None: True if ignored, False if re-included by a negated
+            rule, None if no rule matches
+        """
+        matcher = self.directory_matcher if is_dir else self.file_matcher
+        if matcher is None:
+            return None
+        match = matcher.fullmatch(relative_path)
+        if match is None:
+            return None
+        return match.lastgroup.startswith('i')
+
+class PathFilter:
+    """
+    Decide which repository paths a scan includes
+
+    A path is skipped when it matches an exclude pattern, is ignored by a
+    .gitignore file of its directory or any parent, matches an exclude
+    pathspec, or, when include pathspecs are given, matches none of them.
+
+    Pathspecs are read like the lines of a .gitignore file at the
+    repository root; those prefixed with '!' or ':!' exclude, the others
+    include.
+    """
+
+    def __init__(self, exclude_patterns=None, pathspecs=None):
+        """
+        Args:
+            exclude_patterns (list): Regex patterns to exclude, defaults to
+                DEFAULT_EXCLUDE_PATTERNS
+            pathspecs (list): Include and exclude pathspecs
+        """
+        if exclude_patterns is None:
+            exclude_patterns = DEFAULT_EXCLUDE_PATTERNS
+        self.exclude = compile_exclude_matcher(tuple(exclude_patterns))
+        self.gitignores = {}
+
+        includes = []
+        excludes = []
+        for pathspec in pathspecs or ():
+            pathspec = pathspec.strip()
+            if pathspec.startswith(':!'):
+                excludes.append(pathspec[2:])
+            elif pathspec.startswith('!'):
+                excludes.append(pathspec[1:])
+            elif pathspec:
+                includes.append(pathspec)
+
+        self.pathspec_excludes = IgnoreRules(excludes) if excludes else None
+
+        # An include pathspec matching a directory includes everything in it
+        include_regexes = []
+        for pathspec in includes:
+            rule = parse_ignore_pattern(pathspec)
+            if rule is not None:
+                include_regexes.append(f'(?:{rule[0]})')
+        self.include = re.compile('(?:' + '|'.join(include_regexes) + ')(?:/.*)?') if include_regexes else None
+
+    def add_gitignore(self, directory, text):
+        """
+        Register the .gitignore file of a directory
+
+        Args:
+            directory (str): Directory relative to the repository root, '' for the root
+            text (str): Contents of the .gitignore file
+        """
+        rules = IgnoreRules(text.split('\n'))
+        if rules.rule_count:
+            self.gitignores[directory] = rules
+
+    def is_gitignored(self, path, is_dir):
+        """
+        Check a path against the .gitignore files of its parent directories,
+        the deepest one taking precedence
+
+        Args:
+            path (str): Path relative to the repository root, '/' separated
+            is_dir (bool): Whether the path is a directory
+
+        Returns:
+            bool: True if ignored
+        """
+        parent = path
+        while parent:
+            parent = parent.rpartition('/')[0]
+            rules = self.gitignores.get(parent)
+            if rules is not None:
+                decision = rules.match(path[len(parent) + 1:] if parent else path, is_dir)
+                if decision is not None:
+                    return decision
+        return False
+
+    def is_excluded(self, path, is_dir=False):
+        """
+        Check whether a path is skipped; parent directories are not checked
+
+        Args:
+            path (str): Path relative to the repository root, '/' separated
+            is_dir (bool): Whether the path is a directory
+
+        Returns:
+            bool: True if the path is skipped
+        """
+        if self.exclude is not None and self.exclude.search(path + '/' if is_dir else path):
+            return True
+        if self.pathspec_excludes is not None and self.pathspec_excludes.match(path, is_dir):
+            return True
+        if self.gitignores and self.is_gitignored(path, is_dir):
+            return True
+        if not is_dir and self.include is not None and not self.include.fullmatch(path):
+            return True
+        return False
+
+def filter_paths(paths, read_text=None, exclude_patterns=None, use_gitignore=True, pathspecs=None):
+    """
+    Filter a flat list of file paths, e.g. a git tree listing, the same way
+    a directory walk would, .gitignore files included
+
+    Args:
+        paths (iterable): File paths relative to the repository root, '/' separated
+        read_text (callable): Returns the text of a listed .gitignore file
+            given its path; required when use_gitignore is set
+        exclude_patterns (list): Regex patterns to exclude
+        use_gitignore (bool): Honor the .gitignore files among paths
+        pathspecs (list): Include and exclude pathspecs
+
+    Returns:
+        list: Paths the scan includes, in input order
+    """
+    paths = list(paths)
+    path_filter = PathFilter(exclude_patterns, pathspecs)
+
+    if use_gitignore and read_text is not None:
+        for path in paths:
+            directory, _, name = path.rpartition('/')
+            if name == GITIGNORE_NAME:
+                path_filter.add_gitignore(directory, read_text(path))
+
+    # Files below an excluded directory are skipped, like an unvisited subtree
+    excluded_directories = {'': False}
+
+    def is_directory_excluded(directory):
+        excluded = excluded_directories.get(directory)
+        if excluded is None:
+            parent = directory.rpartition('/')[0]
+            excluded = is_directory_excluded(parent) or path_filter.is_excluded(directory, True)
+            excluded_directories[directory] = excluded
+        return excluded
+
+    return [
+        path for path in paths
+        if not is_directory_excluded(path.rpartition('/')[0]) and not path_filter.is_excluded(path)
+    ]
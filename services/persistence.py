@@ -0,0 +1,172 @@
+import time
+import logging
+from sqlalchemy import select, delete, insert, literal
+from app import db, app
+from models import Bug, LanguageStats
+
+logger = logging.getLogger(__name__)
+
+# Paths handled per statement when removing carried-forward findings
+PATH_BATCH_SIZE = 500
+
+# Bug columns filled from an analyzer finding, in finding tuple order
+FINDING_COLUMNS = (
+    'file_path',
+    'line_number',
+    'bug_type',
+    'severity',
+    'description',
+    'code_snippet',
+    'recommendation',
+    'language'
+)
+
+class ScanResultWriter:
+    """
+    Persist the results of a scan with as few database round-trips as possible
+
+    Findings are buffered as tuples and written with one executemany INSERT
+    per batch, or sooner once the oldest buffered finding has waited
+    flush_interval seconds, so findings show up while a scan runs. Per-language file, line and bug counts are tallied in memory
+    and the LanguageStats rows are written once when the scan finishes.
+    """
+
+    def __init__(self, scan_id, batch_size=None, flush_interval=None):
+        """
+        Args:
+            scan_id (int): ID of the scan in the database
+            batch_size (int): Findings per INSERT, defaults to FINDINGS_BATCH_SIZE
+            flush_interval (float): Seconds findings may stay buffered,
+                defaults to FINDINGS_FLUSH_INTERVAL
+        """
+        self.scan_id = scan_id
+        self.batch_size = max(1, int(batch_size or app.config.get('FINDINGS_BATCH_SIZE') or 1000))
+        if flush_interval is None:
+            flush_interval = app.config.get('FINDINGS_FLUSH_INTERVAL', 2.0)
+        self.flush_interval = flush_interval
+        self.pending = []
+        self.pending_since = None
+        self.language_stats = {}
+        self.total_bugs = 0
+
+    def add_file(self, file_path, language, line_count, bugs):
+        """
+        Record an analyzed file and queue its findings
+
+        Args:
+            file_path (str): Path relative to repository root
+            language (str): Detected language of the file
+            line_count (int): Number of lines in the file
+            bugs (list): Findings reported by the analyzers
+        """
+        stats = self.language_stats.get(language)
+        if stats is None:
+            stats = self.language_stats[language] = {'file_count': 0, 'line_count': 0, 'bug_count': 0}
+
+        stats['file_count'] += 1
+        stats['line_count'] += line_count
+        stats['bug_count'] += len(bugs)
+
+        if bugs and not self.pending:
+            self.pending_since = time.monotonic()
+
+        for bug_info in bugs:
+            self.pending.append((
+                file_path,
+                bug_info.get('line_number'),
+                bug_info.get('bug_type'),
+                bug_info.get('severity'),
+                bug_info.get('description'),
+                bug_info.get('code_snippet'),
+                bug_info.get('recommendation'),
+                language
+            ))
+
+        self.total_bugs += len(bugs)
+
+        if len(self.pending) >= self.batch_size or (
+            self.pending and time.monotonic() - self.pending_since >= self.flush_interval
+        ):
+            self.flush()
+
+    def carry_forward(self, base_scan_id, stale_files):
+        """
+        Start from the results of a previous scan of the same repository
+
+        The findings and language statistics of base_scan_id are copied to
+        this scan, minus the contribution of files that changed since.
+
+        Args:
+            base_scan_id (int): ID of the scan to build on
+            stale_files (dict): (language, line_count) of the previously
+                scanned version of every changed or deleted file, keyed by path
+        """
+        for stat in LanguageStats.query.filter_by(scan_id=base_scan_id):
+            self.language_stats[stat.language] = {
+                'file_count': stat.file_count or 0,
+                'line_count': stat.line_count or 0,
+                'bug_count': stat.bug_count or 0
+            }
+
+        for language, line_count in stale_files.values():
+            stats = self.language_stats.get(language)
+            if stats:
+                stats['file_count'] -= 1
+                stats['line_count'] -= line_count
+
+        # Copy every finding in one INSERT ... SELECT, then drop those of changed files
+        columns = [getattr(Bug, column) for column in FINDING_COLUMNS]
+        copied = db.session.execute(
+            insert(Bug).from_select(
+                ['scan_id', *FINDING_COLUMNS],
+                select(literal(self.scan_id), *columns).where(Bug.scan_id == base_scan_id).order_by(Bug.id)
+            )
+        ).rowcount
+        self.total_bugs += copied
+
+        stale_paths = list(stale_files)
+        for start in range(0, len(stale_paths), PATH_BATCH_SIZE):
+            batch = stale_paths[start:start + PATH_BATCH_SIZE]
+            stale = Bug.file_path.in_(batch)
+            counts = db.session.execute(
+                select(Bug.language, db.func.count())
+                .where(Bug.scan_id == self.scan_id, stale)
+                .group_by(Bug.language)
+            )
+            for language, count in counts:
+                if language in self.language_stats:
+                    self.language_stats[language]['bug_count'] -= count
+                self.total_bugs -= count
+
+            db.session.execute(delete(Bug).where(Bug.scan_id == self.scan_id, stale))
+
+        # Languages whose files were all removed
+        for language in [language for language, stats in self.language_stats.items() if stats['file_count'] <= 0]:
+            del self.language_stats[language]
+
+        db.session.commit()
+        logger.info(f"Carried {self.total_bugs} findings forward from scan {base_scan_id} to scan {self.scan_id}")
+
+    def flush(self):
+        """Write all buffered findings in a single batched INSERT"""
+        if not self.pending:
+            return
+
+        rows = [dict(zip(FINDING_COLUMNS, finding), scan_id=self.scan_id) for finding in self.pending]
+        db.session.execute(Bug.__table__.insert(), rows)
+        db.session.commit()
+        logger.debug(f"Wrote {len(rows)} findings for scan {self.scan_id}")
+        self.pending = []
+
+    def finish(self):
+        """Flush remaining findings and write the language statistics"""
+        self.flush()
+
+        if self.language_stats:
+            rows = [
+                {'scan_id': self.scan_id, 'language': language, **stats}
+                for language, stats in self.language_stats.items()
+            ]
+            db.session.execute(LanguageStats.__table__.insert(), rows)
+
+        db.session.commit()
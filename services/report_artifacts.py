@@ -0,0 +1,98 @@
+import os
+import re
+import gzip
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# zlib level of the precompressed variants; they are written once and served many times
+GZIP_LEVEL = 9
+
+# Hex SHA-256 digests name the artifacts
+DIGEST_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+def temporary_path(path):
+    """
+    Name a temporary file to write before moving it to path
+
+    The name is unique to the writing process and thread, so concurrent
+    writers of the same file, in one process or several, never share it.
+
+    Args:
+        path (str): Final path of the file
+
+    Returns:
+        str: Path of the temporary file, in the same directory
+    """
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+class ReportArtifactStore:
+    """
+    Content-addressed store of report artifacts
+
+    Each artifact is stored once under the SHA-256 digest of its content,
+    as <digest[:2]>/<digest>.json, together with a gzip variant written at
+    the same time. An artifact never changes once written, so it can be
+    served with a strong ETag and cached as immutable.
+    """
+
+    def __init__(self, root):
+        """
+        Args:
+            root (str): Directory of the store
+        """
+        self.root = root
+
+    def path(self, digest, compressed=False):
+        """
+        Path of an artifact
+
+        Args:
+            digest (str): SHA-256 digest of the artifact
+            compressed (bool): Path of the gzip variant
+
+        Returns:
+            str: Path of the file
+        """
+        return os.path.join(self.root, digest[:2], f"{digest}.json" + ('.gz' if compressed else ''))
+
+    def exists(self, digest):
+        """
+        Whether an artifact and its gzip variant are stored
+
+        Args:
+            digest (str): SHA-256 digest of the artifact
+
+        Returns:
+            bool: Whether the artifact is stored
+        """
+        return os.path.exists(self.path(digest, compressed=True))
+
+    def put(self, data):
+        """
+        Store an artifact and its gzip variant, unless already stored
+
+        Both files are written under temporary names and moved into place,
+        the gzip variant last, so a stored variant means a complete artifact.
+
+        Args:
+            data (bytes): Content of the artifact
+
+        Returns:
+            str: SHA-256 digest of the artifact
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        if self.exists(digest):
+            return digest
+
+        os.makedirs(os.path.join(self.root, digest[:2]), exist_ok=True)
+        # mtime=0 keeps the gzip variant identical for identical content
+        for path, content in ((self.path(digest), data),
+                              (self.path(digest, compressed=True), gzip.compress(data, GZIP_LEVEL, mtime=0))):
+            temp_path = temporary_path(path)
+            with open(temp_path, 'wb') as f:
+                f.write(content)
+            os.replace(temp_path, path)
+        return digest
@@ -0,0 +1,107 @@
+import logging
+import threading
+from app import db, app
+from models import Repository, Scan
+from services.scan_jobs import ScanJobQueue
+from services.individual_report_generator import generate_individual_bug_reports, REPORT_WRITER_THREADS
+
+logger = logging.getLogger(__name__)
+
+class ReportJobQueue(ScanJobQueue):
+    """
+    Bounded pool of background workers that generate the individual bug
+    reports of scans
+
+    Jobs are keyed by scan; their state also records the report format and
+    the number of reports written so far.
+    """
+
+    thread_name_prefix = 'report-worker'
+
+    # Report jobs do not keep their scan alive
+    heartbeat_interval = None
+
+    def submit(self, scan_id, report_format='files'):
+        """
+        Queue the report generation of a scan, unless it is already queued or
+        running
+
+        Args:
+            scan_id (int): ID of the scan in the database
+            report_format (str): 'files', 'ndjson' or 'zip'
+
+        Returns:
+            bool: Whether the generation was queued
+        """
+        with self.lock:
+            job = self.jobs.get(scan_id)
+            if job and job['state'] in ('queued', 'running'):
+                return False
+            self.jobs[scan_id] = {'state': 'queued', 'error': None, 'format': report_format, 'reports_written': 0}
+        self.executor.submit(self._run, scan_id, report_format)
+        return True
+
+    def _run(self, scan_id, report_format):
+        with app.app_context():
+            try:
+                self._update(scan_id, state='running')
+                scan = db.session.get(Scan, scan_id)
+                repo = db.session.get(Repository, scan.repository_id)
+                generate_individual_bug_reports(
+                    scan_id,
+                    repo,
+                    report_format=report_format,
+                    writer_threads=max(1, int(app.config.get('REPORT_WRITER_THREADS') or REPORT_WRITER_THREADS)),
+                    progress=lambda written: self._update(scan_id, reports_written=written)
+                )
+                self._update(scan_id, state='completed')
+            except Exception as e:
+                logger.error(f"Report generation for scan {scan_id} failed: {str(e)}")
+                self._update(scan_id, state='failed', error=str(e))
+            finally:
+                db.session.remove()
+
+_report_queue = None
+_report_queue_lock = threading.Lock()
+
+def get_report_queue():
+    """
+    Get the process-wide report job queue, creating it on first use
+
+    Returns:
+        ReportJobQueue: The report job queue
+    """
+    global _report_queue
+    with _report_queue_lock:
+        if _report_queue is None:
+            _report_queue = ReportJobQueue(max_workers=max(1, int(app.config.get('REPORT_WORKERS') or 1)))
+        return _report_queue
+
+def enqueue_report_generation(scan_id, report_format='files'):
+    """
+    Queue the generation of the individual bug reports of a scan
+
+    A scan whose reports are already queued or being generated is not
+    queued again.
+
+    Args:
+        scan_id (int): ID of the scan in the database
+        report_format (str): 'files', 'ndjson' or 'zip'
+
+    Returns:
+        bool: Whether the generation was queued
+    """
+    return get_report_queue().submit(scan_id, report_format)
+
+def get_report_status(scan_id):
+    """
+    Get the state of the report generation of a scan
+
+    Args:
+        scan_id (int): ID of the scan
+
+    Returns:
+        dict or None: Job state, or None if this process has not generated
+        the reports of the scan
+    """
+    return get_report_queue().get(scan_id) if _report_queue is not None else None
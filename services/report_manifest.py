@@ -0,0 +1,269 @@
+import os
+import json
+import logging
+import zipfile
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from services.report_artifacts import temporary_path
+
+logger = logging.getLogger(__name__)
+
+# Columns of a manifest entry; offset and size locate the report body in its file, and
+# digest names the report artifact of reports written as separate files
+MANIFEST_FIELDS = ('filename', 'bug_type', 'severity', 'offset', 'size', 'digest')
+
+# Parsed manifests kept in memory, reloaded when the file changes
+MANIFEST_CACHE_SIZE = 8
+
+def bundle_filename(scan_id, report_format):
+    """
+    Name of the single-file bundle holding all reports of a scan
+
+    Args:
+        scan_id (int): ID of the scan
+        report_format (str): 'ndjson' or 'zip'
+
+    Returns:
+        str: File name
+    """
+    return f"scan_{scan_id}_reports.{report_format}"
+
+def manifest_filename(scan_id):
+    """
+    Name of the manifest of the individual bug reports of a scan
+
+    Args:
+        scan_id (int): ID of the scan
+
+    Returns:
+        str: File name
+    """
+    return f"scan_{scan_id}_manifest.json"
+
+class ReportManifestWriter:
+    """
+    Writes the manifest of the reports of a scan as they are generated
+
+    Entries are appended to a temporary file unique to this writer, which
+    replaces the manifest once all reports are written, so readers never see
+    a partial manifest, even while another process writes the same one.
+    Entries must be added with the reports of each severity together, as
+    the listing relies on it to page through one severity.
+    """
+
+    def __init__(self, path, scan_id, report_format):
+        """
+        Args:
+            path (str): Path of the manifest
+            scan_id (int): ID of the scan
+            report_format (str): 'files', 'ndjson' or 'zip'
+        """
+        self.path = path
+        self.temp_path = temporary_path(path)
+        self.severity_counts = OrderedDict()
+        self.separator = ''
+        self.file = open(self.temp_path, 'w')
+        header = json.dumps({
+            'scan_id': scan_id,
+            'format': report_format,
+            'generated_at': datetime.utcnow().isoformat(),
+            'fields': MANIFEST_FIELDS
+        })
+        self.file.write(header[:-1] + ',"reports":[')
+
+    def add(self, filename, report, offset, size, digest=None):
+        """
+        Record a written report
+
+        Args:
+            filename (str): File name of the report
+            report (dict): Report data
+            offset (int): Offset of the report body in the file holding it
+            size (int): Size of the report body in bytes
+            digest (str): Digest of the report artifact, for reports written as separate files
+        """
+        bug_type = report['general_info']['vulnerability_category']
+        severity = report['severity']['level']
+        self.severity_counts[severity] = self.severity_counts.get(severity, 0) + 1
+        self.file.write(self.separator + json.dumps([filename, bug_type, severity, offset, size, digest], separators=(',', ':')))
+        self.separator = ','
+
+    def commit(self):
+        """Complete the manifest and move it into place"""
+        self.file.write('],"severity_counts":' + json.dumps(self.severity_counts) + '}')
+        self.file.close()
+        os.replace(self.temp_path, self.path)
+
+    def discard(self):
+        """Drop the manifest being written, leaving the previous one in place"""
+        self.file.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+class ReportPage:
+    """One page of manifest entries, with the attributes of a query pagination"""
+
+    def __init__(self, items, page, per_page, total):
+        """
+        Args:
+            items (list): Entry dicts on the page
+            page (int): Page number, from 1
+            per_page (int): Entries per page
+            total (int): Number of matching entries on all pages
+        """
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+        self.pages = (total + per_page - 1) // per_page
+        self.has_prev = page > 1
+        self.has_next = page < self.pages
+        self.prev_num = page - 1 if self.has_prev else None
+        self.next_num = page + 1 if self.has_next else None
+
+    def iter_pages(self, left_edge=2, left_current=2, right_current=4, right_edge=2):
+        """
+        Yield the page numbers to link to, with None for each gap
+
+        Args:
+            left_edge (int): Pages shown from the start
+            left_current (int): Pages shown before the current page
+            right_current (int): Pages shown after the current page
+            right_edge (int): Pages shown before the end
+
+        Yields:
+            int or None: Page number, or None for skipped pages
+        """
+        previous = 0
+        for number in range(1, self.pages + 1):
+            if (number <= left_edge
+                    or self.page - left_current <= number <= self.page + right_current
+                    or number > self.pages - right_edge):
+                if number != previous + 1:
+                    yield None
+                yield number
+                previous = number
+
+class ReportManifest:
+    """Parsed manifest of the individual bug reports of a scan"""
+
+    def __init__(self, path, data):
+        """
+        Args:
+            path (str): Path of the manifest
+            data (dict): Parsed manifest
+        """
+        self.directory = os.path.dirname(path)
+        self.scan_id = data['scan_id']
+        self.format = data['format']
+        self.generated_at = data['generated_at']
+        self.fields = data['fields']
+        self.entries = data['reports']
+        self.severity_counts = data['severity_counts']
+
+        # Entries of each severity are contiguous, in severity_counts order
+        self.severity_ranges = {}
+        start = 0
+        for severity, count in self.severity_counts.items():
+            self.severity_ranges[severity] = (start, start + count)
+            start += count
+        self.positions = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def page(self, severity=None, page=1, per_page=50):
+        """
+        Get one page of entries, optionally of one severity
+
+        Args:
+            severity (str): Severity to list, all if None
+            page (int): Page number, from 1
+            per_page (int): Entries per page
+
+        Returns:
+            ReportPage: The page
+        """
+        if severity is None:
+            start, end = 0, len(self.entries)
+        else:
+            start, end = self.severity_ranges.get(severity, (0, 0))
+        first = start + (page - 1) * per_page
+        entries = self.entries[first:min(first + per_page, end)]
+        return ReportPage([dict(zip(self.fields, entry)) for entry in entries], page, per_page, end - start)
+
+    def find(self, filename):
+        """
+        Find the entry of a report
+
+        Args:
+            filename (str): File name of the report
+
+        Returns:
+            dict or None: Entry of the report
+        """
+        if self.positions is None:
+            self.positions = {entry[0]: position for position, entry in enumerate(self.entries)}
+        position = self.positions.get(filename)
+        return dict(zip(self.fields, self.entries[position])) if position is not None else None
+
+    def read_report(self, entry, artifacts=None):
+        """
+        Read the body of a report from the file holding it
+
+        Args:
+            entry (dict): Entry of the report
+            artifacts (ReportArtifactStore): Store of the report artifacts
+
+        Returns:
+            dict: Report data
+        """
+        if entry.get('digest') and artifacts is not None:
+            with open(artifacts.path(entry['digest']), 'rb') as f:
+                return json.load(f)
+        if self.format == 'ndjson':
+            with open(os.path.join(self.directory, bundle_filename(self.scan_id, 'ndjson')), 'rb') as f:
+                f.seek(entry['offset'])
+                return json.loads(f.read(entry['size']))['report']
+        if self.format == 'zip':
+            with zipfile.ZipFile(os.path.join(self.directory, bundle_filename(self.scan_id, 'zip'))) as bundle:
+                return json.loads(bundle.read(entry['filename']))
+        with open(os.path.join(self.directory, entry['filename']), 'rb') as f:
+            f.seek(entry['offset'])
+            return json.loads(f.read(entry['size']))
+
+_manifest_cache = OrderedDict()
+_manifest_cache_lock = threading.Lock()
+
+def load_report_manifest(path):
+    """
+    Load a report manifest, reusing the parsed copy while the file is unchanged
+
+    Args:
+        path (str): Path of the manifest
+
+    Returns:
+        ReportManifest or None: The manifest, or None if there is none
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    key = (stat.st_mtime_ns, stat.st_size)
+
+    with _manifest_cache_lock:
+        cached = _manifest_cache.get(path)
+        if cached and cached[0] == key:
+            _manifest_cache.move_to_end(path)
+            return cached[1]
+
+    with open(path) as f:
+        manifest = ReportManifest(path, json.load(f))
+
+    with _manifest_cache_lock:
+        _manifest_cache[path] = (key, manifest)
+        _manifest_cache.move_to_end(path)
+        while len(_manifest_cache) > MANIFEST_CACHE_SIZE:
+            _manifest_cache.popitem(last=False)
+    return manifest
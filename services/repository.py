@@ -1,9 +1,10 @@
 import os
 import logging
 import shutil
-import re
 import git
 from urllib.parse import urlparse
+from services.mirror_cache import get_mirror_cache, get_worktree_mirror
+from services.path_filter import GITIGNORE_NAME, PathFilter
 
 logger = logging.getLogger(__name__)
 
@@ -52,6 +53,29 @@ def clone_repository(repo_url, target_dir):
         logger.error(f"Failed to clone repository: {str(e)}")
         raise Exception(f"Failed to clone repository: {str(e)}")
 
+def checkout_repository(repo_url, target_dir):
+    """
+    Check out a repository, through the mirror cache when it is enabled
+    
+    Args:
+        repo_url (str): The URL of the repository to check out
+        target_dir (str): The directory to check the repository out to
+        
+    Returns:
+        str: The path to the checked-out repository
+    """
+    mirror_cache = get_mirror_cache()
+    if mirror_cache is None:
+        return clone_repository(repo_url, target_dir)
+    
+    try:
+        repo_path = mirror_cache.checkout(repo_url, target_dir)
+        logger.info(f"Repository checked out from mirror to {repo_path}")
+        return repo_path
+    except git.GitCommandError as e:
+        logger.error(f"Failed to clone repository: {str(e)}")
+        raise Exception(f"Failed to clone repository: {str(e)}")
+
 def cleanup_repository(repo_path):
     """
     Clean up a cloned repository
@@ -61,59 +85,189 @@ def cleanup_repository(repo_path):
     """
     if os.path.exists(repo_path):
         logger.info(f"Cleaning up repository: {repo_path}")
-        shutil.rmtree(repo_path)
+        mirror_cache = get_mirror_cache()
+        if mirror_cache and get_worktree_mirror(repo_path):
+            mirror_cache.remove_worktree(repo_path)
+        else:
+            shutil.rmtree(repo_path)
     else:
         logger.warning(f"Repository path does not exist: {repo_path}")
 
-def list_files(repo_path, exclude_patterns=None):
+class RepositoryFile:
+    """A regular file found while walking a repository"""
+    
+    __slots__ = ('path', 'size')
+    
+    def __init__(self, path, size):
+        """
+        Args:
+            path (str): Path relative to the repository root, '/' separated
+            size (int): Size of the file in bytes
+        """
+        self.path = path
+        self.size = size
+
+def iter_files(repo_path, exclude_patterns=None, use_gitignore=True, pathspecs=None):
     """
-    List all files in a repository, optionally excluding files matching patterns
+    Walk a repository and yield the files a scan includes
+    
+    Directories are read with os.scandir, whose entries already carry the
+    file type, so excluded or ignored subtrees are never entered and no
+    isfile call is needed. Symbolic links are not followed, matching the
+    files a git tree listing yields.
     
     Args:
         repo_path (str): The path to the repository
         exclude_patterns (list): List of regex patterns to exclude
+        use_gitignore (bool): Skip files ignored by .gitignore files
+        pathspecs (list): Include and exclude pathspecs, see PathFilter
+        
+    Yields:
+        RepositoryFile: Each included file, directory by directory
+    """
+    path_filter = PathFilter(exclude_patterns, pathspecs)
+    is_excluded = path_filter.is_excluded
+    pending = ['']
+    
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(os.path.join(repo_path, directory)) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError as e:
+            logger.warning(f"Unable to list {directory or repo_path}: {str(e)}")
+            continue
+        
+        prefix = directory + '/' if directory else ''
+        
+        # Rules of a directory's .gitignore apply to everything below it
+        if use_gitignore:
+            for entry in entries:
+                if entry.name == GITIGNORE_NAME and entry.is_file(follow_symlinks=False):
+                    try:
+                        with open(entry.path, 'r', encoding='utf-8', errors='ignore') as f:
+                            path_filter.add_gitignore(directory, f.read())
+                    except OSError as e:
+                        logger.warning(f"Unable to read {prefix}{GITIGNORE_NAME}: {str(e)}")
+                    break
+        
+        subdirectories = []
+        for entry in entries:
+            relative_path = prefix + entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if not is_excluded(relative_path, True):
+                        subdirectories.append(relative_path)
+                elif entry.is_file(follow_symlinks=False):
+                    if not is_excluded(relative_path):
+                        yield RepositoryFile(relative_path, entry.stat(follow_symlinks=False).st_size)
+            except OSError as e:
+                logger.warning(f"Unable to stat {relative_path}: {str(e)}")
+        
+        # Visit subdirectories in name order
+        pending.extend(reversed(subdirectories))
+
+def get_blob_shas(repo_path):
+    """
+    Map each tracked file of a checked-out repository to its git blob SHA
+    
+    Args:
+        repo_path (str): The path to the repository
+        
+    Returns:
+        dict: Blob SHA keyed by file path relative to repo_path, empty if
+        repo_path is not a git repository
+    """
+    try:
+        output = git.Repo(repo_path).git.ls_files('-s', '-z')
+    except (git.InvalidGitRepositoryError, git.NoSuchPathError, git.GitCommandError) as e:
+        logger.warning(f"Unable to read blob SHAs for {repo_path}: {str(e)}")
+        return {}
+    
+    blob_shas = {}
+    for entry in output.split('\0'):
+        if not entry:
+            continue
+        # Format: "<mode> <sha> <stage>\t<path>"
+        info, path = entry.split('\t', 1)
+        blob_shas[path] = info.split(' ')[1]
+    
+    return blob_shas
+
+def get_head_commit(repo_path):
+    """
+    Get the commit checked out in a repository
+    
+    Args:
+        repo_path (str): The path to the repository
+        
+    Returns:
+        str or None: SHA of the HEAD commit, None if it cannot be determined
+    """
+    try:
+        return git.Repo(repo_path).head.commit.hexsha
+    except (git.InvalidGitRepositoryError, git.NoSuchPathError, ValueError) as e:
+        logger.warning(f"Unable to determine HEAD commit of {repo_path}: {str(e)}")
+        return None
+
+def get_changed_files(repo_path, base_commit, head_commit):
+    """
+    List the files that differ between two commits
+    
+    Renames are reported as a deletion of the old path and an addition of
+    the new one.
+    
+    Args:
+        repo_path (str): The path to the repository
+        base_commit (str): SHA of the previously scanned commit
+        head_commit (str): SHA of the commit being scanned
         
     Returns:
-        list: List of file paths relative to repo_path
-    """
-    if exclude_patterns is None:
-        exclude_patterns = [
-            r'\.git/',
-            r'node_modules/',
-            r'__pycache__/',
-            r'\.venv/',
-            r'\.env/',
-            r'\.DS_Store',
-            r'\.idea/',
-            r'\.vscode/',
-            r'\.png$',
-            r'\.jpg$',
-            r'\.jpeg$',
-            r'\.gif$',
-            r'\.svg$',
-            r'\.pdf$',
-            r'\.zip$',
-            r'\.tar$',
-            r'\.gz$'
-        ]
-    
-    # Compile exclude patterns
-    compiled_patterns = [re.compile(pattern) for pattern in exclude_patterns]
-    
-    file_list = []
-    
-    for root, dirs, files in os.walk(repo_path):
-        # Skip excluded directories
-        dirs[:] = [d for d in dirs if not any(pattern.search(os.path.join(root, d, '')) for pattern in compiled_patterns)]
+        tuple or None: (added_or_modified, deleted_or_modified) sets of paths,
+        the first in head_commit and the second in base_commit, or None if the
+        commits cannot be compared (e.g. base_commit is not in the clone)
+    """
+    try:
+        output = git.Repo(repo_path).git.diff(
+            '--name-status', '--no-renames', '-z', base_commit, head_commit
+        )
+    except (git.InvalidGitRepositoryError, git.NoSuchPathError, git.GitCommandError) as e:
+        logger.warning(f"Unable to diff {base_commit}..{head_commit} in {repo_path}: {str(e)}")
+        return None
+    
+    added_or_modified = set()
+    deleted_or_modified = set()
+    
+    # Format: "<status>\0<path>\0" per entry
+    fields = output.split('\0')
+    for status, path in zip(fields[0::2], fields[1::2]):
+        if status == 'A':
+            added_or_modified.add(path)
+        elif status == 'D':
+            deleted_or_modified.add(path)
+        else:
+            added_or_modified.add(path)
+            deleted_or_modified.add(path)
+    
+    return added_or_modified, deleted_or_modified
+
+def read_blobs(repo_path, commit, paths):
+    """
+    Read the contents of files as of a given commit
+    
+    Args:
+        repo_path (str): The path to the repository
+        commit (str): SHA of the commit
+        paths (iterable): File paths relative to the repository root
         
-        for file in files:
-            file_path = os.path.join(root, file)
-            relative_path = os.path.relpath(file_path, repo_path)
-            
-            # Skip excluded files
-            if any(pattern.search(relative_path) for pattern in compiled_patterns):
-                continue
-                
-            file_list.append(relative_path)
-    
-    return file_list
+    Yields:
+        tuple: (path, bytes) for every path that is a file in commit
+    """
+    tree = git.Repo(repo_path).commit(commit).tree
+    for path in paths:
+        try:
+            blob = tree / path
+        except KeyError:
+            continue
+        if blob.type == 'blob':
+            yield path, blob.data_stream.read()
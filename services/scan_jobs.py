@@ -0,0 +1,384 @@
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import update, select, func
+from app import db, app
+from models import Repository, Scan
+from services.repository import checkout_repository, cleanup_repository
+from services.analyzer import analyze_repository
+from services.mirror_cache import get_mirror_cache
+from services.git_objects import GitTreeSource
+from services.scan_summary import store_scan_summary
+
+logger = logging.getLogger(__name__)
+
+# Seconds between progress updates written to the Scan row while analyzing
+PROGRESS_INTERVAL = 2.0
+
+# Seconds between refreshes of Scan.updated_at for the scans queued or running
+# in this process, which tells other processes that they are still alive
+SCAN_HEARTBEAT_INTERVAL = 30.0
+
+# Finished jobs remembered in memory for status lookups; older ones fall back
+# to the state recorded in the database
+MAX_FINISHED_JOBS = 1000
+
+# Repository.status values mapped to the state reported for its latest scan
+REPOSITORY_STATUS_STATES = {
+    'pending': 'queued',
+    'analyzing': 'running',
+    'completed': 'completed',
+    'failed': 'failed'
+}
+
+class ScanJobQueue:
+    """
+    Bounded pool of background workers that run clone -> analyze -> cleanup
+
+    The web request only enqueues the scan; the number of scans running at
+    once is capped by max_workers and further scans wait in the queue.
+
+    Jobs only live in this process. A heartbeat thread keeps the scans it
+    has queued or running fresh in the database while they wait, clone and
+    analyze, and fails the scans other processes left behind once they
+    have not been refreshed for stale_after seconds.
+    """
+
+    thread_name_prefix = 'scan-worker'
+
+    # Seconds between heartbeats, None for queues whose jobs are not scans
+    heartbeat_interval = SCAN_HEARTBEAT_INTERVAL
+
+    def __init__(self, max_workers, stale_after=0, heartbeat_interval=None):
+        """
+        Args:
+            max_workers (int): Number of jobs run at once
+            stale_after (int): Seconds after which scans no process refreshes
+                are failed by the heartbeat, 0 to leave them
+            heartbeat_interval (float): Seconds between heartbeats, defaults
+                to the class setting
+        """
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=self.thread_name_prefix)
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.stale_after = stale_after
+        self.stopped = threading.Event()
+
+        if heartbeat_interval is not None:
+            self.heartbeat_interval = heartbeat_interval
+        if self.heartbeat_interval:
+            threading.Thread(
+                target=self._heartbeat, name=f"{self.thread_name_prefix}-heartbeat", daemon=True
+            ).start()
+
+    def submit(self, scan_id):
+        """
+        Queue a scan for background execution
+
+        Args:
+            scan_id (int): ID of the scan in the database
+        """
+        self._update(scan_id, state='queued', error=None)
+        self.executor.submit(self._run, scan_id)
+
+    def get(self, scan_id):
+        """
+        Get the in-memory state of a job
+
+        Args:
+            scan_id (int): ID of the scan in the database
+
+        Returns:
+            dict or None: Job state, or None if this process does not know the job
+        """
+        with self.lock:
+            job = self.jobs.get(scan_id)
+            return dict(job) if job else None
+
+    def active(self):
+        """
+        List the jobs queued or running in this process
+
+        Returns:
+            list: IDs of the scans of the jobs
+        """
+        with self.lock:
+            return [key for key, job in self.jobs.items() if job['state'] in ('queued', 'running')]
+
+    def shutdown(self, wait=True):
+        """
+        Stop the heartbeat and the workers
+
+        Args:
+            wait (bool): Wait for the running jobs to finish
+        """
+        self.stopped.set()
+        self.executor.shutdown(wait=wait)
+
+    def _heartbeat(self):
+        while not self.stopped.wait(self.heartbeat_interval):
+            with app.app_context():
+                try:
+                    touch_scans(self.active())
+                    if self.stale_after:
+                        fail_interrupted_scans(self.stale_after)
+                except Exception as e:
+                    logger.warning(f"Scan heartbeat failed: {str(e)}")
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+
+    def _update(self, scan_id, **fields):
+        with self.lock:
+            job = self.jobs.setdefault(scan_id, {'state': 'queued', 'error': None})
+            job.update(fields)
+
+            if job['state'] in ('completed', 'failed'):
+                self.jobs.move_to_end(scan_id)
+                finished = [key for key, value in self.jobs.items() if value['state'] in ('completed', 'failed')]
+                for key in finished[:-MAX_FINISHED_JOBS]:
+                    del self.jobs[key]
+
+    def _run(self, scan_id):
+        with app.app_context():
+            try:
+                self._update(scan_id, state='running')
+                run_scan(scan_id)
+                self._update(scan_id, state='completed')
+            except Exception as e:
+                logger.error(f"Scan {scan_id} failed: {str(e)}")
+                self._update(scan_id, state='failed', error=str(e))
+            finally:
+                db.session.remove()
+
+_scan_queue = None
+_scan_queue_lock = threading.Lock()
+
+def get_scan_queue():
+    """
+    Get the process-wide scan job queue, creating it on first use
+
+    Returns:
+        ScanJobQueue: The scan job queue
+    """
+    global _scan_queue
+    with _scan_queue_lock:
+        if _scan_queue is None:
+            _scan_queue = ScanJobQueue(
+                max_workers=max(1, int(app.config.get('SCAN_WORKERS') or 1)),
+                stale_after=app.config.get('STALE_SCAN_AGE') or 0
+            )
+        return _scan_queue
+
+def enqueue_scan(scan_id):
+    """
+    Queue a scan to run in the background
+
+    Args:
+        scan_id (int): ID of the scan in the database
+    """
+    get_scan_queue().submit(scan_id)
+
+def run_scan(scan_id):
+    """
+    Clone, analyze and clean up the repository of a scan
+
+    With NO_CHECKOUT_SCANS and the mirror cache enabled, the files are read
+    straight from the repository mirror and no working tree is created.
+
+    Progress is recorded on the Scan row and the outcome on Scan.status and
+    Repository.status.
+    The scanned commit is recorded once the scan completes, so later
+    incremental scans only build on complete results.
+
+    Args:
+        scan_id (int): ID of the scan in the database
+    """
+    scan = db.session.get(Scan, scan_id)
+    repo = db.session.get(Repository, scan.repository_id)
+    repo_path = None
+
+    try:
+        scan.status = 'running'
+        repo.status = 'analyzing'
+        db.session.commit()
+
+        # Incremental scans build on the latest completed scan of the repository;
+        # the commit of a scan that failed while finishing may already be stored
+        base_scan = None
+        if scan.scan_mode == 'incremental':
+            base_scan = (
+                Scan.query
+                .filter(Scan.repository_id == repo.id, Scan.id < scan.id)
+                .filter(Scan.status == 'completed', Scan.commit_sha.isnot(None))
+                .order_by(Scan.id.desc())
+                .first()
+            )
+
+        mirror_cache = get_mirror_cache()
+        if app.config.get('NO_CHECKOUT_SCANS') and mirror_cache is not None:
+            # Analyze the default branch of the mirror without checking it out
+            with mirror_cache.open(repo.url) as mirror_path, GitTreeSource(mirror_path) as source:
+                result = analyze_repository(
+                    mirror_path, scan_id, progress=ScanProgress(scan_id), base_scan=base_scan, source=source
+                )
+        else:
+            # Check out repository; each scan gets its own directory
+            repo_path = checkout_repository(repo.url, os.path.join(app.config["REPO_TEMP_DIR"], 'scans', str(scan_id)))
+            result = analyze_repository(repo_path, scan_id, progress=ScanProgress(scan_id), base_scan=base_scan)
+
+        # Update scan with results
+        scan.total_files = result['total_files']
+        scan.analyzed_files = result['analyzed_files']
+        scan.total_bugs = result['total_bugs']
+        scan.commit_sha = result['commit_sha']
+        scan.ruleset_version = result['ruleset_version']
+        scan.options_fingerprint = result['options_fingerprint']
+        scan.scan_mode = result['scan_mode']
+        scan.base_scan_id = result['base_scan_id']
+
+        # Aggregate the findings once, before the scan is reported complete,
+        # so results pages never scan them
+        store_scan_summary(scan_id)
+
+        # Update scan and repository status
+        scan.status = 'completed'
+        repo.status = 'completed'
+        repo.last_analyzed = scan.timestamp
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        scan.status = 'failed'
+        repo.status = 'failed'
+        db.session.commit()
+        raise
+    finally:
+        # Clean up repository
+        if repo_path:
+            cleanup_repository(repo_path)
+
+class ScanProgress:
+    """Progress callback that records file counts on the Scan row, throttled"""
+
+    def __init__(self, scan_id, interval=PROGRESS_INTERVAL):
+        self.scan_id = scan_id
+        self.interval = interval
+        self.last_write = 0.0
+
+    def __call__(self, analyzed_files, total_files):
+        now = time.monotonic()
+        if now - self.last_write < self.interval and analyzed_files < total_files:
+            return
+
+        self.last_write = now
+        db.session.execute(
+            update(Scan)
+            .where(Scan.id == self.scan_id)
+            .values(analyzed_files=analyzed_files, total_files=total_files)
+        )
+        db.session.commit()
+
+def get_scan_status(scan):
+    """
+    Describe the state and progress of a scan
+
+    Jobs queued by this process report their live state; otherwise the state
+    recorded on the scan is used.
+
+    Args:
+        scan (Scan): Scan object
+
+    Returns:
+        dict: Scan state and progress counters
+    """
+    job = get_scan_queue().get(scan.id) if _scan_queue is not None else None
+    repo = scan.repository
+
+    if job:
+        state = job['state']
+        error = job['error']
+    else:
+        state = scan.status or 'completed'
+        error = None
+
+    return {
+        'scan_id': scan.id,
+        'state': state,
+        'error': error,
+        'repository_status': repo.status,
+        'total_files': scan.total_files,
+        'analyzed_files': scan.analyzed_files,
+        'total_bugs': scan.total_bugs
+    }
+
+def backfill_scan_states():
+    """
+    Record a state on scans stored before scans had one
+
+    The latest scan of each repository takes the state of the repository
+    status; earlier scans had completed. Scans without a last change time
+    take their start time.
+    """
+    latest_scans = select(func.max(Scan.id)).group_by(Scan.repository_id)
+
+    for status, state in REPOSITORY_STATUS_STATES.items():
+        db.session.execute(
+            update(Scan)
+            .where(Scan.status.is_(None), Scan.id.in_(latest_scans))
+            .where(Scan.repository_id.in_(select(Repository.id).where(Repository.status == status)))
+            .values(status=state, updated_at=Scan.timestamp)
+        )
+    db.session.execute(
+        update(Scan).where(Scan.status.is_(None)).values(status='completed', updated_at=Scan.timestamp)
+    )
+    db.session.execute(update(Scan).where(Scan.updated_at.is_(None)).values(updated_at=Scan.timestamp))
+    db.session.commit()
+
+def touch_scans(scan_ids):
+    """
+    Mark scans as alive by refreshing their last change time
+
+    Args:
+        scan_ids (list): IDs of the scans
+    """
+    if not scan_ids:
+        return
+    db.session.execute(update(Scan).where(Scan.id.in_(scan_ids)).values(updated_at=datetime.utcnow()))
+    db.session.commit()
+
+def fail_interrupted_scans(stale_after):
+    """
+    Mark scans whose process went away as failed
+
+    Jobs only live in the memory of the process that queued them, so a scan
+    whose process stopped will never finish. Processes refresh their queued
+    and running scans every SCAN_HEARTBEAT_INTERVAL seconds; scans not
+    refreshed for stale_after seconds are taken as interrupted. Their
+    repository, if that scan is its latest, is marked failed as well.
+
+    Args:
+        stale_after (int): Seconds without refresh after which a queued or
+            running scan is failed; keep it well above SCAN_HEARTBEAT_INTERVAL
+    """
+    interrupted = [
+        Scan.status.in_(('queued', 'running')),
+        Scan.updated_at < datetime.utcnow() - timedelta(seconds=stale_after)
+    ]
+    failed = db.session.execute(update(Scan).where(*interrupted).values(status='failed')).rowcount
+    if failed:
+        logger.warning(f"Marked {failed} interrupted scans as failed")
+
+    latest_scans = select(func.max(Scan.id)).group_by(Scan.repository_id)
+    db.session.execute(
+        update(Repository)
+        .where(Repository.status.in_(('pending', 'analyzing')))
+        .where(Repository.id.in_(
+            select(Scan.repository_id).where(Scan.id.in_(latest_scans), Scan.status == 'failed')
+        ))
+        .values(status='failed')
+    )
+    db.session.commit()
@@ -0,0 +1,200 @@
+import hashlib
+import logging
+from datetime import datetime, timezone
+from sqlalchemy import select, func
+from app import db
+from models import Repository, Scan
+from services.findings_query import DEFAULT_PAGE_SIZE, get_list_arg, encode_cursor, load_cursor
+
+logger = logging.getLogger(__name__)
+
+# States a scan may be in, as recorded in Scan.status
+SCAN_STATES = ('queued', 'running', 'completed', 'failed')
+
+def parse_datetime(value):
+    """
+    Parse an ISO 8601 date or date and time
+
+    Args:
+        value (str): Date such as 2024-05-01 or 2024-05-01T12:00:00Z
+
+    Returns:
+        datetime: Naive UTC datetime, as stored in the database
+
+    Raises:
+        ValueError: If the value is not a valid date
+    """
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError as e:
+        raise ValueError(f"Invalid date: {value}") from e
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+class ScansFilter:
+    """Conditions selecting scans"""
+
+    def __init__(self, repository_ids=None, states=None, since=None, until=None):
+        """
+        Args:
+            repository_ids (list): Repositories to keep, all if empty
+            states (list): Scan states to keep, all if empty
+            since (datetime): Keep scans started at or after this time
+            until (datetime): Keep scans started before this time
+        """
+        self.repository_ids = sorted(set(repository_ids or ()))
+        self.states = sorted(set(states or ()))
+        self.since = since
+        self.until = until
+
+    @classmethod
+    def from_args(cls, args):
+        """
+        Build a filter from the query parameters repository, status, since
+        and until
+
+        Args:
+            args (MultiDict): Request arguments
+
+        Returns:
+            ScansFilter: The filter
+
+        Raises:
+            ValueError: If a parameter is invalid
+        """
+        try:
+            repository_ids = [int(value) for value in get_list_arg(args, 'repository')]
+        except ValueError as e:
+            raise ValueError("repository must be a repository ID") from e
+
+        states = get_list_arg(args, 'status')
+        unknown = [state for state in states if state not in SCAN_STATES]
+        if unknown:
+            raise ValueError(f"Unknown status: {', '.join(unknown)}")
+
+        since = args.get('since')
+        until = args.get('until')
+        return cls(
+            repository_ids=repository_ids,
+            states=states,
+            since=parse_datetime(since) if since else None,
+            until=parse_datetime(until) if until else None
+        )
+
+    def conditions(self):
+        """
+        Build the WHERE conditions of the filter
+
+        Returns:
+            list: SQLAlchemy conditions
+        """
+        conditions = []
+        if self.repository_ids:
+            conditions.append(Scan.repository_id.in_(self.repository_ids))
+        if self.states:
+            conditions.append(Scan.status.in_(self.states))
+        if self.since is not None:
+            conditions.append(Scan.timestamp >= self.since)
+        if self.until is not None:
+            conditions.append(Scan.timestamp < self.until)
+        return conditions
+
+def decode_scans_cursor(cursor):
+    """
+    Decode a cursor returned with a previous page of scans
+
+    Args:
+        cursor (str): Cursor, or None for the first page
+
+    Returns:
+        list or None: ID of the last scan of the previous page, in a list
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    values = load_cursor(cursor)
+    if values is None:
+        return None
+    if not (isinstance(values, list) and len(values) == 1 and isinstance(values[0], int)):
+        raise ValueError("Invalid cursor")
+    return values
+
+def scans_statement(filters):
+    """
+    Build the query selecting scans with their repository, newest first
+
+    The repository is joined in the same query rather than loaded per scan.
+
+    Args:
+        filters (ScansFilter): Conditions on the scans
+
+    Returns:
+        Select: The query
+    """
+    return (
+        select(
+            Scan.id,
+            Scan.repository_id,
+            Repository.name.label('repository'),
+            Repository.url,
+            Scan.status,
+            Scan.timestamp,
+            Scan.total_files,
+            Scan.analyzed_files,
+            Scan.total_bugs
+        )
+        .join(Repository, Scan.repository_id == Repository.id)
+        .where(*filters.conditions())
+        .order_by(Scan.id.desc())
+    )
+
+def query_scans_page(filters, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Fetch one page of scans, newest first, with keyset pagination on the ID
+
+    Args:
+        filters (ScansFilter): Conditions on the scans
+        cursor (list): ID of the last scan of the previous page, in a list
+        limit (int): Maximum scans on the page
+
+    Returns:
+        tuple: (list of scan dicts, cursor of the next page or None)
+    """
+    statement = scans_statement(filters)
+    if cursor is not None:
+        statement = statement.where(Scan.id < cursor[0])
+    rows = db.session.execute(statement.limit(limit + 1)).mappings().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1]['id']])
+
+    scans = []
+    for row in rows:
+        scan = dict(row)
+        scan['timestamp'] = scan['timestamp'].isoformat() if scan['timestamp'] else None
+        scans.append(scan)
+    return scans, next_cursor
+
+def scans_validators(filters):
+    """
+    Compute the validators of a scans listing for conditional requests
+
+    They change whenever a matching scan is added, removed or updated, so a
+    client polling the listing can be answered with 304 Not Modified from one
+    aggregate query. Renaming a repository does not change them.
+
+    Args:
+        filters (ScansFilter): Conditions on the scans
+
+    Returns:
+        tuple: (ETag value, last modification time or None)
+    """
+    count, last_id, last_modified = db.session.execute(
+        select(func.count(Scan.id), func.max(Scan.id), func.max(Scan.updated_at)).where(*filters.conditions())
+    ).one()
+
+    version = f"{count}:{last_id}:{last_modified.isoformat() if last_modified else ''}"
+    return hashlib.sha1(version.encode('utf-8')).hexdigest(), last_modified
@@ -0,0 +1,118 @@
+import json
+import logging
+from sqlalchemy import select, func
+from app import db
+from models import Bug, ScanSummary
+
+logger = logging.getLogger(__name__)
+
+# Files listed in the most affected files of a summary
+MOST_AFFECTED_FILES_LIMIT = 10
+
+# Critical findings listed in a summary; the severity breakdown has the full count
+CRITICAL_BUGS_LIMIT = 100
+
+# Order in which severities are reported; unknown severities follow
+SEVERITY_ORDER = ('critical', 'high', 'medium', 'low', 'info')
+
+def compute_scan_summary(scan_id):
+    """
+    Aggregate the findings of a scan with GROUP BY queries
+
+    Args:
+        scan_id (int): ID of the scan
+
+    Returns:
+        dict: severity_breakdown, bug_types, most_affected_files and critical_bugs
+    """
+    in_scan = Bug.scan_id == scan_id
+    count = func.count(Bug.id)
+
+    severities = dict(db.session.execute(
+        select(Bug.severity, count).where(in_scan).group_by(Bug.severity)
+    ).all())
+    severity_breakdown = {severity: severities.pop(severity) for severity in SEVERITY_ORDER if severity in severities}
+    severity_breakdown.update(sorted(severities.items()))
+
+    bug_types = dict(db.session.execute(
+        select(Bug.bug_type, count).where(in_scan).group_by(Bug.bug_type).order_by(count.desc(), Bug.bug_type)
+    ).all())
+
+    most_affected_files = dict(db.session.execute(
+        select(Bug.file_path, count).where(in_scan)
+        .group_by(Bug.file_path).order_by(count.desc(), Bug.file_path)
+        .limit(MOST_AFFECTED_FILES_LIMIT)
+    ).all())
+
+    critical_bugs = [
+        {
+            'file_path': file_path,
+            'line_number': line_number,
+            'description': description,
+            'type': bug_type
+        }
+        for file_path, line_number, description, bug_type in db.session.execute(
+            select(Bug.file_path, Bug.line_number, Bug.description, Bug.bug_type)
+            .where(in_scan, Bug.severity == 'critical')
+            .order_by(Bug.id)
+            .limit(CRITICAL_BUGS_LIMIT)
+        )
+    ]
+
+    return {
+        'severity_breakdown': severity_breakdown,
+        'bug_types': bug_types,
+        'most_affected_files': most_affected_files,
+        'critical_bugs': critical_bugs
+    }
+
+def store_scan_summary(scan_id):
+    """
+    Compute the summary of a completed scan and store it
+
+    Args:
+        scan_id (int): ID of the scan
+
+    Returns:
+        dict: The summary, as returned by compute_scan_summary
+    """
+    summary = compute_scan_summary(scan_id)
+
+    row = ScanSummary.query.filter_by(scan_id=scan_id).first() or ScanSummary(scan_id=scan_id)
+    row.severity_breakdown = json.dumps(summary['severity_breakdown'])
+    row.bug_types = json.dumps(summary['bug_types'])
+    row.most_affected_files = json.dumps(summary['most_affected_files'])
+    row.critical_bugs = json.dumps(summary['critical_bugs'])
+    db.session.add(row)
+    db.session.commit()
+
+    logger.info(f"Stored summary of scan {scan_id}")
+    return summary
+
+def get_scan_summary(scan, completed=True):
+    """
+    Get the summary of a scan, computing it when it was not stored
+
+    Scans completed before summaries were stored get theirs computed and
+    stored on first access. Scans still running are summarized from the
+    findings written so far, without storing the result.
+
+    Args:
+        scan (Scan): Scan object
+        completed (bool): Whether the scan has completed
+
+    Returns:
+        dict: severity_breakdown, bug_types, most_affected_files and critical_bugs
+    """
+    row = ScanSummary.query.filter_by(scan_id=scan.id).first()
+    if row is not None:
+        return {
+            'severity_breakdown': json.loads(row.severity_breakdown),
+            'bug_types': json.loads(row.bug_types),
+            'most_affected_files': json.loads(row.most_affected_files),
+            'critical_bugs': json.loads(row.critical_bugs)
+        }
+
+    if completed:
+        return store_scan_summary(scan.id)
+    return compute_scan_summary(scan.id)
@@ -0,0 +1,10 @@
+import os
+import tempfile
+
+# The app creates its database and directories on import; keep them out of the tree
+_test_dir = tempfile.mkdtemp(prefix='codebughunter-tests-')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(_test_dir, 'test.db')}")
+os.environ.setdefault('SESSION_SECRET', 'test')
+
+# Initialize the app before the services, which import it
+import app  # noqa: E402,F401
@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import select
+from app import app, db
+from models import Repository, Scan, Bug
+from services.findings_query import FindingsFilter
+
+PATHS = [
+    'src/a-b/one.py',
+    'src/a-bc.py',
+    'src/a_b/two.py',
+    'src/aXb/three.py',
+    'src/a%b/four.py',
+    'src/a%/five.py',
+    'src/ab/six.py',
+    'src/\U0010ffff/seven.py'
+]
+
+@pytest.fixture
+def scan_id():
+    with app.app_context():
+        repo = Repository(url='file:///repo', name='repo')
+        db.session.add(repo)
+        db.session.commit()
+        scan = Scan(repository_id=repo.id, status='completed')
+        db.session.add(scan)
+        db.session.commit()
+        db.session.add_all(
+            Bug(scan_id=scan.id, file_path=path, bug_type='Test', severity='low', description='Test')
+            for path in PATHS
+        )
+        db.session.commit()
+        yield scan.id
+        db.session.remove()
+
+def matching_paths(scan_id, prefix):
+    conditions = FindingsFilter(path_prefix=prefix).conditions(scan_id)
+    return sorted(db.session.execute(select(Bug.file_path).where(*conditions)).scalars())
+
+@pytest.mark.parametrize('prefix, expected', [
+    ('src/a-b', ['src/a-b/one.py', 'src/a-bc.py']),
+    ('src/a-b/', ['src/a-b/one.py']),
+    ('src/a_b', ['src/a_b/two.py']),
+    ('src/a%', ['src/a%/five.py', 'src/a%b/four.py']),
+    ('src/a%b', ['src/a%b/four.py']),
+    ('src/\U0010ffff', ['src/\U0010ffff/seven.py']),
+])
+def test_path_prefix_matches_literally(scan_id, prefix, expected):
+    with app.app_context():
+        assert matching_paths(scan_id, prefix) == expected
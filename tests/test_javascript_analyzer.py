@@ -0,0 +1,21 @@
+from analyzers.file_context import FileContext
+from analyzers.javascript_analyzer import JS_TRIGGER_PATTERN, analyze_javascript_file
+
+def analyze(source):
+    context = FileContext('app.js', 'app.js', source.encode('utf-8'), 'javascript')
+    return [(bug['line_number'], bug['bug_type']) for bug in analyze_javascript_file('app.js', 'app.js', context)]
+
+def test_trigger_pattern_matches_whole_tokens_only():
+    assert not JS_TRIGGER_PATTERN.search('if (a === b && c !== d) { const evaluate = renewed; }')
+    assert JS_TRIGGER_PATTERN.search('if (a == b) {}')
+    assert JS_TRIGGER_PATTERN.search('if (a != b) {}')
+    assert JS_TRIGGER_PATTERN.search('eval(code)')
+
+def test_loose_null_check_flags_equality_with_null_only():
+    bugs = analyze('if (x == null) {}\nif (x != null) {}\n')
+    assert (1, 'Loose Null Check') in bugs
+    assert (2, 'Loose Null Check') not in bugs
+
+def test_function_constructor():
+    assert (1, 'new Function()') in analyze('const f = new Function("return 1");\n')
+    assert analyze('function Function() {}\n') == []
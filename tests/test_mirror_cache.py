@@ -0,0 +1,128 @@
+import os
+import sys
+import git
+import pytest
+import subprocess
+from services.mirror_cache import MirrorCache, mirror_lock, get_worktree_mirror, has_worktrees
+from services.git_objects import GitTreeSource
+
+def commit_files(repo, files, message):
+    for path, content in files.items():
+        full_path = os.path.join(repo.working_tree_dir, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'w') as f:
+            f.write(content)
+    repo.index.add(list(files))
+    repo.index.commit(message)
+
+@pytest.fixture
+def origin(tmp_path):
+    repo = git.Repo.init(tmp_path / 'origin')
+    with repo.config_writer() as config:
+        config.set_value('user', 'name', 'Test')
+        config.set_value('user', 'email', 'test@example.com')
+        # Let partial clones of the origin filter blobs
+        config.set_value('uploadpack', 'allowFilter', 'true')
+        config.set_value('uploadpack', 'allowAnySHA1InWant', 'true')
+    commit_files(repo, {'app.py': 'print("hello")\n', 'lib/util.js': 'var x = 1;\n'}, 'Initial commit')
+    return repo
+
+@pytest.fixture
+def origin_url(origin):
+    return 'file://' + origin.working_tree_dir
+
+@pytest.fixture
+def cache(tmp_path):
+    return MirrorCache(str(tmp_path / 'mirrors'), max_bytes=1024 * 1024 * 1024)
+
+def test_checkout_creates_worktree_from_mirror(cache, origin_url, tmp_path):
+    target = str(tmp_path / 'scan')
+    cache.checkout(origin_url, target)
+
+    assert get_worktree_mirror(target) == cache.mirror_path(origin_url)
+    with open(os.path.join(target, 'app.py')) as f:
+        assert f.read() == 'print("hello")\n'
+
+def test_checkout_fetches_new_commits_into_existing_mirror(cache, origin, origin_url, tmp_path):
+    cache.checkout(origin_url, str(tmp_path / 'first'))
+    commit_files(origin, {'app.py': 'print("updated")\n'}, 'Update')
+
+    target = str(tmp_path / 'second')
+    cache.checkout(origin_url, target)
+
+    assert git.Repo(target).head.commit.hexsha == origin.head.commit.hexsha
+    with open(os.path.join(target, 'app.py')) as f:
+        assert f.read() == 'print("updated")\n'
+
+def test_remove_worktree_unregisters_it(cache, origin_url, tmp_path):
+    target = str(tmp_path / 'scan')
+    cache.checkout(origin_url, target)
+    cache.remove_worktree(target)
+
+    assert not os.path.exists(target)
+    assert not has_worktrees(cache.mirror_path(origin_url))
+
+def test_blobless_mirror_lists_and_reads_without_checkout(tmp_path, origin, origin_url):
+    cache = MirrorCache(str(tmp_path / 'mirrors'), max_bytes=1024 * 1024 * 1024, clone_filter='blob:none')
+
+    with cache.open(origin_url) as mirror_path, GitTreeSource(mirror_path) as source:
+        assert sorted(source.list_files()) == ['app.py', 'lib/util.js']
+        assert source.read_text('lib/util.js') == 'var x = 1;\n'
+        assert source.commit == origin.head.commit.hexsha
+
+def test_evict_removes_least_recently_used_unused_mirrors(tmp_path, origin_url, origin):
+    other = git.Repo.clone_from(origin_url, tmp_path / 'other')
+    other_url = 'file://' + other.working_tree_dir
+    cache = MirrorCache(str(tmp_path / 'mirrors'), max_bytes=1024 * 1024 * 1024)
+
+    with cache.open(origin_url):
+        pass
+    os.utime(cache.mirror_path(origin_url), (0, 0))
+    with cache.open(other_url):
+        pass
+
+    cache.max_bytes = 0
+    assert cache.evict(keep=cache.mirror_path(other_url)) == 1
+    assert not os.path.exists(cache.mirror_path(origin_url))
+    assert os.path.exists(cache.mirror_path(other_url))
+
+def test_evict_keeps_mirrors_in_use_or_checked_out(cache, origin_url, tmp_path):
+    cache.checkout(origin_url, str(tmp_path / 'scan'))
+    cache.max_bytes = 0
+    assert cache.evict() == 0
+
+    cache.remove_worktree(str(tmp_path / 'scan'))
+    with cache.open(origin_url) as mirror_path:
+        assert cache.evict() == 0
+        assert os.path.isdir(mirror_path)
+    assert cache.evict() == 1
+
+def test_evict_skips_mirrors_locked_by_another_holder(cache, origin_url):
+    with cache.open(origin_url):
+        pass
+    cache.max_bytes = 0
+
+    with mirror_lock(cache.mirror_path(origin_url), 'update'):
+        assert cache.evict() == 0
+    assert cache.evict() == 1
+
+def test_evict_skips_mirrors_read_by_another_process(cache, origin_url):
+    with cache.open(origin_url) as mirror_path:
+        pass
+    cache.max_bytes = 0
+
+    # A reader in another process holds the shared use lock until its stdin closes
+    reader = subprocess.Popen(
+        [sys.executable, '-c',
+         'import fcntl, sys; f = open(sys.argv[1], "a"); fcntl.flock(f, fcntl.LOCK_SH); '
+         'print(flush=True); sys.stdin.read()',
+         f"{mirror_path}.use.lock"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+    )
+    try:
+        reader.stdout.readline()
+        assert cache.evict() == 0
+    finally:
+        reader.stdin.close()
+        reader.wait()
+    assert cache.evict() == 1
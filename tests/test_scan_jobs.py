@@ -0,0 +1,83 @@
+import os
+import sys
+import time
+import subprocess
+from datetime import datetime, timedelta
+import pytest
+from app import app, db
+from models import Repository, Scan
+from services.scan_jobs import fail_interrupted_scans
+
+# Runs in a second process sharing the database: queues two scans whose run
+# blocks until stdin closes, with a fast heartbeat
+OWNER_PROCESS = """
+import sys
+import app  # noqa: F401
+import services.scan_jobs as scan_jobs
+
+scan_jobs.run_scan = lambda scan_id: sys.stdin.read()
+queue = scan_jobs.ScanJobQueue(max_workers=1, heartbeat_interval=0.2)
+for scan_id in sys.argv[1:]:
+    queue.submit(int(scan_id))
+print('ready', flush=True)
+sys.stdin.read()
+"""
+
+@pytest.fixture
+def scans():
+    long_ago = datetime.utcnow() - timedelta(hours=1)
+    with app.app_context():
+        repo = Repository(url='file:///repo', name='repo', status='analyzing')
+        db.session.add(repo)
+        db.session.commit()
+        rows = [
+            Scan(repository_id=repo.id, status='running'),
+            Scan(repository_id=repo.id, status='running'),
+            Scan(repository_id=repo.id, status='queued')
+        ]
+        db.session.add_all(rows)
+        db.session.commit()
+        ids = [row.id for row in rows]
+        db.session.execute(db.update(Scan).where(Scan.id.in_(ids)).values(updated_at=long_ago))
+        db.session.commit()
+        yield ids, repo.id
+        db.session.remove()
+
+def states(ids):
+    db.session.expire_all()
+    return [db.session.get(Scan, scan_id).status for scan_id in ids]
+
+def test_scans_of_a_live_process_survive_the_sweep_of_another(scans):
+    (orphan, owned_running, owned_queued), repo_id = scans
+    owner = subprocess.Popen(
+        [sys.executable, '-c', OWNER_PROCESS, str(owned_running), str(owned_queued)],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        env=dict(os.environ, STALE_SCAN_AGE='0')
+    )
+    try:
+        assert owner.stdout.readline().strip() == 'ready'
+        # Wait for the owner's heartbeat to refresh its scans
+        deadline = time.monotonic() + 10
+        with app.app_context():
+            while time.monotonic() < deadline:
+                db.session.expire_all()
+                if all(db.session.get(Scan, scan_id).updated_at > datetime.utcnow() - timedelta(seconds=1)
+                       for scan_id in (owned_running, owned_queued)):
+                    break
+                time.sleep(0.1)
+
+            # Another process starting up only fails the scan nobody refreshes; the
+            # repository is kept, as its latest scan is alive
+            fail_interrupted_scans(stale_after=2)
+            assert states([owned_running, owned_queued, orphan]) == ['running', 'queued', 'failed']
+            assert db.session.get(Repository, repo_id).status == 'analyzing'
+    finally:
+        owner.stdin.close()
+        owner.wait()
+
+    # Once the owner is gone, its scans go stale and are failed with their repository
+    time.sleep(2.5)
+    with app.app_context():
+        fail_interrupted_scans(stale_after=2)
+        assert states([owned_running, owned_queued, orphan]) == ['failed', 'failed', 'failed']
+        assert db.session.get(Repository, repo_id).status == 'failed'
@@ -0,0 +1,34 @@
+import pytest
+from app import app, db
+from models import Repository, Scan
+
+@pytest.fixture
+def repo_id():
+    with app.app_context():
+        repo = Repository(url='file:///listed', name='listed')
+        db.session.add(repo)
+        db.session.commit()
+        db.session.add_all(Scan(repository_id=repo.id, status='completed') for _ in range(5))
+        db.session.commit()
+        yield repo.id
+        db.session.remove()
+
+def test_scans_listing_is_a_list_with_the_cursor_out_of_band(repo_id):
+    client = app.test_client()
+    seen = []
+    url = f'/api/scans?repository={repo_id}&limit=2'
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        assert isinstance(response.json, list)
+        seen.extend(scan['id'] for scan in response.json)
+        cursor = response.headers.get('X-Next-Cursor')
+        if cursor is None:
+            assert 'Link' not in response.headers
+            break
+        link = response.headers['Link']
+        assert link.endswith('>; rel="next"') and f'cursor={cursor}' in link
+        url = link[1:link.index('>')]
+
+    assert len(seen) == 5
+    assert seen == sorted(seen, reverse=True)